@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 15:00:00 2026
+
+@author: Renato Henz
+
+Audio renditions of the prayers, aspirations and Rosary mysteries: a pluggable
+speech synthesizer and a content-addressed cache (by text and voice), filled
+ahead of time, with the Telegram file IDs of the audios already sent
+
+"""
+
+# Main dependencies
+import hashlib, io, json, logging, os, threading, wave
+
+logger = logging.getLogger(__name__)
+
+# Google Cloud Text-to-Speech synthesizer (voice messages must be OGG/Opus)
+class GoogleSynthesizer():
+    extension = 'ogg'
+
+    # Init func
+    def __init__(self, voice='pt-BR-Wavenet-A', language='pt-BR'):
+        # Only imported when used, so the other synthesizers don't need the package
+        from google.cloud import texttospeech
+        self.texttospeech = texttospeech
+        self.client = texttospeech.TextToSpeechClient()
+        self.voice = voice
+        self.language = language
+
+    # Synthesizing a text, returning the audio bytes
+    def synthesize(self, text):
+        response = self.client.synthesize_speech(
+            input=self.texttospeech.SynthesisInput(text=text),
+            voice=self.texttospeech.VoiceSelectionParams(language_code=self.language, name=self.voice),
+            audio_config=self.texttospeech.AudioConfig(audio_encoding=self.texttospeech.AudioEncoding.OGG_OPUS),
+        )
+        return response.audio_content
+
+# Offline synthesizer, for tests and benchmarks: silent WAV audios as long as the text would be read
+class StubSynthesizer():
+    extension = 'wav'
+
+    # Init func
+    def __init__(self, voice='stub', rate=8000, seconds_per_word=0.05):
+        self.voice = voice
+        self.rate = rate
+        self.seconds_per_word = seconds_per_word
+
+    # Synthesizing a text, returning the audio bytes
+    def synthesize(self, text):
+        frames = int(len(text.split()) * self.seconds_per_word * self.rate)
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as file:
+            file.setnchannels(1)
+            file.setsampwidth(2)
+            file.setframerate(self.rate)
+            file.writeframes(b'\x00\x00' * frames)
+        return buffer.getvalue()
+
+# Available synthesizers
+SYNTHESIZERS = {'google': GoogleSynthesizer, 'stub': StubSynthesizer}
+
+# Function to create a synthesizer by its name (and voice, if provided)
+def create_synthesizer(name, voice=None):
+    if (name not in SYNTHESIZERS): raise ValueError(f"Unknown synthesizer: {name}")
+    return SYNTHESIZERS[name]() if not voice else SYNTHESIZERS[name](voice=voice)
+
+# Content-addressed audios cache: each audio is saved as '<hash[:2]>/<hash>.<extension>', where the hash
+# is taken from the voice and the text, so changed texts (or voices) get new audios
+# Lookups never synthesize: audios are only created by 'ensure' and 'precompute'
+class AudioCache():
+    # Init func
+    def __init__(self, directory, synthesizer):
+        self.directory = directory
+        self.synthesizer = synthesizer
+        # Telegram file IDs of the audios already sent, as {hash: file ID}
+        self.file_ids = {}
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(os.path.join(directory, 'file_ids.json'), encoding='utf-8') as file: self.file_ids = json.load(file)
+        except (OSError, ValueError): self.file_ids = {}
+
+    # Hash of a text with the current voice
+    def key(self, text):
+        return hashlib.sha256(f"{self.synthesizer.voice}\n{text}".encode('utf-8')).hexdigest()
+
+    # Path of the audio of a text
+    def path(self, text):
+        key = self.key(text)
+        return os.path.join(self.directory, key[:2], f"{key}.{self.synthesizer.extension}")
+
+    # Path of the audio of a text, if it was already synthesized (None otherwise)
+    def get(self, text):
+        path = self.path(text)
+        return path if os.path.exists(path) else None
+
+    # Synthesizing the audio of a text, if it isn't cached yet, returning whether it was synthesized
+    def ensure(self, text):
+        path = self.path(text)
+        if (os.path.exists(path)): return False
+        audio = self.synthesizer.synthesize(text)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", 'wb') as file: file.write(audio)
+        os.replace(f"{path}.tmp", path)
+        return True
+
+    # Synthesizing the missing audios of several texts (e.g.: off-peak), returning how many were synthesized
+    # A failing text doesn't stop the others, it's tried again on the next time
+    def precompute(self, texts):
+        synthesized = 0
+        for text in texts:
+            try: synthesized += self.ensure(text)
+            except Exception as error: logger.warning('Não foi possível sintetizar o áudio "%s…": %s', text[:40], error)
+        return synthesized
+
+    # Telegram file ID of the audio of a text (None if it wasn't sent yet)
+    def get_file_id(self, text):
+        return self.file_ids.get(self.key(text))
+
+    # Saving the Telegram file ID of the audio of a text
+    def set_file_id(self, text, file_id):
+        path = os.path.join(self.directory, 'file_ids.json')
+        with self.lock:
+            self.file_ids[self.key(text)] = file_id
+            try:
+                with open(f"{path}.tmp", 'w', encoding='utf-8') as file: json.dump(self.file_ids, file)
+                os.replace(f"{path}.tmp", path)
+            except OSError as error: logger.warning('Não foi possível salvar os IDs dos áudios: %s', error)
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 16:00:00 2026
+
+@author: Renato Henz
+
+Content backends: the images catalog, the prayers and the aspirations can be loaded
+from AWS (S3 and DynamoDB) and MySQL, or from local files (a directory tree, a JSON
+file and an SQLite database), chosen on the '.env' file
+
+"""
+
+# Main dependencies
+import json, logging, os, sqlite3
+
+logger = logging.getLogger(__name__)
+
+# Images catalog on an S3 bucket
+# 'base' turns a key into the image location (its URL)
+class S3Catalog():
+    # Init func
+    def __init__(self, session, bucket, region, endpoint_url=None):
+        self.session = session
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url
+        self.base = f"https://{bucket}.s3.{region}.amazonaws.com/"
+
+    # Listing the bucket objects keys (folders included, ending with '/')
+    def keys(self):
+        # Initializing S3 instance and getting bucket object
+        s3 = self.session.resource('s3', endpoint_url=self.endpoint_url)
+        bucket = s3.Bucket(self.bucket)
+        return [bucket_object.key for bucket_object in bucket.objects.all()]
+
+# Images catalog on a local directory tree, with the same layout as the bucket (e.g.: 'rosary/joyful-mysteries/1/')
+# 'base' turns a key into the image location (its path), and the images are uploaded when sent
+class DirectoryCatalog():
+    # Init func
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.base = self.root + os.sep
+
+    # Listing the files keys, as relative paths with '/' separators
+    def keys(self):
+        keys = []
+        for directory, _, files in os.walk(self.root):
+            relative = os.path.relpath(directory, self.root).replace(os.sep, '/')
+            prefix = '' if relative == '.' else relative + '/'
+            keys.extend(prefix + name for name in files if not name.startswith('.'))
+        return sorted(keys)
+
+# Prayers on a DynamoDB table, as items with 'field' and 'value'
+class DynamoDBPrayers():
+    # Init func
+    def __init__(self, session, table, region, endpoint_url=None):
+        self.session = session
+        self.table = table
+        self.region = region
+        self.endpoint_url = endpoint_url
+
+    # Loading the prayers, as {field: value}
+    def load(self):
+        # Initializing DynamoDB instance and getting table
+        dynamodb = self.session.resource('dynamodb', region_name=self.region, endpoint_url=self.endpoint_url)
+        scan = dynamodb.Table(self.table).scan()
+        return {item['field']: item['value'] for item in scan['Items']}
+
+# Prayers on a local JSON file, with the same {field: value} object as the DynamoDB table
+class JsonPrayers():
+    # Init func
+    def __init__(self, path):
+        self.path = path
+
+    # Loading the prayers, as {field: value}
+    def load(self):
+        with open(self.path, encoding='utf-8') as file: return json.load(file)
+
+# Aspirations on the MySQL 'aspirations' table
+# 'connect' must return a connection (e.g.: from the bot's pool)
+class MySQLAspirations():
+    # Init func
+    def __init__(self, connect):
+        import mysql.connector
+        self.connect = connect
+        # Errors which keep the last loaded aspirations
+        self.errors = mysql.connector.Error
+
+    # Loading the aspirations, as (id, text, tags) rows
+    def load(self):
+        # Opening the connection
+        connection = self.connect()
+        try:
+            # Getting cursor and executing query
+            cursor = connection.cursor()
+            cursor.execute("SELECT id, text, tags FROM aspirations;")
+            rows = cursor.fetchall()
+            cursor.close()
+            return rows
+        # Finally, we close the connection
+        finally:
+            if (connection.is_connected()):
+                connection.close()
+                logger.debug('Conexão com o servidor MySQL encerrada', extra={'event': 'mysql_connection_closed'})
+
+# Aspirations on a local SQLite database, with the same 'aspirations' table
+class SQLiteAspirations():
+    errors = sqlite3.Error
+
+    # Init func
+    def __init__(self, path):
+        self.path = path
+
+    # Loading the aspirations, as (id, text, tags) rows
+    def load(self):
+        # Read-only, so a missing database is an error instead of a new empty file
+        connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try: return connection.execute("SELECT id, text, tags FROM aspirations ORDER BY id;").fetchall()
+        finally: connection.close()
+
+# Available backends for each content
+CATALOGS = ('s3', 'directory')
+PRAYERS = ('dynamodb', 'json')
+ASPIRATIONS = ('mysql', 'sqlite')
+
+# Function to create the AWS session, only when an AWS backend is used
+def get_aws_session():
+    import boto3
+    return boto3.Session(
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+    )
+
+# Function to create the content backends chosen on the environment variables, as (catalog, prayers, aspirations)
+# 'connect' returns a MySQL connection, used by the 'mysql' aspirations backend
+def from_env(connect):
+    catalog_name = os.getenv('CATALOG_BACKEND') or 's3'
+    prayers_name = os.getenv('PRAYERS_BACKEND') or 'dynamodb'
+    aspirations_name = os.getenv('ASPIRATIONS_BACKEND') or 'mysql'
+    if (catalog_name not in CATALOGS): raise ValueError(f"Unknown catalog backend: {catalog_name}")
+    if (prayers_name not in PRAYERS): raise ValueError(f"Unknown prayers backend: {prayers_name}")
+    if (aspirations_name not in ASPIRATIONS): raise ValueError(f"Unknown aspirations backend: {aspirations_name}")
+    # A custom endpoint may be set to use local S3/DynamoDB emulators (e.g.: for the benchmarks)
+    endpoint_url = os.getenv('AWS_ENDPOINT_URL') or None
+    session = get_aws_session() if (catalog_name == 's3' or prayers_name == 'dynamodb') else None
+    local_dir = os.getenv('LOCAL_CONTENT_DIR') or 'content'
+    if (catalog_name == 's3'):
+        catalog = S3Catalog(session, os.getenv('AWS_BUCKET'), os.getenv('AWS_REGION'), endpoint_url)
+    else: catalog = DirectoryCatalog(os.path.join(local_dir, 'images'))
+    if (prayers_name == 'dynamodb'):
+        prayers = DynamoDBPrayers(session, 'opus-bot', os.getenv('AWS_REGION'), endpoint_url)
+    else: prayers = JsonPrayers(os.path.join(local_dir, 'prayers.json'))
+    if (aspirations_name == 'mysql'): aspirations = MySQLAspirations(connect)
+    else: aspirations = SQLiteAspirations(os.path.join(local_dir, 'aspirations.sqlite3'))
+    return catalog, prayers, aspirations
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 17:00:00 2026
+
+@author: Renato Henz
+
+Content loading time for each backend: the local ones (directory tree, JSON file and
+SQLite database) and, with '--cloud', S3 and DynamoDB emulated by the fake cloud server
+(with the given latency for each request)
+
+    python -m benchmarks.backends_benchmark --images-per-folder 50 --repeat 50 --cloud --latency-ms 20
+
+"""
+
+# Main dependencies
+import argparse, json, os, tempfile, time
+
+# Content backends and stand-ins
+import backends
+from benchmarks import standins
+from benchmarks.run_benchmarks import percentiles
+
+# Function to measure the time taken to load a content
+def measure(load, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = load()
+        latencies.append(time.perf_counter() - start)
+    stats = percentiles(latencies)
+    stats['items'] = len(result)
+    return stats
+
+# Function to parse the command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description='Content loading time for each backend')
+    parser.add_argument('--images-per-folder', type=int, default=50, help='Synthetic images on each catalog folder')
+    parser.add_argument('--repeat', type=int, default=50, help='Loads of each content')
+    parser.add_argument('--cloud', action='store_true', help='Also load from the S3/DynamoDB stand-in (needs boto3)')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Stand-in latency for each cloud request (milliseconds)')
+    parser.add_argument('--output', help='Results file (JSON)')
+    return parser.parse_args()
+
+# Main script function
+def main():
+    args = parse_args()
+    results = {'images_per_folder': args.images_per_folder, 'repeat': args.repeat}
+    with tempfile.TemporaryDirectory() as directory:
+        standins.create_local_content(directory, args.images_per_folder)
+        results['directory'] = measure(backends.DirectoryCatalog(os.path.join(directory, 'images')).keys, args.repeat)
+        results['json'] = measure(backends.JsonPrayers(os.path.join(directory, 'prayers.json')).load, args.repeat)
+        results['sqlite'] = measure(backends.SQLiteAspirations(os.path.join(directory, 'aspirations.sqlite3')).load, args.repeat)
+    if args.cloud:
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'bench')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'bench')
+        cloud = standins.FakeCloud('bench-bucket', standins.synthetic_catalog(args.images_per_folder),
+                                   standins.synthetic_prayers(), args.latency_ms / 1000).start()
+        session = backends.get_aws_session()
+        results['s3'] = measure(backends.S3Catalog(session, cloud.bucket, 'us-east-1', cloud.url).keys, args.repeat)
+        results['dynamodb'] = measure(backends.DynamoDBPrayers(session, 'opus-bot', 'us-east-1', cloud.url).load, args.repeat)
+        cloud.stop()
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file: json.dump(results, file, indent=2)
+
+# Executing main script
+if __name__ == '__main__':
+    main()
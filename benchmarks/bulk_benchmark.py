@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 19:00:00 2026
+
+@author: Renato Henz
+
+Fan-out sending benchmark against the fake Bot API server (on its own process, so only
+the sender's CPU is measured): the same photo and caption are sent to every recipient
+by the bot (a request built and serialized for each one) and by the bulk sender (the
+prepared body with only the chat ID swapped in), reporting sends/s, CPU per send and
+latency percentiles
+
+    python -m benchmarks.bulk_benchmark --recipients 5000 --concurrency 16 --latency-ms 20
+
+"""
+
+# Main dependencies
+import argparse, json, multiprocessing, time
+from concurrent.futures import ThreadPoolExecutor
+
+# Local stand-ins, bulk sender and results helpers
+from benchmarks import standins
+from benchmarks.run_benchmarks import percentiles
+import bulk
+
+# Benchmark token, photo and caption
+TOKEN = '123:bench'
+PHOTO = 'https://bucket.example/nossa-senhora/1.jpg'
+
+# Function to run the fake Bot API server on a child process, sending its URL back through the pipe
+def serve(connection, latency):
+    server = standins.FakeBotAPI(latency=latency).start()
+    connection.send(server.url)
+    # Serving until the parent asks to stop
+    connection.recv()
+    server.stop()
+
+# Function to time the sends to every recipient, as the results of a mode
+def measure(recipients, send, workers):
+    latencies, errors = [], [0]
+    # Function to time a send
+    def timed(chat_id):
+        start = time.perf_counter()
+        try: send(chat_id)
+        except Exception: errors[0] += 1
+        latencies.append(time.perf_counter() - start)
+    cpu_start, start = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor: list(executor.map(timed, recipients))
+    duration, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+    return {
+        'sends': len(recipients),
+        'duration_s': round(duration, 3),
+        'sends_per_s': round(len(recipients) / duration, 1),
+        'cpu_per_send_us': round(cpu / len(recipients) * 1e6, 1),
+        'latency_ms': percentiles(latencies),
+        'errors': errors[0],
+    }
+
+# Function to send through the bot, with its own connections pool ('telegram' is only needed for this mode)
+def run_bot(url, args, caption, recipients):
+    from telegram import Bot
+    from telegram.utils.request import Request
+    bot = Bot(TOKEN, base_url=url + '/bot', request=Request(con_pool_size=args.concurrency))
+    send = lambda chat_id: bot.send_photo(chat_id=chat_id, photo=PHOTO, caption=caption, parse_mode='html')
+    return measure(recipients, send, args.concurrency)
+
+# Function to send through the bulk sender, with the request prepared once
+def run_bulk(url, args, caption, recipients):
+    sender = bulk.BulkSender(TOKEN, base_url=url + '/bot', pool_size=args.concurrency, rate_limit=0)
+    prepared = sender.prepare('sendPhoto', photo=PHOTO, caption=caption, parse_mode='html')
+    try: return measure(recipients, lambda chat_id: sender.send(prepared, chat_id), args.concurrency)
+    finally: sender.shutdown()
+
+# Function to measure the body serialization alone: the whole JSON for each recipient or the prepared one
+def run_serialization(caption, recipients):
+    params = {'photo': PHOTO, 'caption': caption, 'parse_mode': 'html'}
+    start = time.perf_counter()
+    for chat_id in recipients: json.dumps(dict(params, chat_id=chat_id)).encode('utf-8')
+    full = time.perf_counter() - start
+    prepared = bulk.PreparedRequest('sendPhoto', params)
+    start = time.perf_counter()
+    for chat_id in recipients: prepared.body(chat_id)
+    swapped = time.perf_counter() - start
+    return {
+        'full_body_us': round(full / len(recipients) * 1e6, 2),
+        'prepared_body_us': round(swapped / len(recipients) * 1e6, 2),
+    }
+
+# Function to parse the command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description='Fan-out sending benchmark (bot vs. bulk sender)')
+    parser.add_argument('--recipients', type=int, default=2000, help='Recipients of the photo')
+    parser.add_argument('--concurrency', type=int, default=16, help='Sending threads and connections of each sender')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Fake Bot API latency (milliseconds)')
+    parser.add_argument('--modes', default='bot,bulk', help='Senders to measure (bot, bulk)')
+    parser.add_argument('--output', help='Results file (JSON)')
+    return parser.parse_args()
+
+# Main script function
+def main():
+    args = parse_args()
+    caption = standins.lorem(120)
+    recipients = list(range(100000, 100000 + args.recipients))
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve, args=(child, args.latency_ms / 1000), daemon=True)
+    server.start()
+    url = parent.recv()
+    modes = {'bot': run_bot, 'bulk': run_bulk}
+    results = {
+        'recipients': args.recipients,
+        'concurrency': args.concurrency,
+        'latency_ms': args.latency_ms,
+        'serialization': run_serialization(caption, recipients),
+    }
+    try:
+        for mode in args.modes.split(','): results[mode] = modes[mode](url, args, caption, recipients)
+    finally:
+        parent.send('stop')
+        server.join(5)
+    if ('bot' in results and 'bulk' in results):
+        results['speedup'] = round(results['bulk']['sends_per_s'] / results['bot']['sends_per_s'], 2)
+        results['cpu_ratio'] = round(results['bulk']['cpu_per_send_us'] / results['bot']['cpu_per_send_us'], 2)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as file: json.dump(results, file, indent=2)
+
+# Executing main script
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 19:00:00 2026
+
+@author: Renato Henz
+
+Media ingestion benchmark: large synthetic files streamed to a temporary uploads
+directory, measuring the throughput, the peak memory (which must not grow with
+the files sizes) and the deduplication and quota cleanup
+
+    python -m benchmarks.ingestion_benchmark --files 16 --size-mb 64 --workers 4
+
+"""
+
+# Main dependencies
+import argparse, json, os, tempfile, time, tracemalloc
+
+# Media ingestion
+import ingestion
+
+# Function to create a synthetic file stream: deterministic chunks, never held in memory at once
+# Files with the same content ID have the same bytes (as the same file sent by different users)
+def synthetic_stream(content_id, size, chunk_size):
+    block = (f"{content_id:08d}".encode() * (chunk_size // 8 + 1))[:chunk_size]
+    sent = 0
+    while sent < size:
+        chunk = block[:min(chunk_size, size - sent)]
+        sent += len(chunk)
+        yield chunk
+
+# Function to wait for the submitted downloads
+def wait_downloads(pipeline):
+    while pipeline.summary()['downloading'] > 0: time.sleep(0.01)
+
+# Function to parse the command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description='Media ingestion benchmark')
+    parser.add_argument('--files', type=int, default=16, help='Distinct files')
+    parser.add_argument('--size-mb', type=float, default=64, help='Size of each file (MB)')
+    parser.add_argument('--chunk-kb', type=int, default=64, help='Chunk size (KB)')
+    parser.add_argument('--workers', type=int, default=4, help='Download threads')
+    parser.add_argument('--quota-files', type=float, default=0.5, help='Quota, as a fraction of the distinct files total size')
+    parser.add_argument('--output', help='Results file (JSON)')
+    return parser.parse_args()
+
+# Main script function
+def main():
+    args = parse_args()
+    size = int(args.size_mb * 1024 ** 2)
+    chunk_size = args.chunk_kb * 1024
+    # File IDs as 'file:<content ID>:<copy>', so some of them repeat the same content
+    fetch = lambda file_id: ('documents/file.bin', synthetic_stream(int(file_id.split(':')[1]), size, chunk_size))
+    with tempfile.TemporaryDirectory() as root:
+        pipeline = ingestion.Ingestion(
+            root, fetch,
+            quota_bytes=int(args.files * size * args.quota_files),
+            max_file_bytes=size, workers=args.workers, max_pending=args.files * 3,
+        )
+        tracemalloc.start()
+        start = time.perf_counter()
+        # Each content is sent twice with different unique IDs (deduplicated by their hash)
+        for content_id in range(args.files):
+            for copy in range(2):
+                pipeline.submit('document', f"file:{content_id}:{copy}", f"unique:{content_id}:{copy}", size)
+        wait_downloads(pipeline)
+        # Then the first ones are sent again (deduplicated by their unique ID, unless removed by the quota)
+        for content_id in range(args.files):
+            pipeline.submit('document', f"file:{content_id}:0", f"unique:{content_id}:0", size)
+        wait_downloads(pipeline)
+        pipeline.shutdown()
+        elapsed = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        summary = pipeline.summary()
+        stored = sum(os.path.getsize(os.path.join(root, path)) for path in pipeline.sizes)
+    results = {
+        'files': args.files,
+        'file_size_mb': args.size_mb,
+        'workers': args.workers,
+        'duration_s': round(elapsed, 3),
+        'throughput_mb_s': round(summary['downloaded_bytes'] / 1024 ** 2 / elapsed, 1),
+        'peak_memory_mb': round(peak / 1024 ** 2, 2),
+        'stored_mb': round(stored / 1024 ** 2, 1),
+        'summary': summary,
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file: json.dump(results, file, indent=2)
+
+# Executing main script
+if __name__ == '__main__':
+    main()
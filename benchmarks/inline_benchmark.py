@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 17:00:00 2026
+
+@author: Renato Henz
+
+Inline queries benchmark: users typing queries letter by letter (as Telegram sends
+them) at a target rate, with popular queries repeating, over a synthetic corpus
+
+    python -m benchmarks.inline_benchmark --rate 200 --duration 10
+
+"""
+
+# Main dependencies
+import argparse, json, random, time
+
+# Inline index, synthetic corpus and results helpers
+import inline
+from benchmarks.run_benchmarks import percentiles
+from benchmarks.search_benchmark import synthetic_documents
+
+# Function to create the typed queries: prefixes of titles and words, picked with a Zipf-like popularity
+def typed_queries(documents, sessions, seed=0):
+    rng = random.Random(seed)
+    targets = sorted({title for title, text in documents.values() if title != 'Jaculatória'})
+    targets += sorted({word for title, text in documents.values() for word in text.split() if len(word) > 4})[:200]
+    weights = [1 / (rank + 1) for rank in range(len(targets))]
+    for _ in range(sessions):
+        target = rng.choices(targets, weights)[0]
+        # Telegram sends an update for (almost) every letter typed
+        for size in range(1, min(len(target), 12) + 1):
+            if size == 1 or rng.random() < 0.8: yield target[:size]
+
+# Function to parse the command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description='Inline queries benchmark')
+    parser.add_argument('--aspirations', type=int, default=2000, help='Synthetic aspirations on the corpus')
+    parser.add_argument('--rate', type=float, default=200, help='Inline queries per second (0 for no limit)')
+    parser.add_argument('--duration', type=float, default=10, help='Duration (seconds)')
+    parser.add_argument('--cache-size', type=int, default=1024, help='Results cache size')
+    parser.add_argument('--output', help='Results file (JSON)')
+    return parser.parse_args()
+
+# Main script function
+def main():
+    args = parse_args()
+    documents = synthetic_documents(args.aspirations)
+    index = inline.InlineIndex(cache_size=args.cache_size)
+    start = time.perf_counter()
+    index.build({doc_id: (title, text if doc_id.startswith('jaculatoria:') else title) for doc_id, (title, text) in documents.items()})
+    build = time.perf_counter() - start
+    # Replaying the typed queries at the target rate
+    hits, misses = [], []
+    interval = 1 / args.rate if args.rate > 0 else 0
+    begin = next_time = time.perf_counter()
+    for query in typed_queries(documents, sessions=10 ** 7):
+        now = time.perf_counter()
+        if (now - begin >= args.duration): break
+        if (next_time > now): time.sleep(next_time - now)
+        next_time += interval
+        cached = index.hits
+        start = time.perf_counter()
+        index.search(query)
+        (hits if index.hits > cached else misses).append(time.perf_counter() - start)
+    duration = time.perf_counter() - begin
+    results = {
+        'items': len(index),
+        'build_s': round(build, 4),
+        'queries': len(hits) + len(misses),
+        'queries_per_s': round((len(hits) + len(misses)) / duration, 1),
+        'cache_hit_rate': round(len(hits) / max(1, len(hits) + len(misses)), 3),
+        'latency_ms': percentiles(hits + misses),
+        'hit_latency_ms': percentiles(hits),
+        'miss_latency_ms': percentiles(misses),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file: json.dump(results, file, indent=2)
+
+# Executing main script
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 15:00:00 2026
+
+@author: Renato Henz
+
+Synthetic updates load generator, feeding the dispatcher built by 'run.create_updater'
+
+Virtual users run scripted sessions ('/start', '/terco', '/rosario' with the mysteries
+button, '/registrar_servicos' with a service button and media messages), each one
+waiting for the bot's replies before the next step, as real users would. Several
+target rates can be swept in a single run to find where the handlers saturate:
+
+    python -m benchmarks.load_generator --rates 5,10,20,40 --duration 30 --concurrency 50
+
+"""
+
+# Main dependencies
+import argparse, itertools, json, os, random, tempfile, threading, time
+from datetime import datetime
+
+# Local stand-ins and results helpers
+from benchmarks import standins
+from benchmarks.run_benchmarks import bench_environment, percentiles
+
+# Sessions scripts, as lists of (update kind, payload, expected replies to the user's chat)
+SESSIONS = {
+    'start': [('command', '/start', 1)],
+    'terco': [('command', '/terco', 9)],
+    'rosario': [('command', '/rosario', 1), ('callback', 'gozosos', 6)],
+    'servicos': [('command', '/registrar_servicos', 1), ('callback', 'registrar_angelus_regina_caeli', 1)],
+    'midia': [('photo', None, 1)],
+}
+DEFAULT_MIX = 'start=1,terco=3,rosario=2,servicos=2,midia=1'
+
+# Pacing shared by all virtual users, to keep the target updates rate
+class RateLimiter():
+    # Init func
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    # Waiting for the next update slot
+    def acquire(self):
+        if self.interval == 0: return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_time, now)
+            self.next_time = slot + self.interval
+        if slot > now: time.sleep(slot - now)
+
+# Updates factory, creating Bot API update payloads
+class UpdateFactory():
+    # Init func
+    def __init__(self, bot):
+        self.bot = bot
+        self.update_ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    # Base user and chat for a virtual user
+    def user(self, chat_id):
+        return {'id': chat_id, 'is_bot': False, 'first_name': f"Usuário {chat_id}", 'language_code': 'pt-br'}
+
+    # Creating an update of the provided kind
+    def create(self, kind, payload, chat_id):
+        from telegram import Update
+        with self.lock: update_id = next(self.update_ids)
+        chat = {'id': chat_id, 'type': 'private', 'first_name': f"Usuário {chat_id}"}
+        message = {'message_id': update_id, 'date': int(time.time()), 'chat': chat, 'from': self.user(chat_id)}
+        if kind == 'command':
+            message.update(text=payload, entities=[{'type': 'bot_command', 'offset': 0, 'length': len(payload)}])
+            data = {'update_id': update_id, 'message': message}
+        elif kind == 'photo':
+            message['photo'] = [{'file_id': f"upload-{update_id}", 'file_unique_id': f"u-upload-{update_id}", 'width': 640, 'height': 480}]
+            data = {'update_id': update_id, 'message': message}
+        # Buttons clicks on the message previously sent by the bot
+        else:
+            message.update({'from': {'id': 1, 'is_bot': True, 'first_name': 'Opus'}, 'text': '...'})
+            data = {'update_id': update_id, 'callback_query': {
+                'id': str(update_id), 'from': self.user(chat_id), 'chat_instance': str(chat_id),
+                'data': payload, 'message': message,
+            }}
+        return Update.de_json(data, self.bot)
+
+# Virtual user, running sessions until the stage ends
+def virtual_user(stage, api, factory, update_queue, chat_ids, mix, timeout):
+    names, weights = zip(*mix.items())
+    rng = random.Random()
+    while time.monotonic() < stage['end']:
+        name = rng.choices(names, weights)[0]
+        chat_id = next(chat_ids)
+        received = 0
+        for kind, payload, replies in SESSIONS[name]:
+            stage['limiter'].acquire()
+            if time.monotonic() >= stage['end']: return
+            sent_at = time.time()
+            update_queue.put(factory.create(kind, payload, chat_id))
+            times = api.wait_replies(chat_id, received + replies, timeout)
+            with stage['lock']:
+                stage['updates'] += 1
+                # The whole session is dropped after a missing reply
+                if len(times) < received + replies:
+                    stage['timeouts'] += 1
+                    break
+                stage['first_reply'].append(times[received] - sent_at)
+                stage['complete'].append(times[received + replies - 1] - sent_at)
+                stage['by_session'].setdefault(name, []).append(times[received] - sent_at)
+            received += replies
+
+# Function to run a load stage at a target rate, returning its results
+def run_stage(rate, args, api, factory, update_queue, chat_ids, mix):
+    import metrics
+    errors_before = sum(metrics.HANDLER_ERRORS.values.values())
+    stage = {
+        'end': time.monotonic() + args.duration, 'limiter': RateLimiter(rate), 'lock': threading.Lock(),
+        'updates': 0, 'timeouts': 0, 'first_reply': [], 'complete': [], 'by_session': {},
+    }
+    start = time.perf_counter()
+    users = [threading.Thread(target=virtual_user, args=(stage, api, factory, update_queue, chat_ids, mix, args.reply_timeout), daemon=True)
+             for _ in range(args.concurrency)]
+    for user in users: user.start()
+    for user in users: user.join()
+    duration = time.perf_counter() - start
+    return {
+        'target_rate': rate or None,
+        'updates': stage['updates'],
+        'updates_per_s': round(stage['updates'] / duration, 2),
+        'first_reply_ms': percentiles(stage['first_reply']),
+        'complete_reply_ms': percentiles(stage['complete']),
+        'first_reply_p50_ms_by_session': {name: percentiles(values).get('p50') for name, values in sorted(stage['by_session'].items())},
+        'timeouts': stage['timeouts'],
+        'handler_errors': sum(metrics.HANDLER_ERRORS.values.values()) - errors_before,
+    }
+
+# Function to parse the sessions mix ('name=weight,...')
+def parse_mix(text):
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        if name.strip() not in SESSIONS: raise SystemExit(f"Unknown session: {name.strip()}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+# Function to parse the command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description='Synthetic updates load generator for the Opus Bot dispatcher')
+    parser.add_argument('--rates', default='10', help='Comma separated target rates (updates/second, 0 for no limit), one stage each')
+    parser.add_argument('--duration', type=float, default=30, help='Duration of each stage (seconds)')
+    parser.add_argument('--concurrency', type=int, default=20, help='Concurrent virtual users')
+    parser.add_argument('--workers', type=int, default=4, help='Dispatcher worker threads')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Sessions weights: ' + ', '.join(SESSIONS))
+    parser.add_argument('--subscribers', type=int, default=1000, help='Existing users on the database')
+    parser.add_argument('--queue-burst', type=int, default=30, help='Messages queue burst limit')
+    parser.add_argument('--queue-window-ms', type=int, default=1000, help='Messages queue time window (ms)')
+    parser.add_argument('--api-latency-ms', type=float, default=5, help='Fake Bot API latency')
+    parser.add_argument('--api-jitter-ms', type=float, default=2, help='Fake Bot API latency jitter')
+    parser.add_argument('--api-429-rate', type=float, default=0, help='Fraction of Bot API requests answered with 429')
+    parser.add_argument('--cloud-latency-ms', type=float, default=20, help='Fake S3/DynamoDB/websites latency')
+    parser.add_argument('--reply-timeout', type=float, default=30, help='Maximum wait for the replies of an update (seconds)')
+    parser.add_argument('--output', help='Results file (JSON)')
+    return parser.parse_args()
+
+# Main script function
+def main():
+    args = parse_args()
+    mix = parse_mix(args.mix)
+    # Starting the stand-ins and pointing the bot to them
+    api = standins.FakeBotAPI(latency=args.api_latency_ms / 1000, jitter=args.api_jitter_ms / 1000, error_rate=args.api_429_rate).start()
+    api.track_replies = True
+    cloud = standins.FakeCloud('opus-bot-bucket', standins.synthetic_catalog(), standins.synthetic_prayers(), args.cloud_latency_ms / 1000).start()
+    work_dir = tempfile.mkdtemp()
+    db_path = os.path.join(work_dir, 'load.sqlite3')
+    standins.create_database(db_path, args.subscribers, ('santo',))
+    os.environ.update(bench_environment(api, cloud, db_path))
+    standins.install_mysql_standin(db_path)
+    standins.redirect_requests(cloud.url)
+    # Loading the bot and starting its dispatcher, the updates are fed directly to its queue
+    import run
+    run.warm_up_content()
+    run.schedule_services()
+    run.bot = run.create_bot(args.queue_burst, args.queue_window_ms)
+    updater = run.create_updater(run.bot, workers=args.workers)
+    dispatcher = updater.dispatcher
+    threading.Thread(target=dispatcher.start, name='dispatcher', daemon=True).start()
+    factory = UpdateFactory(run.bot)
+    # New users for each session, apart from the existing ones
+    chat_ids = itertools.count(500000)
+    results = {
+        'meta': {'date': datetime.now().isoformat(timespec='seconds'), 'args': vars(args)},
+        'stages': [],
+    }
+    for rate in (float(value) for value in args.rates.split(',')):
+        print(f"Stage: {rate or 'no limit'} updates/s for {args.duration} s...", flush=True)
+        stage = run_stage(rate, args, api, factory, updater.update_queue, chat_ids, mix)
+        results['stages'].append(stage)
+        print(json.dumps(stage, indent=2), flush=True)
+    # Summary table, to spot the saturation point
+    print(f"{'target':>8} {'achieved':>9} {'p50 ms':>9} {'p99 ms':>9} {'timeouts':>9} {'errors':>7}")
+    for stage in results['stages']:
+        print(f"{stage['target_rate'] or '-':>8} {stage['updates_per_s']:>9} {stage['first_reply_ms'].get('p50', '-'):>9} "
+              f"{stage['first_reply_ms'].get('p99', '-'):>9} {stage['timeouts']:>9} {stage['handler_errors']:>7}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file: json.dump(results, file, indent=2)
+        print(f"Results saved to {args.output}")
+    # Background threads (dispatcher, messages queue) must not keep the process alive
+    dispatcher.stop()
+    run.bot._msg_queue.stop()
+    api.stop()
+    cloud.stop()
+    os._exit(0)
+
+# Executing main script
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 20:00:00 2026
+
+@author: Renato Henz
+
+Logging overhead for each broadcast recipient, as seen by the sending thread:
+the former synchronous prints, a synchronous logging handler and the queued
+pipeline (with and without sampling). The output may be slowed down to mimic
+a busy syslog
+
+    python -m benchmarks.logging_benchmark --recipients 20000 --sink-latency-us 50
+
+"""
+
+# Main dependencies
+import argparse, io, json, logging, time
+
+# Logging pipeline and results helpers
+import logs
+from benchmarks.run_benchmarks import percentiles
+
+# Output stream which takes a while for each write (e.g.: a pipe to a busy syslog)
+class SlowSink(io.StringIO):
+    # Init func
+    def __init__(self, latency):
+        super(SlowSink, self).__init__()
+        self.latency = latency
+
+    def write(self, text):
+        if (self.latency > 0): time.sleep(self.latency)
+        return len(text)
+
+# Function to measure the time spent logging each recipient
+def measure(recipients, log):
+    latencies = []
+    for index in range(recipients):
+        start = time.perf_counter()
+        log(index)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+# Function to parse the command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description='Logging overhead per broadcast recipient')
+    parser.add_argument('--recipients', type=int, default=20000, help='Broadcast recipients')
+    parser.add_argument('--sink-latency-us', type=float, default=50, help='Time spent on each write to the output (microseconds)')
+    parser.add_argument('--output', help='Results file (JSON)')
+    return parser.parse_args()
+
+# Main script function
+def main():
+    args = parse_args()
+    sink = SlowSink(args.sink_latency_us / 10 ** 6)
+    logger = logging.getLogger('benchmark')
+    results = {'recipients': args.recipients, 'sink_latency_us': args.sink_latency_us}
+    # Former prints: two lines for each recipient, written (and flushed) by the sending thread
+    def printed(index):
+        print(f"Chat ID: {100000 + index}, Nome: Usuário {index}", file=sink, flush=True)
+        print(f"Mensagem enviada para o usuário Usuário {index} ({100000 + index})", file=sink, flush=True)
+    results['print'] = percentiles(measure(args.recipients, printed))
+    # Synchronous logging handler
+    logging.basicConfig(stream=sink, level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', force=True)
+    log = lambda index: logger.info('Mensagem de broadcast enviada', extra={'event': 'broadcast_sent', 'chat_id': 100000 + index})
+    results['logging_sync'] = percentiles(measure(args.recipients, log))
+    # Queued pipeline, as JSON, without and with sampling
+    for name, sampling in (('pipeline', None), ('pipeline_sampled', {'broadcast_sent': 0.01})):
+        listener = logs.setup(stream=sink, sampling=sampling)
+        with logs.correlated('update:1'):
+            latencies = measure(args.recipients, log)
+        start = time.perf_counter()
+        listener.stop()
+        results[name] = percentiles(latencies)
+        results[name]['drain_s'] = round(time.perf_counter() - start, 3)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file: json.dump(results, file, indent=2)
+
+# Executing main script
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 11:00:00 2026
+
+@author: Renato Henz
+
+Images mirror benchmark: synthetic camera-sized images are mirrored to a temporary
+directory, reporting the bytes saved by the Telegram variants, the time to create
+them and the transfer time of the originals and the variants at a given bandwidth
+(what Telegram fetches by URL before, and what the bot uploads after)
+
+    python -m benchmarks.media_benchmark --images 20 --bandwidth-mbps 20
+
+"""
+
+# Main dependencies
+import argparse, json, os, random, shutil, tempfile, time
+
+# Images processing, images mirror and results helpers
+from PIL import Image, ImageFilter
+import media
+from benchmarks.run_benchmarks import percentiles
+
+# Function to create a synthetic photo: a blurred noise over a gradient, which compresses like a real one
+def synthetic_image(path, width, height, seed):
+    rng = random.Random(seed)
+    image = Image.effect_noise((width // 4, height // 4), 64).convert('RGB').resize((width, height))
+    gradient = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    image = Image.blend(image, gradient, rng.uniform(0.3, 0.7)).filter(ImageFilter.GaussianBlur(1))
+    image.save(path, 'JPEG', quality=95)
+
+# Function to parse the command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description='Images mirror benchmark')
+    parser.add_argument('--images', type=int, default=20, help='Synthetic images')
+    parser.add_argument('--width', type=int, default=4032, help='Images width (pixels)')
+    parser.add_argument('--height', type=int, default=3024, help='Images height (pixels)')
+    parser.add_argument('--bandwidth-mbps', type=float, default=20, help='Bandwidth used to estimate the transfer times (Mbit/s)')
+    parser.add_argument('--output', help='Results file (JSON)')
+    return parser.parse_args()
+
+# Main script function
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as root:
+        # Synthetic originals, "downloaded" by copying them
+        sources = {}
+        for index in range(args.images):
+            sources[f"https://bucket.example/rosary/joyful-mysteries/{index % 5 + 1}/{index}.jpg"] = path = os.path.join(root, f"{index}.jpg")
+            synthetic_image(path, args.width, args.height, index)
+        mirror = media.Mirror(os.path.join(root, 'mirror'), lambda url, path: shutil.copyfile(sources[url], path))
+        start = time.perf_counter()
+        mirror.sync(list(sources))
+        elapsed = time.perf_counter() - start
+        summary = mirror.summary()
+        entries = list(mirror.entries.values())
+    bytes_per_second = args.bandwidth_mbps * 1000 ** 2 / 8
+    results = {
+        'images': args.images,
+        'size': f"{args.width}x{args.height}",
+        'mirror_s': round(elapsed, 3),
+        'mirror_per_image_ms': round(elapsed / max(1, args.images) * 1000, 1),
+        'original_mb': round(summary['original_bytes'] / 1024 ** 2, 2),
+        'variant_mb': round(summary['variant_bytes'] / 1024 ** 2, 2),
+        'saved_ratio': summary['saved_ratio'],
+        'transfer_before_ms': percentiles([entry['original_bytes'] / bytes_per_second for entry in entries]),
+        'transfer_after_ms': percentiles([entry['variant_bytes'] / bytes_per_second for entry in entries]),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file: json.dump(results, file, indent=2)
+
+# Executing main script
+if __name__ == '__main__':
+    main()
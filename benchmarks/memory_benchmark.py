@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 14:00:00 2026
+
+@author: Renato Henz
+
+Memory footprint benchmark: memory held by the timing wheel for each 10k subscribers
+and by the images list and aspirations for a synthetic catalog, measured with
+tracemalloc (Python allocations) and the process RSS
+
+    python -m benchmarks.memory_benchmark --subscribers 100000 --images 5000 --aspirations 5000
+
+"""
+
+# Main dependencies
+import argparse, gc, json, random, tracemalloc
+
+# Timing wheel, content and memory helpers
+import delivery, memory, opus
+from benchmarks import standins
+
+# Time zones used by the synthetic subscribers (most of them on the default one)
+TIME_ZONES = ('America/Sao_Paulo',) * 8 + ('Europe/Lisbon', 'America/New_York')
+
+# Function to measure the memory held by the objects built by a function, as (result, traced bytes, RSS bytes)
+def measure(build):
+    gc.collect()
+    rss = memory.get_rss()
+    start = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    return result, tracemalloc.get_traced_memory()[0] - start, memory.get_rss() - rss
+
+# Function to create the synthetic subscriptions: every user gets the saint, most get the Angelus and a few the aspirations
+def synthetic_subscriptions(subscribers, seed=0):
+    rng = random.Random(seed)
+    for index in range(subscribers):
+        chat_id, time_zone = 100000000 + index, rng.choice(TIME_ZONES)
+        yield delivery.Subscription(str(chat_id), 'santo', time_zone)
+        if (rng.random() < 0.7): yield delivery.Subscription(str(chat_id), 'angelus_regina_caeli', time_zone)
+        if (rng.random() < 0.3): yield delivery.Subscription(str(chat_id), 'jaculatoria', time_zone, '07:00,13:00,19:00')
+
+# Function to create the synthetic bucket images URLs, as listed by S3
+def synthetic_images(images):
+    directories = [f"rosary/{name}-mysteries/{number}/" for name in opus.MYSTERIES_PATHS.values() for number in range(1, 6)]
+    directories += ['nossa-senhora/', 'santos/', 'diversos/']
+    return [f"{opus.img_path_base}{directories[index % len(directories)]}imagem-{index:06d}.jpg" for index in range(images)]
+
+# Function to parse the command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description='Memory footprint benchmark')
+    parser.add_argument('--subscribers', type=int, default=100000, help='Synthetic subscribers')
+    parser.add_argument('--images', type=int, default=5000, help='Synthetic bucket images')
+    parser.add_argument('--aspirations', type=int, default=5000, help='Synthetic aspirations')
+    parser.add_argument('--output', help='Results file (JSON)')
+    return parser.parse_args()
+
+# Main script function
+def main():
+    args = parse_args()
+    tracemalloc.start()
+    rng = random.Random(0)
+    # Timing wheel
+    def build_wheel():
+        wheel = delivery.TimingWheel()
+        wheel.add_many(synthetic_subscriptions(args.subscribers))
+        return wheel
+    wheel, wheel_traced, wheel_rss = measure(build_wheel)
+    # Images list, as loaded from the bucket
+    urls = synthetic_images(args.images)
+    images, images_traced, images_rss = measure(lambda: opus.compact_images(list(urls)))
+    del urls
+    # Aspirations
+    texts = [standins.lorem(rng.randint(6, 30), rng) for _ in range(args.aspirations)]
+    aspirations, aspirations_traced, aspirations_rss = measure(
+        lambda: [opus.Aspiration(index, text, None) for index, text in enumerate(texts)])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    per_10k = 10000 / max(1, args.subscribers)
+    results = {
+        'subscribers': args.subscribers,
+        'subscriptions': len(wheel),
+        'wheel_mb': round(wheel_traced / 1024 ** 2, 2),
+        'wheel_per_10k_subscribers_mb': round(wheel_traced * per_10k / 1024 ** 2, 3),
+        'wheel_rss_per_10k_subscribers_mb': round(wheel_rss * per_10k / 1024 ** 2, 3),
+        'images': len(images),
+        'images_kb': round(images_traced / 1024, 1),
+        'aspirations': len(aspirations),
+        'aspirations_kb': round(aspirations_traced / 1024, 1),
+        'traced_peak_mb': round(peak / 1024 ** 2, 2),
+        'rss_mb': round(memory.get_rss() / 1024 ** 2, 1),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file: json.dump(results, file, indent=2)
+
+# Executing main script
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 11:00:00 2026
+
+@author: Renato Henz
+
+Offline benchmarks for the bot, running against the local stand-ins
+
+Each scenario runs on a fresh process, so imports and caches start cold, and the
+results (throughput and latency percentiles) are written to a JSON file that can
+be compared with a previous run:
+
+    python -m benchmarks.run_benchmarks --output new.json --compare old.json
+
+"""
+
+# Main dependencies
+import argparse, json, os, subprocess, sys, tempfile, threading, time, platform, urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+# Local stand-ins
+from benchmarks import standins
+
+# Available scenarios, in the default running order
+# 'restart' reuses the content snapshot saved by 'startup'
+SCENARIOS = ('startup', 'restart', 'fanout', 'broadcast', 'terco')
+
+# Function to compute latency percentiles (milliseconds) from a list of durations (seconds)
+def percentiles(values):
+    if len(values) == 0: return {}
+    values = sorted(values)
+    def pick(fraction): return round(values[min(len(values) - 1, int(fraction * len(values)))] * 1000, 3)
+    return {
+        'mean': round(sum(values) / len(values) * 1000, 3),
+        'p50': pick(0.50),
+        'p90': pick(0.90),
+        'p95': pick(0.95),
+        'p99': pick(0.99),
+        'max': round(values[-1] * 1000, 3),
+    }
+
+# Function to summarize a scenario run
+def summarize(count, duration, latencies, errors=0, **extra):
+    summary = {
+        'count': count,
+        'duration_s': round(duration, 3),
+        'throughput_per_s': round(count / duration, 2) if duration > 0 else None,
+        'latency_ms': percentiles(latencies),
+        'errors': errors,
+    }
+    summary.update(extra)
+    return summary
+
+# Function to get the fake Bot API statistics
+def get_api_stats():
+    with urllib.request.urlopen(os.environ['BENCH_API_URL'] + '/_stats') as response:
+        return json.loads(response.read())
+
+# Function to clear the fake Bot API statistics
+def reset_api_stats():
+    request = urllib.request.Request(os.environ['BENCH_API_URL'] + '/bot/_reset', data=b'{}', headers={'Content-Type': 'application/json'})
+    urllib.request.urlopen(request).read()
+
+# Function to wait until the fake Bot API received a number of requests for a method
+def wait_for_requests(method, count, timeout):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        stats = get_api_stats()
+        if stats['requests'].get(method, 0) >= count: return stats
+        time.sleep(0.1)
+    return get_api_stats()
+
+# Function to create a fake text message update
+def fake_update(bot, update_id, chat_id, text):
+    from telegram import Update
+    return Update.de_json({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private', 'first_name': 'Bench'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Bench', 'language_code': 'pt-br'},
+            'text': text,
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}] if text.startswith('/') else [],
+        },
+    }, bot)
+
+# Function to prepare a child process: stand-ins and the bot modules
+def setup_child():
+    standins.install_mysql_standin(os.environ['BENCH_DB'])
+    standins.redirect_requests(os.environ['BENCH_CLOUD_URL'])
+
+# Scenario: startup, as in 'run.main' (without polling): time until the bot answers and until the content is loaded
+def scenario_startup(args):
+    import warmup
+    timeline = warmup.timeline
+    import run
+    timeline.record('imports', timeline.start)
+    with timeline.phase('snapshot'): restored = run.restore_content_snapshot()
+    with timeline.phase('schedule_services'): run.schedule_services()
+    with timeline.phase('start_polling'):
+        run.bot = run.create_bot(args.queue_burst, args.queue_window_ms)
+        run.create_updater(run.bot)
+    timeline.mark('serving')
+    pending = run.warm_up_content(timeline)
+    serving = timeline.elapsed('serving')
+    return {
+        'duration_s': round(serving, 3),
+        'serving_s': round(serving, 3),
+        'warm_s': round(timeline.elapsed('warm-up'), 3),
+        'snapshot_restored': restored,
+        'pending_sources': pending,
+        'over_budget': serving > args.startup_budget,
+        'phases': timeline.as_dict(),
+        'subscriptions': len(run.wheel),
+    }
+
+# Scenario: restart with the content snapshot saved by the 'startup' scenario
+def scenario_restart(args):
+    return scenario_startup(args)
+
+# Scenario: Angelus fan-out to every subscriber, through the timing wheel
+def scenario_fanout(args):
+    import run, delivery
+    run.warm_up_content()
+    run.bot = run.create_bot(args.queue_burst, args.queue_window_ms)
+    run.schedule_services()
+    # Moving every subscription to a window that is already due, so the drain doesn't wait
+    now = datetime.now(timezone.utc)
+    slot = (now - timedelta(minutes=delivery.DELIVERY_WINDOWS['angelus_regina_caeli'] + 2)).strftime('%H:%M')
+    for chat_id, service_type in list(run.wheel.subscriptions):
+        run.wheel.add(delivery.Subscription(chat_id, service_type, 'UTC', slot))
+    run.wheel.last_tick['UTC'] = now.replace(second=0, microsecond=0, tzinfo=None) - timedelta(minutes=30)
+    deliveries = run.wheel.due(now)
+    reset_api_stats()
+    # Sending through the same drain used in production, timing each delivery
+    latencies, errors = [], [0]
+    def send(chat_id, service_type, due_at):
+        send_start = time.perf_counter()
+        try: run.deliver_service(chat_id, service_type, due_at)
+        except Exception:
+            errors[0] += 1
+            raise
+        finally: latencies.append(time.perf_counter() - send_start)
+    start = time.perf_counter()
+    delivery.drain(deliveries, send, args.rate)
+    duration = time.perf_counter() - start
+    run.bot._msg_queue.stop()
+    return summarize(len(deliveries), duration, latencies, errors[0], api_errors=get_api_stats()['errors'])
+
+# Scenario: admin broadcast to every user, through the messages queue
+def scenario_broadcast(args):
+    import run
+    run.bot = run.create_bot(args.queue_burst, args.queue_window_ms)
+    update = fake_update(run.bot, 1, run.admin_chat_id, '#BROADCAST: Olá, [USER]! Mensagem de teste.')
+    users = len(run.get_users())
+    reset_api_stats()
+    start_epoch, start = time.time(), time.perf_counter()
+    run.broadcast(update, None)
+    enqueued = time.perf_counter() - start
+    # Waiting for the queue to deliver every message
+    stats = wait_for_requests('sendMessage', users, args.timeout)
+    duration = time.perf_counter() - start
+    latencies = [reply - start_epoch for chat_id, reply in stats['last_reply'].items() if chat_id != str(run.admin_chat_id)]
+    run.bot._msg_queue.stop()
+    return summarize(
+        stats['requests'].get('sendMessage', 0), duration, latencies,
+        users - len(latencies), enqueue_s=round(enqueued, 3), api_errors=stats['errors'],
+    )
+
+# Scenario: burst of '/terco' commands from different users
+def scenario_terco(args):
+    import run
+    run.warm_up_content()
+    run.bot = run.create_bot(args.queue_burst, args.queue_window_ms)
+    updates = [fake_update(run.bot, index, 200000 + index, '/terco') for index in range(args.terco_updates)]
+    reset_api_stats()
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    # Running the handler as the dispatcher would
+    def handle(update):
+        handle_start = time.perf_counter()
+        try: run.send_rosary(update, None)
+        except Exception:
+            with lock: errors[0] += 1
+        finally:
+            with lock: latencies.append(time.perf_counter() - handle_start)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(handle, updates))
+    handled = time.perf_counter() - start
+    # The text messages go through the queue, so we wait for them too (4 per update)
+    stats = wait_for_requests('sendMessage', 4 * len(updates), args.timeout)
+    duration = time.perf_counter() - start
+    run.bot._msg_queue.stop()
+    return summarize(len(updates), duration, latencies, errors[0], handlers_s=round(handled, 3), api_errors=stats['errors'])
+
+# Function to run a scenario on the current (child) process
+def run_child(args):
+    setup_child()
+    result = globals()[f"scenario_{args.child}"](args)
+    with open(args.child_output, 'w', encoding='utf-8') as file: json.dump(result, file)
+    # Background threads (messages queue, HTTP pools) must not keep the process alive
+    sys.stdout.flush()
+    os._exit(0)
+
+# Function to get the environment variables pointing the bot to the stand-ins
+def bench_environment(api, cloud, db_path):
+    return {
+        'TOKEN': '123456:bench', 'ADMIN_CHAT_ID': '1', 'ADMIN_CHAT_USERNAME': 'bench',
+        'TELEGRAM_BASE_URL': api.url + '/bot', 'BENCH_API_URL': api.url,
+        'AWS_ENDPOINT_URL': cloud.url, 'BENCH_CLOUD_URL': cloud.url,
+        'AWS_BUCKET': cloud.bucket, 'AWS_REGION': 'us-east-1', 'AWS_DYNAMODB': 'opus-bot',
+        'AWS_ACCESS_KEY_ID': 'bench', 'AWS_SECRET_ACCESS_KEY': 'bench',
+        'BENCH_DB': db_path, 'METRICS_PORT': '',
+        'CONTENT_SNAPSHOT': os.path.join(os.path.dirname(db_path), 'content_snapshot.json'),
+    }
+
+# Function to run a scenario on a fresh process, with its own database
+def run_scenario(name, args, api, cloud, work_dir):
+    db_path = os.path.join(work_dir, f"{name}.sqlite3")
+    # Database contents for each scenario
+    if name in ('startup', 'restart'): standins.create_database(db_path, args.subscribers, ('santo', 'jaculatoria', 'meditacao', 'angelus_regina_caeli'))
+    elif name == 'fanout': standins.create_database(db_path, args.subscribers, ('angelus_regina_caeli',))
+    elif name == 'broadcast': standins.create_database(db_path, args.broadcast_users, ())
+    else: standins.create_database(db_path, 0)
+    output = os.path.join(work_dir, f"{name}.json")
+    env = dict(os.environ, **bench_environment(api, cloud, db_path))
+    command = [sys.executable, '-m', 'benchmarks.run_benchmarks', '--child', name, '--child-output', output]
+    command += sys.argv[1:]
+    process = subprocess.run(command, cwd=standins.ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if process.returncode != 0 or not os.path.exists(output):
+        return {'failed': True, 'stderr': process.stderr[-2000:]}
+    with open(output, encoding='utf-8') as file: return json.load(file)
+
+# Function to print the comparison between two results files
+def compare(old, new):
+    rows = []
+    for name, result in new['scenarios'].items():
+        previous = old.get('scenarios', {}).get(name)
+        if previous is None or result.get('failed') or previous.get('failed'): continue
+        metrics = [('duration_s', result.get('duration_s'), previous.get('duration_s')),
+                   ('throughput_per_s', result.get('throughput_per_s'), previous.get('throughput_per_s'))]
+        for percentile in ('p50', 'p95', 'p99'):
+            metrics.append((f"latency_{percentile}_ms", result.get('latency_ms', {}).get(percentile), previous.get('latency_ms', {}).get(percentile)))
+        for metric, current, before in metrics:
+            if current is None or before is None: continue
+            change = (current - before) / before * 100 if before else 0.0
+            rows.append(f"{name:<10} {metric:<20} {before:>12.3f} -> {current:>12.3f} ({change:+.1f}%)")
+    print('\n'.join(rows) if len(rows) > 0 else 'Nothing to compare.')
+
+# Function to parse the command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description='Offline benchmarks for the Opus Bot')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma separated scenarios: ' + ', '.join(SCENARIOS))
+    parser.add_argument('--output', default='benchmark_results.json', help='Results file (JSON)')
+    parser.add_argument('--compare', help='Previous results file to compare with')
+    parser.add_argument('--subscribers', type=int, default=50000, help='Subscribers for the startup and fan-out scenarios')
+    parser.add_argument('--broadcast-users', type=int, default=1000, help='Users for the broadcast scenario')
+    parser.add_argument('--terco-updates', type=int, default=100, help='Updates for the /terco burst scenario')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent handlers for the /terco burst scenario')
+    parser.add_argument('--rate', type=float, default=0, help='Fan-out rate limit (messages/second, 0 for no limit)')
+    parser.add_argument('--queue-burst', type=int, default=30, help='Messages queue burst limit')
+    parser.add_argument('--queue-window-ms', type=int, default=1000, help='Messages queue time window (ms)')
+    parser.add_argument('--api-latency-ms', type=float, default=5, help='Fake Bot API latency')
+    parser.add_argument('--api-jitter-ms', type=float, default=2, help='Fake Bot API latency jitter')
+    parser.add_argument('--api-429-rate', type=float, default=0, help='Fraction of Bot API requests answered with 429')
+    parser.add_argument('--api-timeout-rate', type=float, default=0, help='Fraction of Bot API requests that time out')
+    parser.add_argument('--cloud-latency-ms', type=float, default=20, help='Fake S3/DynamoDB/websites latency')
+    parser.add_argument('--startup-budget', type=float, default=5, help='Maximum time until the bot answers after a (re)start (seconds)')
+    parser.add_argument('--timeout', type=float, default=600, help='Maximum time to wait for queued messages (seconds)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--child-output', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+# Main script function
+def main():
+    args = parse_args()
+    if args.child: return run_child(args)
+    # Starting the stand-ins
+    api = standins.FakeBotAPI(
+        latency=args.api_latency_ms / 1000, jitter=args.api_jitter_ms / 1000,
+        error_rate=args.api_429_rate, timeout_rate=args.api_timeout_rate,
+    ).start()
+    cloud = standins.FakeCloud('opus-bot-bucket', standins.synthetic_catalog(), standins.synthetic_prayers(), args.cloud_latency_ms / 1000).start()
+    results = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': {key: value for key, value in vars(args).items() if not key.startswith('child')},
+        },
+        'scenarios': {},
+    }
+    # Running each scenario on its own process
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name in args.scenarios.split(','):
+            name = name.strip()
+            if name not in SCENARIOS: raise SystemExit(f"Unknown scenario: {name}")
+            print(f"Running '{name}'...", flush=True)
+            results['scenarios'][name] = run_scenario(name, args, api, cloud, work_dir)
+            print(json.dumps(results['scenarios'][name], indent=2), flush=True)
+    api.stop()
+    cloud.stop()
+    # Saving and comparing the results
+    with open(args.output, 'w', encoding='utf-8') as file: json.dump(results, file, indent=2)
+    print(f"Results saved to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file: compare(json.load(file), results)
+    # Failing when the bot took longer than the budget to answer after a (re)start
+    over_budget = [name for name, result in results['scenarios'].items() if result.get('over_budget')]
+    if len(over_budget) > 0: raise SystemExit(f"Startup budget ({args.startup_budget} s) exceeded: {', '.join(over_budget)}")
+
+# Executing main script
+if __name__ == '__main__':
+    main()
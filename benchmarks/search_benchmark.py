@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 11:00:00 2026
+
+@author: Renato Henz
+
+Search index benchmark: build time, incremental update time and query latency
+over a synthetic corpus (prayers, Rosary mysteries and aspirations)
+
+    python -m benchmarks.search_benchmark --aspirations 2000 --queries 20000
+
+"""
+
+# Main dependencies
+import argparse, json, random, time
+
+# Search index, local stand-ins and results helpers
+import search
+from benchmarks import standins
+from benchmarks.run_benchmarks import percentiles
+
+# Queries, with accents and case variations on purpose
+QUERIES = ('coracao', 'Coração de Maria', 'misericordia', 'senhor paz', 'gloria', 'SANTOS', 'luzes',
+           'esperança e caridade', 'lembrai', 'oracoes', 'espirito santo', 'mae')
+
+# Function to create the synthetic documents, as the bot would index them
+def synthetic_documents(aspirations, seed=0):
+    rng = random.Random(seed)
+    prayers = standins.synthetic_prayers(seed)
+    documents = {f"oracao:{key}": (key.replace('_', ' ').title(), text) for key, text in prayers.items() if isinstance(text, str)}
+    for mysteries_type, mysteries in prayers['rosario'].items():
+        if 'misterios' not in mysteries: continue
+        for index, mystery in mysteries['misterios'].items():
+            documents[f"misterio:{mysteries_type}:{index}"] = (mystery['nome'], mystery['descricao'])
+    for index in range(aspirations):
+        documents[f"jaculatoria:{index}"] = ('Jaculatória', standins.lorem(rng.randint(6, 30), rng))
+    return documents
+
+# Function to parse the command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description='Search index benchmark')
+    parser.add_argument('--aspirations', type=int, default=2000, help='Synthetic aspirations on the corpus')
+    parser.add_argument('--queries', type=int, default=20000, help='Queries to run')
+    parser.add_argument('--output', help='Results file (JSON)')
+    return parser.parse_args()
+
+# Main script function
+def main():
+    args = parse_args()
+    documents = synthetic_documents(args.aspirations)
+    index = search.SearchIndex()
+    # Full build
+    start = time.perf_counter()
+    index.update(documents)
+    build = time.perf_counter() - start
+    # Incremental update, as when a few aspirations change on a reload
+    for key in list(documents)[-10:]: documents[key] = ('Jaculatória', standins.lorem(12))
+    start = time.perf_counter()
+    changed = index.update(documents)
+    update = time.perf_counter() - start
+    # Queries
+    latencies = []
+    for position in range(args.queries):
+        start = time.perf_counter()
+        index.search(QUERIES[position % len(QUERIES)])
+        latencies.append(time.perf_counter() - start)
+    results = {
+        'documents': len(index),
+        'terms': len(index.postings),
+        'build_s': round(build, 4),
+        'incremental_update_s': round(update, 4),
+        'incremental_documents': changed,
+        'query_latency_ms': percentiles(latencies),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file: json.dump(results, file, indent=2)
+
+# Executing main script
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,458 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:00:00 2026
+
+@author: Renato Henz
+
+Local stand-ins for the external services used by the bot: a fake Bot API server,
+S3/DynamoDB emulation (with the scraped pages) and a SQLite database for MySQL
+
+"""
+
+# Main dependencies
+import json, os, random, re, sqlite3, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from xml.sax.saxutils import escape
+
+# Repository root, where the SQL scripts are
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Synthetic content
+WORDS = ('senhor', 'graça', 'coração', 'oração', 'misericórdia', 'paz', 'amor', 'maria', 'jesus',
+         'glória', 'santo', 'espírito', 'fé', 'esperança', 'caridade', 'luz', 'vida', 'mãe')
+PRAYER_KEYS = ('angelus', 'regina_caeli', 'cantico_tres_jovens', 'lembrai-vos', 'ato_contricao',
+               'ato_contricao_alt', 'oferecimento_dia', 'oferecimento_dia_alt', 'acao_gracas',
+               'intencao_indulgencias', 'salmo_2', 'adoro-te_devote', 'preces')
+MYSTERIES = {'gozosos': 'joyful', 'dolorosos': 'sorrowful', 'gloriosos': 'glorious', 'luminosos': 'luminous'}
+
+# Function to create a random text with the provided number of words
+def lorem(words, rng=random):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+# Function to create a synthetic images catalog (S3 keys)
+def synthetic_catalog(images_per_folder=10):
+    keys = []
+    for name in MYSTERIES.values():
+        for number in range(1, 6):
+            keys.append(f"rosary/{name}-mysteries/{number}/")
+            keys.extend(f"rosary/{name}-mysteries/{number}/image-{index}.jpg" for index in range(images_per_folder))
+    keys.append('nossa-senhora/')
+    keys.extend(f"nossa-senhora/image-{index}.jpg" for index in range(images_per_folder))
+    return sorted(keys)
+
+# Function to create a synthetic prayers table (DynamoDB items as {field: value})
+def synthetic_prayers(seed=0):
+    rng = random.Random(seed)
+    prayers = {key: lorem(120, rng) for key in PRAYER_KEYS}
+    rosary = {
+        'oracao_final': lorem(60, rng),
+        'salve': lorem(80, rng),
+        'ladainha': {'oracao': lorem(400, rng), 'link_audio': 'https://example.com/ladainha.mp3'},
+    }
+    for name in MYSTERIES:
+        rosary[name] = {
+            'link_audio': f"https://example.com/{name}.mp3",
+            'misterios': {str(index): {'nome': lorem(6, rng), 'descricao': lorem(50, rng)} for index in range(1, 6)},
+        }
+    prayers['rosario'] = rosary
+    return prayers
+
+# Function to encode a value in the DynamoDB JSON format
+def to_dynamodb(value):
+    if isinstance(value, bool): return {'BOOL': value}
+    if isinstance(value, (int, float)): return {'N': str(value)}
+    if isinstance(value, dict): return {'M': {key: to_dynamodb(item) for key, item in value.items()}}
+    if isinstance(value, (list, tuple)): return {'L': [to_dynamodb(item) for item in value]}
+    if value is None: return {'NULL': True}
+    return {'S': str(value)}
+
+# HTTP server accepting bursts of new connections (e.g.: a senders pool opening them all at once)
+class FakeHTTPServer(ThreadingHTTPServer):
+    request_queue_size = 128
+
+# Base HTTP server running on a background thread
+class FakeServer():
+    # Init func
+    def __init__(self, handler, host='127.0.0.1', port=0):
+        self.httpd = FakeHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+
+    # Starting the server
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    # Stopping the server
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+# Base requests handler for the fake servers
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, which would wait for the delayed ACKs on keep-alive connections
+    disable_nagle_algorithm = True
+
+    # Sending a response body
+    def reply(self, status, body, content_type='application/json', headers=None):
+        if isinstance(body, (dict, list)): body = json.dumps(body)
+        if isinstance(body, str): body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items(): self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Reading the request body
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length > 0 else b''
+
+    # Requests are not logged
+    def log_message(self, format, *args):
+        pass
+
+# Fake Bot API server
+# Answers every method with a plausible result, with configurable latency and
+# injection of 429 (flood control) and timeout errors
+class FakeBotAPI(FakeServer):
+    # Init func
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, timeout_rate=0.0, timeout_delay=10.0, seed=0):
+        super(FakeBotAPI, self).__init__(FakeBotAPIHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_delay = timeout_delay
+        self.track_replies = False
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        # Notified on every reply, see 'wait_replies'
+        self.replied = threading.Condition(self.lock)
+        # Updates waiting to be returned by 'getUpdates'
+        self.updates = []
+        self.reset()
+
+    # Clearing the recorded statistics
+    def reset(self):
+        with self.lock:
+            self.requests = {}
+            self.errors = {}
+            self.message_id = 0
+            # First and last reply time (epoch) for each chat
+            self.first_reply = {}
+            self.last_reply = {}
+            # Every reply time for each chat, if 'track_replies' is enabled
+            self.reply_times = {}
+
+    # Statistics as a dict
+    def stats(self):
+        with self.lock:
+            return {
+                'requests': dict(self.requests),
+                'errors': dict(self.errors),
+                'first_reply': dict(self.first_reply),
+                'last_reply': dict(self.last_reply),
+            }
+
+    # Waiting until a chat received a number of replies, returning their times (epoch)
+    def wait_replies(self, chat_id, count, timeout):
+        chat_id = str(chat_id)
+        with self.replied:
+            self.replied.wait_for(lambda: len(self.reply_times.get(chat_id, ())) >= count, timeout)
+            return list(self.reply_times.get(chat_id, ()))
+
+    # Queuing updates for 'getUpdates'
+    def push_updates(self, updates):
+        with self.lock: self.updates.extend(updates)
+
+# Fake Bot API requests handler
+class FakeBotAPIHandler(FakeHandler):
+    # Function to get the chat ID from a JSON, form or multipart body
+    def get_chat_id(self, body):
+        content_type = self.headers.get('Content-Type', '')
+        try:
+            if content_type.startswith('application/json'): return str(json.loads(body or b'{}').get('chat_id'))
+            if content_type.startswith('application/x-www-form-urlencoded'):
+                return parse_qs(body.decode('utf-8')).get('chat_id', [None])[0]
+            match = re.search(rb'name="chat_id"\r\n\r\n([^\r]+)', body)
+            return match.group(1).decode('utf-8') if match else None
+        except ValueError: return None
+
+    # Function to create a message result
+    def message(self, fake, chat_id, method):
+        with fake.lock:
+            fake.message_id += 1
+            message_id = fake.message_id
+        message = {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(chat_id) if chat_id and chat_id.lstrip('-').isdigit() else 0, 'type': 'private'},
+        }
+        # Media results carry file IDs, so the bot can cache them
+        if method == 'sendPhoto':
+            message['photo'] = [{'file_id': f"photo-{message_id}", 'file_unique_id': f"u-photo-{message_id}", 'width': 1280, 'height': 960}]
+        elif method == 'sendVoice':
+            message['voice'] = {'file_id': f"voice-{message_id}", 'file_unique_id': f"u-voice-{message_id}", 'duration': 1}
+        elif method == 'sendDocument':
+            message['document'] = {'file_id': f"document-{message_id}", 'file_unique_id': f"u-document-{message_id}"}
+        else: message['text'] = ''
+        return message
+
+    # Answering Bot API methods
+    def do_POST(self):
+        fake = self.server.fake
+        body = self.read_body()
+        # Paths are '/bot<token>/<method>'
+        method = self.path.rstrip('/').split('/')[-1]
+        if method == '_reset':
+            fake.reset()
+            return self.reply(200, {'ok': True})
+        chat_id = self.get_chat_id(body)
+        with fake.lock:
+            fake.requests[method] = fake.requests.get(method, 0) + 1
+            draw = fake.random.random()
+            delay = fake.latency + fake.random.random() * fake.jitter
+        # Injected timeouts: the answer takes longer than the client is willing to wait
+        if draw < fake.timeout_rate:
+            with fake.lock: fake.errors['timeout'] = fake.errors.get('timeout', 0) + 1
+            time.sleep(fake.timeout_delay)
+        elif delay > 0: time.sleep(delay)
+        # Injected flood control errors
+        if fake.timeout_rate <= draw < fake.timeout_rate + fake.error_rate:
+            with fake.lock: fake.errors['429'] = fake.errors.get('429', 0) + 1
+            return self.reply(429, {
+                'ok': False, 'error_code': 429,
+                'description': 'Too Many Requests: retry after 1',
+                'parameters': {'retry_after': 1},
+            })
+        # Results for each method
+        if method == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'Opus', 'username': 'opus_bot'}
+        elif method == 'getUpdates':
+            with fake.lock: result, fake.updates = fake.updates, []
+        elif method == 'getFile':
+            file_id = json.loads(body or b'{}').get('file_id', 'file')
+            result = {'file_id': file_id, 'file_unique_id': f"u-{file_id}", 'file_path': f"files/{file_id}"}
+        elif method == 'sendMediaGroup':
+            media = json.loads(body or b'{}').get('media', '[]')
+            if isinstance(media, str): media = json.loads(media)
+            result = [self.message(fake, chat_id, 'sendPhoto') for _ in media]
+        elif method.startswith('send') or method.startswith('edit') or method == 'forwardMessage':
+            result = self.message(fake, chat_id, method)
+        else: result = True
+        # Recording the reply time for the chat
+        if chat_id is not None:
+            now = time.time()
+            with fake.replied:
+                fake.first_reply.setdefault(chat_id, now)
+                fake.last_reply[chat_id] = now
+                if fake.track_replies:
+                    fake.reply_times.setdefault(chat_id, []).append(now)
+                    fake.replied.notify_all()
+        self.reply(200, {'ok': True, 'result': result})
+
+    # Answering the statistics endpoint
+    def do_GET(self):
+        if self.path.startswith('/_stats'): return self.reply(200, self.server.fake.stats())
+        self.reply(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+
+# Fake cloud server: S3 (ListObjects) and DynamoDB (Scan) emulation, plus the scraped pages
+# The pages are served under '/<host>/<path>', see 'redirect_requests'
+class FakeCloud(FakeServer):
+    # Init func
+    def __init__(self, bucket, keys, prayers, latency=0.0):
+        super(FakeCloud, self).__init__(FakeCloudHandler)
+        self.bucket = bucket
+        self.keys = sorted(keys)
+        self.prayers = prayers
+        self.latency = latency
+
+# Fake cloud requests handler
+class FakeCloudHandler(FakeHandler):
+    # S3 requests and scraped pages
+    def do_GET(self):
+        fake = self.server.fake
+        if fake.latency > 0: time.sleep(fake.latency)
+        url = urlsplit(self.path)
+        # Scraped pages
+        if url.path.startswith('/santo.cancaonova.com'):
+            return self.reply(200, (
+                '<html><body><h1 class="entry-title"><span>São Bento</span></h1>'
+                f'<h2 style="text-align: center">{lorem(12)}</h2><p>{lorem(150)}</p>'
+                '<img class="wp-image-1" src="https://example.com/santo.jpg"/></body></html>'
+            ), 'text/html; charset=utf-8')
+        if url.path.startswith('/www.hablarcondios.org'):
+            return self.reply(200, (
+                f'<html><body><p class="DiaLiturgico">{lorem(5)}</p><p class="Titulo">{lorem(6)}</p>'
+                + ''.join(f'<p class="Subtitulo">{lorem(30)}</p>' for _ in range(3)) + '</body></html>'
+            ), 'text/html; charset=utf-8')
+        if url.path.startswith('/calapi.inadiutorium.cz'):
+            return self.reply(200, {'date': time.strftime('%Y-%m-%d'), 'season': 'ordinary'})
+        # S3 ListObjects (path style: '/<bucket>')
+        if url.path.strip('/') == fake.bucket:
+            query = parse_qs(url.query)
+            marker = (query.get('marker') or query.get('start-after') or [''])[0]
+            max_keys = int((query.get('max-keys') or ['1000'])[0])
+            keys = [key for key in fake.keys if key > marker]
+            page, truncated = keys[:max_keys], len(keys) > max_keys
+            contents = ''.join(
+                f"<Contents><Key>{escape(key)}</Key><LastModified>2026-01-01T00:00:00.000Z</LastModified>"
+                f"<ETag>&quot;0&quot;</ETag><Size>1024</Size><StorageClass>STANDARD</StorageClass></Contents>"
+                for key in page
+            )
+            return self.reply(200, (
+                '<?xml version="1.0" encoding="UTF-8"?>'
+                '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                f"<Name>{fake.bucket}</Name><Prefix></Prefix><Marker>{escape(marker)}</Marker>"
+                f"<MaxKeys>{max_keys}</MaxKeys><IsTruncated>{'true' if truncated else 'false'}</IsTruncated>"
+                + (f"<NextMarker>{escape(page[-1])}</NextMarker>" if truncated else '')
+                + contents + '</ListBucketResult>'
+            ), 'application/xml')
+        self.reply(404, '<Error><Code>NoSuchKey</Code></Error>', 'application/xml')
+
+    # DynamoDB requests (only 'Scan' is used by the bot)
+    def do_POST(self):
+        fake = self.server.fake
+        self.read_body()
+        if fake.latency > 0: time.sleep(fake.latency)
+        target = self.headers.get('X-Amz-Target', '')
+        if target.endswith('.Scan'):
+            items = [{'field': {'S': field}, 'value': to_dynamodb(value)} for field, value in fake.prayers.items()]
+            return self.reply(200, {'Items': items, 'Count': len(items), 'ScannedCount': len(items)},
+                              'application/x-amz-json-1.0')
+        self.reply(400, {'__type': 'com.amazon.coral.service#UnknownOperationException'}, 'application/x-amz-json-1.0')
+
+# Function to redirect the scraped websites to the fake cloud server
+def redirect_requests(base_url):
+    import requests
+    original_get = requests.get
+    # Every HTTP(S) URL becomes '<base_url>/<host>/<path>'
+    def get(url, *args, **kwargs):
+        parts = urlsplit(url)
+        if parts.hostname not in ('127.0.0.1', 'localhost'):
+            url = f"{base_url}/{parts.hostname}{parts.path}" + (f"?{parts.query}" if parts.query else '')
+        return original_get(url, *args, **kwargs)
+    requests.get = get
+
+# Function to translate the MySQL statements used by the bot to SQLite
+def translate_sql(query):
+    query = query.replace('%s', '?')
+    # Upserts
+    if re.search(r'ON DUPLICATE KEY UPDATE', query, re.IGNORECASE):
+        query = re.sub(r'\s*ON DUPLICATE KEY UPDATE.*$', '', query, flags=re.IGNORECASE | re.DOTALL)
+        query = re.sub(r'^\s*INSERT\s+INTO', 'INSERT OR REPLACE INTO', query, flags=re.IGNORECASE)
+    # MySQL functions
+    query = re.sub(r'\bIF\(', 'iif(', query)
+    return query
+
+# Function to translate the MySQL schema (DDL) to SQLite
+def translate_ddl(script):
+    script = re.sub(r"COMMENT\s+'(?:[^']|'')*'", '', script)
+    script = re.sub(r'COLLATE\s+\w+', '', script)
+    script = re.sub(r'\)\s*ENGINE=\w+', ')', script)
+    script = re.sub(r'`id` int NOT NULL AUTO_INCREMENT', '`id` INTEGER PRIMARY KEY AUTOINCREMENT', script)
+    script = re.sub(r',\s*PRIMARY KEY \(`id`\)', '', script)
+    script = re.sub(r'UNIQUE KEY `\w+` \(', 'UNIQUE (', script)
+    return script
+
+# Function to create the SQLite database from the repository SQL scripts
+def create_database(path, subscribers=0, services=('angelus_regina_caeli',), time_zone='UTC'):
+    if os.path.exists(path): os.remove(path)
+    connection = sqlite3.connect(path)
+    for script in ('opus.sql', 'data.sql'):
+        with open(os.path.join(ROOT_DIR, 'sql', script), encoding='utf-8') as file:
+            connection.executescript(translate_ddl(file.read()))
+    # Synthetic users and subscriptions
+    connection.executemany(
+        'INSERT INTO users (chat_id, first_name, is_bot, last_name, language_code) VALUES (?, ?, 0, ?, ?)',
+        ((str(100000 + index), f"Usuário {index}", '', 'pt-br') for index in range(subscribers)),
+    )
+    connection.executemany(
+        'INSERT INTO user_services (chat_id, service_type, time_zone) VALUES (?, ?, ?)',
+        ((str(100000 + index), service, time_zone) for index in range(subscribers) for service in services),
+    )
+    connection.commit()
+    connection.close()
+
+# Function to create the local content (see 'backends'): the images tree, the prayers file and the aspirations database
+def create_local_content(directory, images_per_folder=10):
+    for key in synthetic_catalog(images_per_folder):
+        path = os.path.join(directory, 'images', *key.split('/'))
+        if key.endswith('/'): os.makedirs(path, exist_ok=True)
+        else:
+            with open(path, 'wb') as file: file.write(b'\xff\xd8\xff\xd9')
+    with open(os.path.join(directory, 'prayers.json'), 'w', encoding='utf-8') as file:
+        json.dump(synthetic_prayers(), file, ensure_ascii=False)
+    create_database(os.path.join(directory, 'aspirations.sqlite3'))
+
+# SQLite connection with the 'mysql.connector' interface used by the bot
+class SQLiteConnection():
+    # Init func
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.connection.create_function('CONCAT', -1, lambda *args: ''.join('' if arg is None else str(arg) for arg in args))
+        self.connected = True
+
+    def cursor(self, *args, **kwargs):
+        return SQLiteCursor(self.connection.cursor())
+
+    def commit(self):
+        self.connection.commit()
+
+    def is_connected(self):
+        return self.connected
+
+    def close(self):
+        self.connection.close()
+        self.connected = False
+
+# SQLite cursor translating the MySQL statements
+class SQLiteCursor():
+    # Init func
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, query, params=()):
+        import mysql.connector
+        try: self.cursor.execute(translate_sql(query), params or ())
+        except sqlite3.Error as error: raise mysql.connector.Error(msg=str(error))
+
+    def executemany(self, query, params):
+        import mysql.connector
+        try: self.cursor.executemany(translate_sql(query), params)
+        except sqlite3.Error as error: raise mysql.connector.Error(msg=str(error))
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def fetchmany(self, size=1):
+        return self.cursor.fetchmany(size)
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    def close(self):
+        self.cursor.close()
+
+# Function to replace the MySQL connections (direct and pooled) by SQLite ones
+def install_mysql_standin(path):
+    import mysql.connector, mysql.connector.pooling
+    # Pool stand-in, keeping the attributes read by the metrics
+    class SQLitePool():
+        def __init__(self, pool_size=5, **kwargs):
+            self.pool_size = pool_size
+            self._cnx_queue = type('Queue', (), {'qsize': lambda self: pool_size})()
+        def get_connection(self):
+            return SQLiteConnection(path)
+    mysql.connector.connect = lambda *args, **kwargs: SQLiteConnection(path)
+    mysql.connector.pooling.MySQLConnectionPool = SQLitePool
+
+# Function to get a Bot API server URL path for the benchmarks token
+def bot_base_url(server):
+    return f"{server.url}/bot"
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 11:00:00 2026
+
+@author: Renato Henz
+
+Users and subscriptions import/export over an SQLite stand-in database with synthetic
+rows: export and import throughput (JSONL and CSV), the peak memory of each streaming
+pass, an import interrupted halfway and resumed from its checkpoint, and the timing
+wheel reload from the imported subscriptions
+
+    python -m benchmarks.transfer_benchmark --users 500000 --services santo,angelus_regina_caeli
+
+With '--trace', the peak memory of each pass is measured too (tracemalloc slows them down)
+
+"""
+
+# Main dependencies
+import argparse, json, os, sqlite3, tempfile, time, tracemalloc
+
+# Import/export tool, timing wheel and stand-ins
+import delivery, transfer
+from benchmarks import standins
+
+# Connection stand-in failing on a given commit, to interrupt an import
+class FailingConnection(standins.SQLiteConnection):
+    # Init func
+    def __init__(self, path, fail_on):
+        super(FailingConnection, self).__init__(path)
+        self.commits = 0
+        self.fail_on = fail_on
+
+    def commit(self):
+        self.commits += 1
+        if (self.commits == self.fail_on): raise RuntimeError('Import interrupted')
+        super(FailingConnection, self).commit()
+
+# Function to run a pass, returning its duration (seconds), rows/s and, if traced, the peak memory (KB)
+def measure(run, trace=False):
+    if (trace): tracemalloc.start()
+    start = time.perf_counter()
+    rows = run()
+    duration = time.perf_counter() - start
+    result = {'rows': rows, 'seconds': round(duration, 2), 'rows_per_second': round(rows / duration)}
+    if (trace):
+        result['peak_kb'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+    return result
+
+# Function to count the rows of a table
+def count_rows(path, table):
+    connection = sqlite3.connect(path)
+    try: return connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally: connection.close()
+
+# Function to parse the command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description='Users and subscriptions import/export benchmark')
+    parser.add_argument('--users', type=int, default=500000, help='Synthetic users')
+    parser.add_argument('--services', default='santo,angelus_regina_caeli', help='Services of each user (comma separated)')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows on each upsert')
+    parser.add_argument('--trace', action='store_true', help='Measure the peak memory of the export and import passes')
+    parser.add_argument('--output', help='Results file (JSON)')
+    return parser.parse_args()
+
+# Main script function
+def main():
+    args = parse_args()
+    services = tuple(args.services.split(','))
+    results = {'users': args.users, 'subscriptions': args.users * len(services), 'batch_size': args.batch_size}
+    with tempfile.TemporaryDirectory() as directory:
+        source, target = os.path.join(directory, 'source.sqlite3'), os.path.join(directory, 'target.sqlite3')
+        standins.create_database(source, args.users, services)
+        standins.create_database(target, 0)
+        connect_source, connect_target = (lambda: standins.SQLiteConnection(source)), (lambda: standins.SQLiteConnection(target))
+        for table in ('users', 'user_services'):
+            for file_format in transfer.FORMATS:
+                path = os.path.join(directory, f"{table}.{file_format}")
+                results[f"export_{table}_{file_format}"] = measure(lambda: transfer.export_table(connect_source, table, path), args.trace)
+                results[f"export_{table}_{file_format}"]['file_mb'] = round(os.path.getsize(path) / 1024 ** 2, 1)
+                results[f"import_{table}_{file_format}"] = measure(lambda: transfer.import_table(connect_target, table, path, args.batch_size), args.trace)
+        # Import interrupted halfway, then resumed from the checkpoint
+        path = os.path.join(directory, 'user_services.jsonl')
+        standins.create_database(target, 0)
+        batches = results['subscriptions'] // args.batch_size
+        try: transfer.import_table(lambda: FailingConnection(target, batches // 2 + 1), 'user_services', path, args.batch_size)
+        except RuntimeError: pass
+        with open(path + '.checkpoint', encoding='utf-8') as file: checkpoint = json.load(file)
+        results['resume'] = measure(lambda: transfer.import_table(connect_target, 'user_services', path, args.batch_size) - checkpoint['rows'])
+        results['resume']['resumed_from'] = checkpoint['rows']
+        results['resume']['imported_rows'] = count_rows(target, 'user_services')
+        # Timing wheel built from the imported subscriptions, then reloaded (nothing changed) and with 1% removed
+        subscriptions = lambda skip=0: (
+            delivery.Subscription(row[0], row[1], row[2], row[3])
+            for index, (row, offset) in enumerate(transfer.read_records(path, 'user_services')) if skip == 0 or index % skip != 0
+        )
+        wheel = delivery.TimingWheel()
+        results['wheel_build'] = measure(lambda: wheel.add_many(subscriptions()) or len(wheel))
+        results['wheel_reload_unchanged'] = measure(lambda: sum(wheel.sync(subscriptions())) or len(wheel))
+        results['wheel_reload_removed'] = measure(lambda: wheel.sync(subscriptions(100))[1])
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file: json.dump(results, file, indent=2)
+
+# Executing main script
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 18:00:00 2026
+
+@author: Renato Henz
+
+Bulk sender for the fan-out traffic (scheduled services and broadcasts): the shared
+parameters of a Bot API request are serialized once and only the chat ID is swapped in
+for each recipient, and the requests are kept in flight on their own pool of keep-alive
+connections, apart from the interactive one used by the bot
+
+"""
+
+# Main dependencies
+import http.client, json, logging, queue, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+# Bot metrics
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Error names for the Bot API error codes, as the bot's own errors (see 'metrics.SENDS')
+ERRORS = {400: 'BadRequest', 401: 'Unauthorized', 403: 'Unauthorized', 404: 'InvalidToken', 429: 'RetryAfter'}
+
+# Error answered by the Bot API
+class BulkSendError(Exception):
+    # Init func
+    def __init__(self, status, description, retry_after=None):
+        super(BulkSendError, self).__init__(f"{status}: {description}")
+        self.status = status
+        self.description = description
+        self.retry_after = retry_after
+
+# Bot API request prepared for many recipients: the JSON body is serialized once, without the chat ID
+class PreparedRequest():
+    __slots__ = ('method', 'suffix')
+
+    # Init func
+    def __init__(self, method, params):
+        self.method = method
+        # Everything after the chat ID: the other parameters (without their opening brace), or only the closing one
+        shared = json.dumps(params, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.suffix = b',' + shared[1:] if len(params) > 0 else b'}'
+
+    # Request body for a recipient
+    def body(self, chat_id):
+        return b'{"chat_id":%d%s' % (int(chat_id), self.suffix)
+
+# Pool of keep-alive HTTP connections to a server, with at most 'size' requests in flight
+class ConnectionPool():
+    # Init func
+    def __init__(self, url, size=16, timeout=10):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.size = size
+        # Idle connections (the most recent first, so the others may be closed by the server) and free slots
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+
+    # Sending a POST request to a path (below the pool URL), returning (status, body)
+    # A reused connection closed by the server while idle is replaced once
+    def post(self, path, body, headers):
+        with self.slots:
+            for attempt in range(2):
+                try: connection, reused = self.idle.get_nowait(), True
+                except queue.Empty: connection, reused = self.connection_class(self.host, self.port, timeout=self.timeout), False
+                try:
+                    connection.request('POST', self.path + path, body, headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    connection.close()
+                    if (reused and attempt == 0): continue
+                    raise
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    raise
+                if (response.will_close): connection.close()
+                else: self.idle.put(connection)
+                return response.status, data
+
+    # Closing the idle connections
+    def close(self):
+        while True:
+            try: self.idle.get_nowait().close()
+            except queue.Empty: return
+
+# Token bucket: up to 'rate' acquisitions/second, with bursts of up to 'burst' of them
+# A single bucket is shared by every sender of the bot (see 'run.py'), so together they stay below the
+# Bot API global limit; each acquisition takes its slot right away, so the callers are served in order
+class TokenBucket():
+    # Init func
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    # Waiting for a token, returning the time waited (seconds)
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if (wait > 0): time.sleep(wait)
+        return wait
+
+# Bulk sender: prepared requests sent by a pool of worker threads, up to 'rate_limit' requests/second
+# A shared 'limiter' (e.g.: the bot's global token bucket) is used instead of the rate limit, when given
+# 'base_url' is the Bot API URL before the token, as on the bot (e.g.: 'https://api.telegram.org/bot')
+class BulkSender():
+    # Init func
+    def __init__(self, token, base_url=None, pool_size=16, rate_limit=25, retries=2, timeout=10, limiter=None):
+        self.pool = ConnectionPool((base_url or 'https://api.telegram.org/bot') + token, pool_size, timeout)
+        self.headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        self.limiter = limiter or (TokenBucket(rate_limit) if rate_limit > 0 else None)
+        self.retries = retries
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='bulk')
+
+    # Preparing a request for many recipients, with every parameter except the chat ID
+    def prepare(self, method, **params):
+        return PreparedRequest(method, params)
+
+    # Waiting for the next sending slot
+    def _wait(self):
+        if (self.limiter is not None): self.limiter.acquire()
+
+    # Sending a prepared request to a chat, returning the result (flood control errors are retried)
+    def send(self, prepared, chat_id):
+        body = prepared.body(chat_id)
+        for attempt in range(self.retries + 1):
+            self._wait()
+            start = time.perf_counter()
+            try: status, data = self.pool.post(f"/{prepared.method}", body, self.headers)
+            except Exception as error:
+                metrics.SENDS.inc(prepared.method, type(error).__name__)
+                raise
+            finally: metrics.SEND_LATENCY.observe(time.perf_counter() - start, prepared.method)
+            answer = json.loads(data)
+            if (answer.get('ok')):
+                metrics.SENDS.inc(prepared.method, 'ok')
+                return answer.get('result')
+            metrics.SENDS.inc(prepared.method, ERRORS.get(status, 'TelegramError'))
+            retry_after = (answer.get('parameters') or {}).get('retry_after')
+            error = BulkSendError(status, answer.get('description'), retry_after)
+            if (status != 429 or attempt == self.retries): raise error
+            time.sleep(retry_after or 1)
+
+    # Sending a prepared request to a chat on the worker threads, returning its future
+    # 'callback' gets the chat ID, the result and the error (None if it was sent)
+    def submit(self, prepared, chat_id, callback=None):
+        def run():
+            try: result = self.send(prepared, chat_id)
+            except Exception as error:
+                if (callback is None): raise
+                return callback(chat_id, None, error)
+            if (callback is not None): callback(chat_id, result, None)
+            return result
+        return self.executor.submit(run)
+
+    # Waiting for the pending requests and closing the connections
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+        self.pool.close()
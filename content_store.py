@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 14:00:00 2026
+
+@author: Renato Henz
+
+Local content store, keyed by source and date, with prefetch and retries
+
+"""
+
+# Main dependencies
+import logging, random, threading, time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Content source, fetched for each date
+class Source():
+    # Init func
+    # 'fetch' receives the date and returns the content, raising an exception on failures
+    # 'days_ahead' is the number of future dates that can be prefetched (only for sources that accept a date)
+    # 'available_at' ('HH:MM') is when the day's content is published, before that the previous day is the current one
+    # 'validate' may reject a fetched content (e.g.: an error page)
+    # 'today_only' is for sources that can only fetch today's content (e.g.: pages that only show the current day),
+    # whose other dates are never fetched, so the content of a day is never stored under another one
+    def __init__(self, name, fetch, days_ahead=0, available_at=None, validate=None, today_only=False):
+        self.name = name
+        self.fetch = fetch
+        self.days_ahead = days_ahead
+        self.available_at = datetime.strptime(available_at, '%H:%M').time() if available_at else None
+        self.validate = validate
+        self.today_only = today_only
+
+    # Date of the current content
+    def current_day(self, now):
+        if (self.available_at is not None and now.time() < self.available_at): return now.date() - timedelta(days=1)
+        return now.date()
+
+    # Dates that should be on the store
+    def wanted_days(self, now):
+        first = self.current_day(now)
+        days = [first + timedelta(days=offset) for offset in range(self.days_ahead + 1)]
+        if (self.today_only): return [day for day in days if day == now.date()]
+        return days
+
+# Content store, with the entries of each source as {date: (content, fetched at)}
+# Failed dates are retried with exponential backoff, and readers always get the freshest valid entry
+class ContentStore():
+    # Init func
+    # 'on_update' is called with the source name whenever a new entry is stored
+    def __init__(self, keep_days=7, retry_base=60, retry_max=3600, on_update=None):
+        self.sources = {}
+        self.entries = {}
+        # Failed dates, as {(source, date): (attempts, next attempt timestamp)}
+        self.retries = {}
+        # Dates being fetched, so concurrent refreshes don't scrape them twice
+        self.fetching = set()
+        self.keep_days = keep_days
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.on_update = on_update
+        self.lock = threading.Lock()
+
+    # Registering a source
+    def register(self, source):
+        self.sources[source.name] = source
+        self.entries.setdefault(source.name, {})
+
+    # Storing an entry
+    def put(self, name, day, content, fetched_at=None):
+        with self.lock:
+            self.entries.setdefault(name, {})[day] = (content, fetched_at or time.time())
+
+    # Getting the freshest entry up to a date (the current one by default), as (date, content, fetched at)
+    def get_entry(self, name, day=None):
+        if (day is None): day = self.sources[name].current_day(datetime.now())
+        with self.lock:
+            entries = self.entries.get(name, {})
+            if (day in entries): return (day, *entries[day])
+            previous = [entry_day for entry_day in entries if entry_day < day]
+            if (len(previous) == 0): return None
+            return (max(previous), *entries[max(previous)])
+
+    # Getting the freshest content up to a date (or 'default' if there's none)
+    def get(self, name, default=None, day=None):
+        entry = self.get_entry(name, day)
+        return default if entry is None else entry[1]
+
+    # Timestamp of the last stored entry of a source
+    def updated_at(self, name):
+        with self.lock:
+            return max((fetched_at for content, fetched_at in self.entries.get(name, {}).values()), default=None)
+
+    # Dates missing on the store, as (source, date)
+    def missing(self, now=None, sources=None):
+        now = now or datetime.now()
+        missing = []
+        for name in (sources or self.sources):
+            with self.lock: entries = self.entries.get(name, {})
+            missing.extend((name, day) for day in self.sources[name].wanted_days(now) if day not in entries)
+        return missing
+
+    # Fetching a date of a source, returning if it succeeded
+    def fetch(self, name, day):
+        source = self.sources[name]
+        with self.lock:
+            if ((name, day) in self.fetching): return False
+            self.fetching.add((name, day))
+        try:
+            content = source.fetch(day)
+            if (source.validate is not None and not source.validate(content)):
+                raise ValueError('conteúdo inválido')
+        except Exception as error:
+            with self.lock:
+                attempts = self.retries.get((name, day), (0, 0))[0] + 1
+                # Exponential backoff with jitter, so failing sources aren't hammered
+                delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+                self.retries[(name, day)] = (attempts, time.time() + delay)
+            logger.warning('Falha ao obter "%s" de %s (tentativa %d, nova tentativa em %.0f s): %s', name, day, attempts, delay, error)
+            return False
+        finally:
+            with self.lock: self.fetching.discard((name, day))
+        self.put(name, day, content)
+        with self.lock: self.retries.pop((name, day), None)
+        if (self.on_update is not None): self.on_update(name)
+        return True
+
+    # Fetching the missing dates whose retry time has come, returning the ones that failed
+    def refresh(self, now=None, sources=None):
+        failed = []
+        for name, day in self.missing(now, sources):
+            with self.lock: next_attempt = self.retries.get((name, day), (0, 0))[1]
+            if (next_attempt > time.time()): continue
+            if (not self.fetch(name, day)): failed.append((name, day))
+        self.prune(now)
+        return failed
+
+    # Removing old entries (the freshest one of each source is always kept)
+    def prune(self, now=None):
+        now = now or datetime.now()
+        with self.lock:
+            for name, entries in self.entries.items():
+                if (name not in self.sources or len(entries) <= 1): continue
+                limit = self.sources[name].current_day(now) - timedelta(days=self.keep_days)
+                newest = max(entries)
+                for day in [day for day in entries if day < limit and day != newest]: del entries[day]
+            self.retries = {key: value for key, value in self.retries.items() if key[1] >= now.date() - timedelta(days=1)}
+
+    # Entries as a JSON serializable dict ({source: {'YYYY-MM-DD': [content, fetched at]}})
+    def to_dict(self):
+        with self.lock:
+            return {name: {day.isoformat(): [content, fetched_at] for day, (content, fetched_at) in entries.items()}
+                    for name, entries in self.entries.items()}
+
+    # Loading entries saved with 'to_dict'
+    def load(self, data):
+        for name, entries in data.items():
+            for day, (content, fetched_at) in entries.items():
+                self.put(name, datetime.strptime(day, '%Y-%m-%d').date(), content, fetched_at)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 14:00:00 2026
+
+@author: Renato Henz
+
+Coalescing and cooldown of repeated heavy commands for each chat, so a few users
+can't take the messages budget needed by the scheduled deliveries
+
+"""
+
+# Main dependencies
+import threading, time
+
+# Outcomes of a request
+RUN, IN_FLIGHT, COOLDOWN = 'run', 'in_flight', 'cooldown'
+
+# Requests of each (chat, command, variant) key: while one is running, duplicates are merged into it,
+# and after it finishes, repeats within the command cooldown window are suppressed
+# The variant tells apart requests of the same command for different content (e.g.: the mysteries)
+class Coalescer():
+    # Init func
+    def __init__(self, cooldowns=None, default_cooldown=300, clock=time.monotonic):
+        # Cooldown (seconds) of each command; 0 only merges the running requests
+        self.cooldowns = dict(cooldowns or {})
+        self.default_cooldown = default_cooldown
+        self.clock = clock
+        # Keys currently running and when the others finished
+        self.running = set()
+        self.finished = {}
+        self.lock = threading.Lock()
+
+    # Cooldown of a command
+    def cooldown(self, command):
+        return self.cooldowns.get(command, self.default_cooldown)
+
+    # Starting a request, returning RUN (and then 'finish' must be called), IN_FLIGHT or COOLDOWN
+    def begin(self, chat_id, command, variant=None):
+        key = (chat_id, command, variant)
+        now = self.clock()
+        with self.lock:
+            if (key in self.running): return IN_FLIGHT
+            finished_at = self.finished.get(key)
+            if (finished_at is not None and now - finished_at < self.cooldown(command)): return COOLDOWN
+            self.running.add(key)
+            return RUN
+
+    # Finishing a request, starting its cooldown (failed requests can be retried right away)
+    def finish(self, chat_id, command, variant=None, succeeded=True):
+        key = (chat_id, command, variant)
+        now = self.clock()
+        with self.lock:
+            self.running.discard(key)
+            if (succeeded): self.finished[key] = now
+            # Expired keys are removed once in a while, so the dict only holds the recent requests
+            if (len(self.finished) > 1024 and len(self.finished) % 1024 == 0): self._prune(now)
+
+    # Remaining cooldown (seconds) of a chat command
+    def remaining(self, chat_id, command, variant=None):
+        with self.lock: finished_at = self.finished.get((chat_id, command, variant))
+        if (finished_at is None): return 0
+        return max(0, self.cooldown(command) - (self.clock() - finished_at))
+
+    # Removing the expired keys (the lock must be held by the caller)
+    def _prune(self, now):
+        self.finished = {key: finished_at for key, finished_at in self.finished.items() if now - finished_at < self.cooldown(key[1])}
+
+    # Number of keys on cooldown
+    def __len__(self):
+        return len(self.finished)
@@ -0,0 +1,504 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:00:00 2026
+
+@author: Renato Henz
+
+Timing wheel to dispatch the registered services at each user's local time
+
+"""
+
+# Main dependencies
+import heapq, logging, sys, threading, time, zlib
+from array import array
+from collections import deque
+from datetime import timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Bot metrics
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Number of minutes in a day (the wheel has one slot for each of them)
+MINUTES_PER_DAY = 24 * 60
+
+# Default delivery times (user's local time) for each service
+DEFAULT_TIMES = {
+    'jaculatoria': '10:30,16:30,20:30',
+    'santo': '08:00',
+    'meditacao': '05:05',
+    'angelus_regina_caeli': '12:00',
+    # Digest mode: the other services are sent together at these times
+    'resumo': '09:00,12:15,21:00',
+}
+
+# Delivery window (minutes) for each service
+# Each chat gets a fixed offset inside the window, so the sends are spread instead of
+# all of them hitting the message queue at the top of the hour
+DELIVERY_WINDOWS = {
+    'jaculatoria': 30,
+    'santo': 60,
+    'meditacao': 55,
+    'angelus_regina_caeli': 15,
+    'resumo': 15,
+}
+
+# Telegram limits used to compose the digests
+MESSAGE_LIMIT = 4096
+CAPTION_LIMIT = 1024
+MEDIA_GROUP_LIMIT = 10
+
+# Function to get the deterministic offset (seconds) of a chat inside a delivery window
+# A CRC is used instead of 'hash()', which changes every time the process starts
+def get_offset(chat_id, service_type, window_minutes):
+    if window_minutes <= 0: return 0
+    return zlib.crc32(f"{chat_id}:{service_type}".encode()) % (window_minutes * 60)
+
+# Function to convert a 'HH:MM' string into the minute of the day
+def parse_time(value):
+    hour, minute = value.strip().split(':')
+    hour, minute = int(hour), int(minute)
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"Invalid time: {value}")
+    return hour * 60 + minute
+
+# Function to parse a comma separated list of times (e.g.: '10:30,16:30')
+def parse_times(value):
+    minutes = sorted({parse_time(item) for item in value.split(',') if item.strip()})
+    if len(minutes) == 0: raise ValueError(f"No times provided: {value}")
+    return tuple(minutes)
+
+# Function to format minutes of the day as a comma separated list of times
+def format_times(minutes):
+    return ','.join(f"{minute // 60:02d}:{minute % 60:02d}" for minute in minutes)
+
+# Function to get a time zone from its IANA name (e.g.: 'America/Sao_Paulo')
+def get_time_zone(name):
+    try: return ZoneInfo(name)
+    # Invalid keys and unknown zones are reported the same way
+    except (ValueError, ZoneInfoNotFoundError):
+        raise ValueError(f"Unknown time zone: {name}")
+
+# Service subscription with the user's delivery preferences
+# There is one of these for each subscription, so they have no '__dict__' and share the (interned) strings
+# Unknown time zones and invalid times raise a ValueError, so they never reach the wheel
+class Subscription():
+    __slots__ = ('chat_id', 'service_type', 'time_zone', 'delivery_times')
+
+    # Init func
+    def __init__(self, chat_id, service_type, time_zone, delivery_times=None):
+        get_time_zone(time_zone)
+        if delivery_times is not None: parse_times(delivery_times)
+        self.chat_id = int(chat_id)
+        self.service_type = sys.intern(service_type)
+        self.time_zone = sys.intern(time_zone)
+        # Comma separated 'HH:MM' times, if None the service defaults are used
+        self.delivery_times = delivery_times
+
+    # Minutes of the day (local time) when the service must be delivered
+    @property
+    def minutes(self):
+        return parse_times(self.delivery_times or DEFAULT_TIMES[self.service_type])
+
+    # Offset (seconds) of the chat inside the service delivery window
+    @property
+    def offset(self):
+        return get_offset(self.chat_id, self.service_type, DELIVERY_WINDOWS.get(self.service_type, 0))
+
+    # Wheel slots as (minute of the day, second, window start minute)
+    @property
+    def slots(self):
+        offset = self.offset
+        return [((minute + offset // 60) % MINUTES_PER_DAY, offset % 60, minute) for minute in self.minutes]
+
+# Timing wheel with one bucket per minute of the day
+# Each bucket groups the subscriptions by time zone, so a single scheduler job
+# can check the current local minute of every time zone in use
+# Inside a bucket, the chats of each (service, delivery window) are kept in arrays
+# with their seconds, instead of one dict entry and tuple for each subscription
+class TimingWheel():
+    # Init func
+    def __init__(self, max_catchup_minutes=120):
+        # For each minute: {time zone: {(service_type, window start minute): (chat IDs, seconds)}}
+        self.slots = [{} for _ in range(MINUTES_PER_DAY)]
+        # Subscriptions by (chat_id, service_type)
+        self.subscriptions = {}
+        # Number of subscriptions for each time zone in use
+        self.time_zones = {}
+        # Last local minute processed for each time zone
+        self.last_tick = {}
+        # Minutes that may be replayed when a tick runs late (also covers DST gaps)
+        self.max_catchup = timedelta(minutes=max_catchup_minutes)
+        # Time zones which couldn't be loaded (already logged)
+        self.invalid_time_zones = set()
+        self.lock = threading.Lock()
+
+    # Adding (or replacing) a subscription
+    def add(self, subscription):
+        with self.lock:
+            self._add(subscription)
+
+    # Adding (or replacing) many subscriptions, holding the lock only once
+    def add_many(self, subscriptions):
+        with self.lock:
+            for subscription in subscriptions: self._add(subscription)
+
+    # Adding a subscription (the lock must be held by the caller)
+    def _add(self, subscription):
+        key = (subscription.chat_id, subscription.service_type)
+        self._remove(*key)
+        for minute, second, window in subscription.slots:
+            groups = self.slots[minute].setdefault(subscription.time_zone, {})
+            group = groups.get((subscription.service_type, window))
+            if group is None: group = groups[(subscription.service_type, window)] = (array('q'), array('B'))
+            group[0].append(subscription.chat_id)
+            group[1].append(second)
+        self.subscriptions[key] = subscription
+        self.time_zones[subscription.time_zone] = self.time_zones.get(subscription.time_zone, 0) + 1
+
+    # Replacing every subscription by the given ones (e.g.: reloaded from the database), returning (added, removed)
+    # Unchanged subscriptions keep their buckets as they are; the changed ones leave their buckets along with the
+    # removed ones, in a single batch, so they're not searched for one by one before being added again
+    def sync(self, subscriptions):
+        keys, changed = set(), []
+        with self.lock:
+            for subscription in subscriptions:
+                key = (subscription.chat_id, subscription.service_type)
+                keys.add(key)
+                current = self.subscriptions.get(key)
+                if (current is not None and current.time_zone == subscription.time_zone
+                        and current.delivery_times == subscription.delivery_times): continue
+                changed.append(subscription)
+            removed = [key for key in self.subscriptions if key not in keys]
+            self._remove_many(removed + [(subscription.chat_id, subscription.service_type) for subscription in changed])
+            for subscription in changed: self._add(subscription)
+        return len(changed), len(removed)
+
+    # Removing many subscriptions (the lock must be held by the caller)
+    # Each affected bucket group is filtered only once, instead of searching its arrays for every chat
+    def _remove_many(self, keys):
+        groups = {}
+        for chat_id, service_type in keys:
+            subscription = self.subscriptions.pop((chat_id, service_type), None)
+            if subscription is None: continue
+            for minute, second, window in subscription.slots:
+                groups.setdefault((minute, subscription.time_zone, service_type, window), set()).add(chat_id)
+            self.time_zones[subscription.time_zone] -= 1
+        for (minute, time_zone, service_type, window), chat_ids in groups.items():
+            buckets = self.slots[minute][time_zone]
+            current_ids, current_seconds = buckets[(service_type, window)]
+            kept = [(chat_id, second) for chat_id, second in zip(current_ids, current_seconds) if chat_id not in chat_ids]
+            if len(kept) == 0: del buckets[(service_type, window)]
+            else: buckets[(service_type, window)] = (array('q', (item[0] for item in kept)), array('B', (item[1] for item in kept)))
+            if len(buckets) == 0: del self.slots[minute][time_zone]
+        # Time zones no longer in use are not checked anymore
+        for time_zone in [time_zone for time_zone, count in self.time_zones.items() if count == 0]:
+            del self.time_zones[time_zone]
+            self.last_tick.pop(time_zone, None)
+
+    # Removing a subscription, returning it (or None if it wasn't registered)
+    def remove(self, chat_id, service_type):
+        with self.lock:
+            return self._remove(int(chat_id), service_type)
+
+    # Removing a subscription (the lock must be held by the caller)
+    def _remove(self, chat_id, service_type):
+        subscription = self.subscriptions.pop((chat_id, service_type), None)
+        if subscription is None: return None
+        # Cleaning the wheel buckets: the last chat of the group takes the removed one's place
+        for minute, second, window in subscription.slots:
+            groups = self.slots[minute][subscription.time_zone]
+            chat_ids, seconds = groups[(service_type, window)]
+            index = chat_ids.index(chat_id)
+            chat_ids[index], seconds[index] = chat_ids[-1], seconds[-1]
+            chat_ids.pop()
+            seconds.pop()
+            if len(chat_ids) == 0: del groups[(service_type, window)]
+            if len(groups) == 0: del self.slots[minute][subscription.time_zone]
+        # Time zones no longer in use are not checked anymore
+        self.time_zones[subscription.time_zone] -= 1
+        if self.time_zones[subscription.time_zone] == 0:
+            del self.time_zones[subscription.time_zone]
+            self.last_tick.pop(subscription.time_zone, None)
+        return subscription
+
+    # Getting a subscription
+    def get(self, chat_id, service_type):
+        return self.subscriptions.get((int(chat_id), service_type))
+
+    # Checking if a subscription exists
+    def has(self, chat_id, service_type):
+        return (int(chat_id), service_type) in self.subscriptions
+
+    # Getting all subscriptions from a chat
+    def for_chat(self, chat_id):
+        with self.lock:
+            return [self.subscriptions[(int(chat_id), service_type)]
+                    for service_type in DEFAULT_TIMES if (int(chat_id), service_type) in self.subscriptions]
+
+    # Total of subscriptions on the wheel
+    def __len__(self):
+        return len(self.subscriptions)
+
+    # Getting a time zone in use, or None if it can't be loaded (e.g.: removed from the system's database)
+    # A bad time zone only skips its own subscriptions, the other ones are still delivered
+    def _get_time_zone(self, name):
+        try: return get_time_zone(name)
+        except ValueError as error:
+            if name not in self.invalid_time_zones:
+                self.invalid_time_zones.add(name)
+                logger.error('Entregas do fuso horário "%s" ignoradas: %s', name, error, extra={'event': 'invalid_time_zone'})
+            return None
+
+    # Getting the deliveries due up to 'now' (an aware datetime)
+    # Returns a list of (due_at, chat_id, service_type, window), with 'due_at' in UTC
+    # and 'window' identifying the delivery window (e.g.: 'santo 08:00')
+    def due(self, now):
+        deliveries = []
+        with self.lock:
+            for time_zone_name in self.time_zones:
+                time_zone = self._get_time_zone(time_zone_name)
+                if time_zone is None: continue
+                # Current local minute, as a naive datetime to walk through the minutes
+                local_now = now.astimezone(time_zone).replace(second=0, microsecond=0, tzinfo=None)
+                last_tick = self.last_tick.get(time_zone_name)
+                # On the first tick, only the current minute is processed
+                if last_tick is None: minute = local_now
+                # When the clocks go back (DST), repeated minutes are skipped
+                elif local_now <= last_tick: continue
+                # Otherwise, we process every minute since the last tick
+                else: minute = max(last_tick + timedelta(minutes=1), local_now - self.max_catchup)
+                self._collect(time_zone_name, time_zone, minute, local_now, deliveries)
+                self.last_tick[time_zone_name] = local_now
+        return deliveries
+
+    # Getting the deliveries due from 'start' up to the end of the current minute (aware datetimes),
+    # e.g.: the ones missed while the bot was down, in the same format as 'due'
+    # The next ticks continue after the current minute, so no delivery is returned twice
+    def replay(self, start, now):
+        deliveries = []
+        with self.lock:
+            for time_zone_name in self.time_zones:
+                time_zone = self._get_time_zone(time_zone_name)
+                if time_zone is None: continue
+                local_now = now.astimezone(time_zone).replace(second=0, microsecond=0, tzinfo=None)
+                minute = start.astimezone(time_zone).replace(second=0, microsecond=0, tzinfo=None)
+                self._collect(time_zone_name, time_zone, minute, local_now, deliveries)
+                self.last_tick[time_zone_name] = local_now
+        return deliveries
+
+    # Collecting the subscriptions from each minute bucket of a time zone, from 'minute' up to 'last' (naive local
+    # datetimes) into 'deliveries' (the lock must be held by the caller)
+    def _collect(self, time_zone_name, time_zone, minute, last, deliveries):
+        while minute <= last:
+            groups = self.slots[minute.hour * 60 + minute.minute].get(time_zone_name, {})
+            if len(groups) > 0:
+                minute_start = minute.replace(tzinfo=time_zone).astimezone(timezone.utc)
+                for (service_type, window), (chat_ids, seconds) in groups.items():
+                    label = f"{service_type} {format_times((window,))}"
+                    for chat_id, second in zip(chat_ids, seconds):
+                        deliveries.append((minute_start + timedelta(seconds=second), chat_id, service_type, label))
+            minute += timedelta(minutes=1)
+
+# Lateness (seconds between the due time and the actual send) of each delivery window
+class LatenessStats():
+    # Init func
+    def __init__(self, sample_size=1000):
+        self.sample_size = sample_size
+        self.windows = {}
+        self.lock = threading.Lock()
+
+    # Recording the lateness of a delivery
+    def record(self, window, lateness):
+        with self.lock:
+            stats = self.windows.get(window)
+            if stats is None:
+                stats = self.windows[window] = {'count': 0, 'total': 0.0, 'max': 0.0, 'sample': deque(maxlen=self.sample_size)}
+            stats['count'] += 1
+            stats['total'] += lateness
+            stats['max'] = max(stats['max'], lateness)
+            stats['sample'].append(lateness)
+
+    # Summary for each window: count, mean, p50, p95 and max (seconds)
+    def summary(self):
+        with self.lock:
+            summary = {}
+            for window, stats in sorted(self.windows.items()):
+                sample = sorted(stats['sample'])
+                summary[window] = {
+                    'count': stats['count'],
+                    'mean': stats['total'] / stats['count'],
+                    'p50': sample[int(0.50 * (len(sample) - 1))],
+                    'p95': sample[int(0.95 * (len(sample) - 1))],
+                    'max': stats['max'],
+                }
+            return summary
+
+# Pending items of the users who receive their services as a digest
+# The pending items are also kept on the delivery ledger (if given), so they survive a restart
+class Digests():
+    # Init func
+    def __init__(self, ledger=None):
+        self.pending = {}
+        self.ledger = ledger
+        # Items delivered through digests and the API calls used to send them
+        self.items = 0
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    # Loading the pending items saved on the ledger (after it was loaded), returning the number of chats
+    def load(self):
+        with self.lock:
+            self.pending = {chat_id: list(services) for chat_id, services in self.ledger.digests.items()}
+            return len(self.pending)
+
+    # Adding a service to the next digest of a chat
+    def add(self, chat_id, service_type):
+        with self.lock:
+            self.pending.setdefault(int(chat_id), []).append(service_type)
+            if self.ledger is not None: self.ledger.add_digest(chat_id, service_type)
+
+    # Getting (and clearing) the pending services of a chat
+    def pop(self, chat_id):
+        with self.lock:
+            pending = self.pending.pop(int(chat_id), [])
+            if self.ledger is not None and len(pending) > 0: self.ledger.clear_digest(chat_id)
+            return pending
+
+    # Recording a sent digest
+    def record(self, items, calls):
+        with self.lock:
+            self.items += items
+            self.calls += calls
+
+    # API calls saved by sending the items together
+    @property
+    def saved(self):
+        return self.items - self.calls
+
+# Function to compose a digest from rendered items, as (text, photo) tuples
+# Returns the operations to be sent: ('message', text), ('photo', (photo, caption))
+# or ('media_group', [(photo, caption), ...])
+def compose_digest(items, separator='\n\n'):
+    photos = [(photo, text) for text, photo in items if photo]
+    texts = [text for text, photo in items if not photo and text]
+    operations = []
+    # Texts go on the last photo caption when they fit
+    if len(photos) > 0 and len(texts) > 0:
+        merged = separator.join([photos[-1][1]] + texts)
+        if len(merged) <= CAPTION_LIMIT:
+            photos[-1] = (photos[-1][0], merged)
+            texts = []
+    # Photos are sent as media groups
+    for index in range(0, len(photos), MEDIA_GROUP_LIMIT):
+        group = photos[index:index + MEDIA_GROUP_LIMIT]
+        if len(group) == 1: operations.append(('photo', group[0]))
+        else: operations.append(('media_group', group))
+    # Texts are joined in as few messages as possible
+    message = ''
+    for text in texts:
+        if len(message) > 0 and len(message) + len(separator) + len(text) > MESSAGE_LIMIT:
+            operations.append(('message', message))
+            message = text
+        else: message = separator.join([message, text]) if len(message) > 0 else text
+    if len(message) > 0: operations.append(('message', message))
+    return operations
+
+# Function to send a delivery, recording its lateness (a failed delivery must not stop the remaining ones)
+def send_delivery(send, due_at, chat_id, service_type, window, stats=None):
+    sent = False
+    try:
+        send(chat_id, service_type, due_at)
+        sent = True
+    except Exception as error:
+        logger.warning('Falha ao enviar "%s" para %s: %s', service_type, chat_id, error)
+    lateness = max(0.0, time.time() - due_at.timestamp())
+    metrics.DELIVERY_LATENESS.observe(lateness, service_type)
+    if stats is not None: stats.record(window, lateness)
+    return sent
+
+# Function to send the due deliveries on time, without exceeding the rate limit (messages/second)
+# 'send' gets the chat ID, the service type and the intended fire time of each delivery
+# Blocks until the last one is sent, so it's only meant for its own thread (e.g.: the catch-up)
+def drain(deliveries, send, rate_limit, stats=None):
+    interval = 1 / rate_limit if rate_limit > 0 else 0
+    next_send = time.monotonic()
+    sent = 0
+    for due_at, chat_id, service_type, window in sorted(deliveries):
+        # Waiting for the chat offset inside the delivery window
+        wait = due_at.timestamp() - time.time()
+        if wait > 0: time.sleep(wait)
+        # Waiting for the next sending slot
+        now = time.monotonic()
+        if next_send > now:
+            time.sleep(next_send - now)
+            now = next_send
+        next_send = now + interval
+        if send_delivery(send, due_at, chat_id, service_type, window, stats): sent += 1
+    return sent
+
+# Queue of the due deliveries, sent on time by a dedicated thread without exceeding the rate limit (messages/second)
+# The wheel tick only pushes its deliveries here and returns, so a tick with many of them (or a slow Bot API)
+# never delays the next one; deliveries from different ticks are sent in order of their fire times
+class DeliveryQueue():
+    # Init func
+    def __init__(self, rate_limit, stats=None):
+        self.interval = 1 / rate_limit if rate_limit > 0 else 0
+        self.stats = stats
+        # Heap of (fire timestamp, sequence, delivery, send)
+        self.heap = []
+        self.sequence = 0
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopped = False
+
+    # Number of deliveries waiting to be sent
+    def __len__(self):
+        return len(self.heap)
+
+    # Seconds the oldest due delivery is waiting for (0 if none is due)
+    def backlog_seconds(self):
+        with self.condition:
+            if len(self.heap) == 0: return 0.0
+            return max(0.0, time.time() - self.heap[0][0])
+
+    # Adding deliveries, as (due_at, chat_id, service_type, window), to be sent by 'send'
+    # 'send' gets the chat ID, the service type and the intended fire time of each delivery
+    def push(self, deliveries, send):
+        with self.condition:
+            for due_at, chat_id, service_type, window in deliveries:
+                heapq.heappush(self.heap, (due_at.timestamp(), self.sequence, (due_at, chat_id, service_type, window), send))
+                self.sequence += 1
+            self.condition.notify()
+
+    # Starting the sender thread
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='deliveries', daemon=True)
+        self.thread.start()
+        return self
+
+    # Stopping the sender thread (the deliveries still waiting are dropped, the catch-up replays them)
+    def stop(self, timeout=5):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        if self.thread is not None: self.thread.join(timeout)
+
+    # Sender thread: waiting for the next delivery to be due, then for the next sending slot
+    def _run(self):
+        next_send = time.monotonic()
+        while True:
+            with self.condition:
+                while not self.stopped:
+                    wait = self.heap[0][0] - time.time() if len(self.heap) > 0 else None
+                    if wait is not None and wait <= 0: break
+                    self.condition.wait(wait)
+                if self.stopped: return
+                fire_at, sequence, (due_at, chat_id, service_type, window), send = heapq.heappop(self.heap)
+            now = time.monotonic()
+            if next_send > now:
+                time.sleep(next_send - now)
+                now = next_send
+            next_send = now + self.interval
+            send_delivery(send, due_at, chat_id, service_type, window, self.stats)
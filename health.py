@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 16:00:00 2026
+
+@author: Renato Henz
+
+Health checks: liveness (the bot threads are running) and readiness (the bot can deliver:
+the content is loaded and fresh, the outbound queue is flowing, the scheduler is on time and
+the database answers), served as JSON and used to feed the systemd watchdog
+
+"""
+
+# Main dependencies
+import json, logging, os, socket, threading, time
+
+logger = logging.getLogger(__name__)
+
+# Kinds of checks
+LIVE, READY = 'live', 'ready'
+
+# Health checks, as functions returning (ok, details dict)
+# Results are cached for a few seconds, so frequent probes don't hit the database
+class HealthChecks():
+    # Init func
+    def __init__(self, cache_seconds=5):
+        self.checks = {LIVE: {}, READY: {}}
+        self.cache_seconds = cache_seconds
+        self.cache = {}
+        self.lock = threading.Lock()
+        # Last heartbeat of each periodic task (timestamp)
+        self.beats = {}
+        self.created_at = time.time()
+        # When the readiness checks started failing (timestamp)
+        self.unready_since = None
+
+    # Adding a check
+    def add(self, kind, name, function):
+        self.checks[kind][name] = function
+
+    # Recording a periodic task heartbeat
+    def beat(self, name):
+        self.beats[name] = time.time()
+
+    # Seconds since the last heartbeat of a task (since the checks were created, if it never ran)
+    def heartbeat_age(self, name):
+        return time.time() - self.beats.get(name, self.created_at)
+
+    # Seconds since the readiness checks started failing (0 if they're passing)
+    def unready_for(self):
+        return 0 if self.unready_since is None else time.time() - self.unready_since
+
+    # Running the checks of a kind, as (ok, report)
+    def run(self, kind):
+        with self.lock:
+            cached = self.cache.get(kind)
+            if (cached is not None and time.monotonic() - cached[0] < self.cache_seconds): return cached[1]
+            results = {}
+            for name, function in self.checks[kind].items():
+                # A failing check never breaks the others
+                try: ok, details = function()
+                except Exception as error: ok, details = False, {'error': f"{type(error).__name__}: {error}"}
+                results[name] = dict(details, ok=bool(ok))
+            # Without any checks (e.g.: still starting), the bot isn't healthy yet
+            ok = len(results) > 0 and all(result['ok'] for result in results.values())
+            if (kind == READY):
+                if (ok): self.unready_since = None
+                elif (self.unready_since is None): self.unready_since = time.time()
+            report = {'status': 'ok' if ok else 'fail', 'checks': results}
+            self.cache[kind] = (time.monotonic(), (ok, report))
+            return ok, report
+
+    # HTTP route for the checks of a kind (see 'metrics.routes'): 200 if they pass, 503 otherwise
+    def route(self, kind):
+        ok, report = self.run(kind)
+        return 200 if ok else 503, 'application/json', json.dumps(report, ensure_ascii=False) + '\n'
+
+# Function to create a check which passes if every collection (given by a function) isn't empty
+def check_not_empty(collections):
+    def check():
+        sizes = {name: len(function()) for name, function in collections.items()}
+        return all(size > 0 for size in sizes.values()), {'sizes': sizes}
+    return check
+
+# Function to create a check of the content ages ({source: seconds}, given by a function)
+# Sources with a maximum age ({source: seconds}) fail when older than it, or when never loaded
+def check_ages(get_ages, max_ages):
+    def check():
+        ages = {source: round(age) for source, age in get_ages().items()}
+        stale = sorted(source for source, max_age in max_ages.items() if ages.get(source, float('inf')) > max_age)
+        return len(stale) == 0, {'ages': ages, 'stale': stale}
+    return check
+
+# Function to create a check which passes while a value (given by a function) is within a limit
+def check_limit(name, get_value, limit):
+    def check():
+        value = get_value()
+        return value <= limit, {name: value, 'limit': limit}
+    return check
+
+# Function to create a check which passes while a periodic task heartbeat is recent
+def check_heartbeat(checks, name, max_age):
+    def check():
+        age = checks.heartbeat_age(name)
+        return age <= max_age, {'seconds_since_last_run': round(age, 1), 'limit': max_age}
+    return check
+
+# Function to send a notification to systemd (only under a 'Type=notify' unit, which sets 'NOTIFY_SOCKET')
+def notify(state):
+    address = os.getenv('NOTIFY_SOCKET')
+    if (not address): return False
+    # Abstract namespace sockets
+    if (address.startswith('@')): address = '\0' + address[1:]
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as notify_socket:
+            notify_socket.connect(address)
+            notify_socket.sendall(state.encode('utf-8'))
+        return True
+    except OSError as error:
+        logger.warning('Erro ao notificar o systemd: %s', error, extra={'event': 'systemd_notify_error'})
+        return False
+
+# Function to get the watchdog interval (seconds), half the one set on the unit ('WatchdogSec'), or None if disabled
+def get_watchdog_interval():
+    usec, pid = os.getenv('WATCHDOG_USEC'), os.getenv('WATCHDOG_PID')
+    if (not usec or (pid and int(pid) != os.getpid())): return None
+    return int(usec) / 1e6 / 2
+
+# Function to feed the systemd watchdog on a background thread, while the bot is alive and ready
+# Readiness failures are tolerated for 'unready_grace' seconds (e.g.: while the content is loading), after
+# which the watchdog stops being fed and systemd restarts the bot. Returns the thread (None if disabled)
+def start_watchdog(checks, unready_grace=600):
+    interval = get_watchdog_interval()
+    if (interval is None): return None
+    # Function to check the bot and feed the watchdog
+    def run():
+        failing = False
+        while True:
+            live, live_report = checks.run(LIVE)
+            ready, ready_report = checks.run(READY)
+            healthy = live and (ready or checks.unready_for() < unready_grace)
+            if (healthy): notify('WATCHDOG=1')
+            # Failures are only logged when they start, the watchdog restarts the bot soon after
+            elif (not failing):
+                failed = [
+                    name for report in (live_report, ready_report)
+                    for name, result in report['checks'].items() if not result['ok']
+                ]
+                logger.error('Watchdog do systemd não será alimentado, verificações falhando: %s', ', '.join(failed),
+                             extra={'event': 'watchdog_unhealthy'})
+            failing = not healthy
+            notify(f"STATUS={'Pronto' if ready else 'Indisponível'}")
+            time.sleep(interval)
+    thread = threading.Thread(target=run, name='watchdog', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 17:00:00 2026
+
+@author: Renato Henz
+
+Media ingestion: files received by the bot are streamed in chunks to the 'uploads'
+directories by a bounded pool of download threads, deduplicated by their Telegram
+unique ID and content hash, and the least recently used ones are removed when the
+disk quota is exceeded
+
+"""
+
+# Main dependencies
+import hashlib, json, logging, os, threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Directory of each kind of media, inside the uploads directory
+KIND_DIRECTORIES = {
+    'photo': 'photos',
+    'video': 'videos',
+    'animation': 'animations',
+    'document': 'documents',
+    'sticker': 'stickers',
+    'voice': 'voice',
+    'audio': 'music',
+    'video_note': 'video_notes',
+}
+
+# Outcomes of a submitted file
+QUEUED, DUPLICATE, PENDING, TOO_LARGE, BUSY = 'queued', 'duplicate', 'pending', 'too_large', 'busy'
+
+# Files which are never removed (the directories placeholders and the index)
+INDEX_FILE = 'index.json'
+KEPT_FILES = ('.nomedia', INDEX_FILE)
+
+# Error raised when a download is larger than allowed
+class FileTooLarge(Exception):
+    pass
+
+# Media ingestion into the uploads directories
+# 'fetch(file_id)' must return the remote file name and an iterable of bytes chunks, so files are
+# never loaded into memory at once; stored files are named after their SHA-256 hash
+class Ingestion():
+    # Init func
+    def __init__(self, root, fetch, quota_bytes=1024 ** 3, max_file_bytes=20 * 1024 ** 2, workers=2, max_pending=100):
+        self.root = root
+        self.fetch = fetch
+        self.quota_bytes = quota_bytes
+        self.max_file_bytes = max_file_bytes
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ingestion')
+        # Telegram unique IDs and content hashes of the stored files, as {key: relative path}
+        self.unique_ids = {}
+        self.hashes = {}
+        # Stored files sizes, as {relative path: bytes}, and their total
+        self.sizes = {}
+        self.total_bytes = 0
+        # Unique IDs being downloaded
+        self.pending = set()
+        # Totals, as {outcome: count}, and the downloaded bytes
+        self.stats = {}
+        self.downloaded_bytes = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    # Loading the stored files and the unique IDs index
+    def load(self):
+        for directory in KIND_DIRECTORIES.values():
+            os.makedirs(os.path.join(self.root, directory), exist_ok=True)
+            for name in os.listdir(os.path.join(self.root, directory)):
+                path = os.path.join(directory, name)
+                # Unfinished downloads are discarded
+                if (name.endswith('.part')): os.remove(os.path.join(self.root, path))
+                elif (name not in KEPT_FILES):
+                    self.sizes[path] = os.path.getsize(os.path.join(self.root, path))
+                    self.hashes[os.path.splitext(name)[0]] = path
+        self.total_bytes = sum(self.sizes.values())
+        try:
+            with open(os.path.join(self.root, INDEX_FILE), encoding='utf-8') as file:
+                self.unique_ids = {unique_id: path for unique_id, path in json.load(file).items() if path in self.sizes}
+        except (OSError, ValueError): self.unique_ids = {}
+
+    # Saving the unique IDs index (the lock must be held by the caller)
+    def _save_index(self):
+        path = os.path.join(self.root, INDEX_FILE)
+        try:
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as file: json.dump(self.unique_ids, file)
+            os.replace(f"{path}.tmp", path)
+        except OSError as error: logger.warning('Não foi possível salvar o índice de arquivos recebidos: %s', error)
+
+    # Counting an outcome (the lock must be held by the caller)
+    def _count(self, outcome):
+        self.stats[outcome] = self.stats.get(outcome, 0) + 1
+        return outcome
+
+    # Submitting a received file to be downloaded, returning the outcome right away
+    def submit(self, kind, file_id, file_unique_id, file_size=None):
+        with self.lock:
+            path = self.unique_ids.get(file_unique_id)
+            if (path is not None):
+                self._touch(path)
+                return self._count(DUPLICATE)
+            if (file_unique_id in self.pending): return self._count(PENDING)
+            if (file_size is not None and file_size > min(self.max_file_bytes, self.quota_bytes)): return self._count(TOO_LARGE)
+            if (len(self.pending) >= self.max_pending): return self._count(BUSY)
+            self.pending.add(file_unique_id)
+        self.executor.submit(self._ingest, kind, file_id, file_unique_id)
+        with self.lock: return self._count(QUEUED)
+
+    # Downloading a file (on the pool threads)
+    def _ingest(self, kind, file_id, file_unique_id):
+        directory = KIND_DIRECTORIES.get(kind, 'documents')
+        temporary = os.path.join(self.root, directory, f"{file_unique_id}.part")
+        try:
+            name, chunks = self.fetch(file_id)
+            digest, size = self._stream(chunks, temporary)
+            self._store(directory, temporary, file_unique_id, digest.hexdigest(), os.path.splitext(name)[1].lower(), size)
+        except FileTooLarge:
+            with self.lock: self._count(TOO_LARGE)
+        except Exception as error:
+            logger.warning('Não foi possível baixar o arquivo "%s": %s', file_unique_id, error)
+            with self.lock: self._count('error')
+        finally:
+            if (os.path.exists(temporary)): os.remove(temporary)
+            with self.lock: self.pending.discard(file_unique_id)
+
+    # Writing the chunks to a temporary file, returning their hash and size
+    def _stream(self, chunks, temporary):
+        digest, size = hashlib.sha256(), 0
+        with open(temporary, 'wb') as file:
+            for chunk in chunks:
+                size += len(chunk)
+                if (size > self.max_file_bytes): raise FileTooLarge(temporary)
+                digest.update(chunk)
+                file.write(chunk)
+        return digest, size
+
+    # Storing a downloaded file, unless the same content is already stored
+    def _store(self, directory, temporary, file_unique_id, digest, extension, size):
+        with self.lock:
+            self.downloaded_bytes += size
+            path = self.hashes.get(digest)
+            if (path is not None):
+                self._touch(path)
+                self._count('same_content')
+            else:
+                path = os.path.join(directory, digest + extension)
+                os.replace(temporary, os.path.join(self.root, path))
+                self.hashes[digest] = path
+                self.sizes[path] = size
+                self.total_bytes += size
+                self._count('stored')
+            self.unique_ids[file_unique_id] = path
+            self._enforce_quota(keep=path)
+            self._save_index()
+
+    # Marking a file as recently used (the lock must be held by the caller)
+    def _touch(self, path):
+        try: os.utime(os.path.join(self.root, path))
+        except OSError: pass
+
+    # Removing the least recently used files until the quota is met (the lock must be held by the caller)
+    def _enforce_quota(self, keep=None):
+        if (self.total_bytes <= self.quota_bytes): return
+        files = sorted(self.sizes, key=lambda path: os.path.getmtime(os.path.join(self.root, path)))
+        removed = set()
+        for path in files:
+            if (self.total_bytes <= self.quota_bytes): break
+            if (path == keep): continue
+            try: os.remove(os.path.join(self.root, path))
+            except FileNotFoundError: pass
+            self.total_bytes -= self.sizes.pop(path)
+            removed.add(path)
+        self.hashes = {digest: path for digest, path in self.hashes.items() if path not in removed}
+        self.unique_ids = {unique_id: path for unique_id, path in self.unique_ids.items() if path not in removed}
+        self.stats['evicted'] = self.stats.get('evicted', 0) + len(removed)
+
+    # Waiting for the submitted downloads (e.g.: on shutdown)
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+    # Summary of the stored files and outcomes
+    def summary(self):
+        with self.lock:
+            return {
+                'files': len(self.sizes),
+                'bytes': self.total_bytes,
+                'quota_bytes': self.quota_bytes,
+                'downloading': len(self.pending),
+                'downloaded_bytes': self.downloaded_bytes,
+                **self.stats,
+            }
+
+# Function to get the kind, file ID, unique ID and size of the file of a message (None if there's no file)
+# For photos, the largest size is used
+def get_attachment(message):
+    for kind in KIND_DIRECTORIES:
+        attachment = getattr(message, kind, None)
+        if (not attachment): continue
+        if (isinstance(attachment, (list, tuple))): attachment = attachment[-1]
+        return kind, attachment.file_id, attachment.file_unique_id, getattr(attachment, 'file_size', None)
+    return None
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 15:00:00 2026
+
+@author: Renato Henz
+
+Inline queries index: prefix and trigram matching over the content titles,
+with an LRU cache of the results for each normalized query
+
+"""
+
+# Main dependencies
+import heapq, re, threading
+from collections import OrderedDict
+
+# Accent and case folding, shared with the full-text search
+from search import fold
+
+# Ranking of each kind of item (lower first), by the ID prefix
+KIND_RANKS = {'oracao': 0, 'terco': 0, 'misterio': 1, 'jaculatoria': 2}
+
+# Function to normalize a query (folded words separated by single spaces)
+def normalize(query):
+    return ' '.join(re.findall(r'\w+', fold(query)))
+
+# Function to get the trigrams of a normalized text (words are padded, so short ones count too)
+def trigrams(text):
+    grams = set()
+    for word in text.split():
+        padded = f" {word} "
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return grams
+
+# Precomputed index of the items shown on inline queries
+# Items are given as {item ID: (title, searchable text)}; words are matched by their prefixes,
+# and the trigrams are used when no prefix matches (e.g.: typos)
+class InlineIndex():
+    # Init func
+    def __init__(self, cache_size=1024, max_prefix=12, min_similarity=0.4):
+        self.max_prefix = max_prefix
+        self.min_similarity = min_similarity
+        self.items = {}
+        self.prefixes = {}
+        self.grams = {}
+        # Items in their default order (shown for empty queries) and their positions on it
+        self.ordered = []
+        self.positions = {}
+        # Results cache, as {normalized query: item IDs}
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    # Number of items
+    def __len__(self):
+        return len(self.items)
+
+    # Building the index (the new structures replace the old ones at once, and the cache is cleared)
+    def build(self, items):
+        prefixes, grams, normalized = {}, {}, {}
+        for item_id, (title, text) in items.items():
+            words = normalize(text)
+            normalized[item_id] = (normalize(title), words)
+            for word in set(words.split()):
+                for size in range(1, min(len(word), self.max_prefix) + 1):
+                    prefixes.setdefault(word[:size], set()).add(item_id)
+            for gram in trigrams(words): grams.setdefault(gram, set()).add(item_id)
+        # Default order: kind, then shorter and alphabetically first titles
+        ordered = sorted(items, key=lambda item_id: (self.rank(item_id), len(normalized[item_id][0]), normalized[item_id][0]))
+        positions = {item_id: position for position, item_id in enumerate(ordered)}
+        with self.lock:
+            self.items, self.prefixes, self.grams, self.ordered, self.positions = normalized, prefixes, grams, ordered, positions
+            self.cache.clear()
+
+    # Kind ranking of an item
+    def rank(self, item_id):
+        return KIND_RANKS.get(item_id.split(':')[0], len(KIND_RANKS))
+
+    # Searching the items matching a query, returning their IDs (cached by normalized query)
+    def search(self, query, limit=20):
+        key = normalize(query)
+        with self.lock:
+            if (key in self.cache):
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return self.cache[key][:limit]
+            self.misses += 1
+            items, prefixes, grams, ordered, positions = self.items, self.prefixes, self.grams, self.ordered, self.positions
+        results = ordered[:limit] if key == '' else self.match(key, items, prefixes, grams, positions, limit)
+        with self.lock:
+            self.cache[key] = results
+            if (len(self.cache) > self.cache_size): self.cache.popitem(last=False)
+        return results
+
+    # Matching a normalized query: every word must start a word of the item
+    # Items whose title starts with the query come first, then the default order
+    def match(self, key, items, prefixes, grams, positions, limit):
+        candidates = None
+        for word in key.split():
+            found = prefixes.get(word[:self.max_prefix], set())
+            # Words longer than the indexed prefixes are checked on the items themselves
+            if (len(word) > self.max_prefix):
+                found = {item_id for item_id in found if re.search(r'\b' + word, items[item_id][1])}
+            candidates = found if candidates is None else candidates & found
+            if (len(candidates) == 0): break
+        starting = [item_id for item_id in candidates if items[item_id][0].startswith(key)]
+        results = heapq.nsmallest(limit, starting, key=positions.get)
+        if (len(results) < limit):
+            others = (item_id for item_id in candidates if not items[item_id][0].startswith(key))
+            results += heapq.nsmallest(limit - len(results), others, key=positions.get)
+        # Without any prefix match (e.g.: a typo), the most similar items by trigrams are used
+        if (len(results) == 0):
+            query_grams = trigrams(key)
+            shared = {}
+            for gram in query_grams:
+                for item_id in grams.get(gram, ()): shared[item_id] = shared.get(item_id, 0) + 1
+            similar = [(count / len(query_grams), item_id) for item_id, count in shared.items()
+                       if count / len(query_grams) >= self.min_similarity]
+            similar.sort(key=lambda pair: (-pair[0], self.rank(pair[1])))
+            results = [item_id for score, item_id in similar[:limit]]
+        return results
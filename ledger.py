@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 19:00:00 2026
+
+@author: Renato Henz
+
+Delivery ledger: the last delivered slot of each chat and service, the last minute
+processed by the timing wheel and the services waiting for each digest, kept on an
+append-only journal so the deliveries missed while the bot was down can be replayed
+after a restart, without sending any twice or losing the pending digest items
+
+"""
+
+# Main dependencies
+import logging, os, threading
+
+logger = logging.getLogger(__name__)
+
+# Ledger of the scheduled deliveries, saved as journal lines:
+# 's <chat_id> <service_type> <due timestamp>' for each delivered slot, 't <timestamp>' for each wheel tick,
+# 'd <chat_id> <service_type>' for each service added to a digest and 'c <chat_id>' when a digest is taken
+# The journal is compacted (rewritten with only the last entries) on load and when it grows too much
+class DeliveryLedger():
+    # Init func
+    def __init__(self, path, compact_every=100000):
+        self.path = path
+        self.compact_every = compact_every
+        # Last delivered slot (due timestamp) by (chat_id, service_type)
+        self.entries = {}
+        # Start of the last minute processed by the timing wheel (timestamp)
+        self.last_tick = None
+        # Services waiting for the next digest, by chat_id
+        self.digests = {}
+        self.lines = 0
+        self.file = None
+        self.lock = threading.Lock()
+
+    # Loading the journal (a missing one is an empty ledger) and compacting it
+    def load(self):
+        with self.lock:
+            if (os.path.exists(self.path)):
+                with open(self.path, encoding='utf-8') as file:
+                    for line in file:
+                        fields = line.split()
+                        # Lines cut by a crash are ignored
+                        try:
+                            if (fields[0] == 's' and len(fields) == 4):
+                                key = (int(fields[1]), fields[2])
+                                self.entries[key] = max(self.entries.get(key, 0), int(fields[3]))
+                            elif (fields[0] == 't' and len(fields) == 2):
+                                self.last_tick = max(self.last_tick or 0, int(fields[1]))
+                            elif (fields[0] == 'd' and len(fields) == 3):
+                                self.digests.setdefault(int(fields[1]), []).append(fields[2])
+                            elif (fields[0] == 'c' and len(fields) == 2):
+                                self.digests.pop(int(fields[1]), None)
+                        except (IndexError, ValueError): continue
+            self._compact()
+        return len(self.entries)
+
+    # Rewriting the journal with only the last entries (the lock must be held by the caller)
+    def _compact(self):
+        if (self.file is not None): self.file.close()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            for (chat_id, service_type), due_at in self.entries.items(): file.write(f"s {chat_id} {service_type} {due_at}\n")
+            if (self.last_tick is not None): file.write(f"t {self.last_tick}\n")
+            for chat_id, services in self.digests.items():
+                for service_type in services: file.write(f"d {chat_id} {service_type}\n")
+        os.replace(tmp_path, self.path)
+        self.lines = len(self.entries) + 1 + sum(len(services) for services in self.digests.values())
+        # Line buffered, so each entry reaches the file as soon as it's written
+        self.file = open(self.path, 'a', encoding='utf-8', buffering=1)
+
+    # Writing a journal line (the lock must be held by the caller)
+    def _write(self, line):
+        if (self.file is None): return
+        self.file.write(line)
+        self.lines += 1
+        if (self.lines > self.compact_every + len(self.entries)): self._compact()
+
+    # Recording a delivered slot (its due timestamp)
+    def record(self, chat_id, service_type, due_at):
+        key, due_at = (int(chat_id), service_type), int(due_at)
+        with self.lock:
+            if (self.entries.get(key, 0) >= due_at): return
+            self.entries[key] = due_at
+            self._write(f"s {key[0]} {service_type} {due_at}\n")
+
+    # Recording the minute processed by the timing wheel (its start timestamp)
+    def tick(self, minute):
+        minute = int(minute) // 60 * 60
+        with self.lock:
+            if (self.last_tick is not None and self.last_tick >= minute): return
+            self.last_tick = minute
+            self._write(f"t {minute}\n")
+
+    # Recording a service added to the next digest of a chat
+    def add_digest(self, chat_id, service_type):
+        with self.lock:
+            self.digests.setdefault(int(chat_id), []).append(service_type)
+            self._write(f"d {int(chat_id)} {service_type}\n")
+
+    # Recording that the pending services of a chat were taken (sent or discarded)
+    def clear_digest(self, chat_id):
+        with self.lock:
+            if (self.digests.pop(int(chat_id), None) is None): return
+            self._write(f"c {int(chat_id)}\n")
+
+    # Checking if a slot (or a later one) was already delivered
+    def delivered(self, chat_id, service_type, due_at):
+        return self.entries.get((int(chat_id), service_type), -1) >= int(due_at)
+
+    # Closing the journal
+    def close(self):
+        with self.lock:
+            if (self.file is not None): self.file.close()
+            self.file = None
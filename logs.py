@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 18:00:00 2026
+
+@author: Renato Henz
+
+Structured logging: records are queued by the calling thread and written by a
+listener thread (as JSON or text), with sampling of high-volume events, rate-limited
+errors and correlation IDs for each update and delivery
+
+"""
+
+# Main dependencies
+import atexit, contextvars, json, logging, logging.handlers, queue, sys, threading, time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Correlation ID of the current update or delivery (each thread has its own context)
+correlation_id = contextvars.ContextVar('correlation_id', default=None)
+
+# Standard log record attributes; the others were given as 'extra' and are output as fields
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'correlation_id'}
+
+# Context to tag the records logged in a block with a correlation ID
+@contextmanager
+def correlated(value):
+    token = correlation_id.set(value)
+    try: yield value
+    finally: correlation_id.reset(token)
+
+# Filter adding the current correlation ID to the records
+class CorrelationFilter(logging.Filter):
+    def filter(self, record):
+        record.correlation_id = correlation_id.get()
+        return True
+
+# Filter keeping only 1 of every N records of the high-volume events (given as 'extra={"event": ...}')
+# The kept records get a 'sampled' field with N, so the totals can be estimated
+class SamplingFilter(logging.Filter):
+    # Init func
+    def __init__(self, rates):
+        super(SamplingFilter, self).__init__()
+        # Kept fraction of each event, as the N of '1 of every N'
+        self.every = {event: max(1, round(1 / rate)) for event, rate in rates.items() if rate > 0}
+        self.dropped = {event for event, rate in rates.items() if rate <= 0}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        event = getattr(record, 'event', None)
+        if (event is None or record.levelno >= logging.WARNING): return True
+        if (event in self.dropped): return False
+        every = self.every.get(event)
+        if (every is None or every == 1): return True
+        with self.lock:
+            count = self.counts[event] = self.counts.get(event, 0) + 1
+        if (count % every != 1): return False
+        record.sampled = every
+        return True
+
+# Filter limiting the warnings and errors with the same message to a burst within each interval
+# The next record let through after an interval tells how many were suppressed
+class RateLimitFilter(logging.Filter):
+    # Init func
+    def __init__(self, burst=5, interval=60, level=logging.WARNING):
+        super(RateLimitFilter, self).__init__()
+        self.burst = burst
+        self.interval = interval
+        self.level = level
+        # State of each message, as {key: [interval start, records, suppressed]}
+        self.windows = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if (record.levelno < self.level): return True
+        key = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg).__name__)
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(key)
+            if (window is None or now - window[0] >= self.interval):
+                suppressed = window[2] if window is not None else 0
+                window = self.windows[key] = [now, 0, 0]
+                if (suppressed > 0): record.suppressed = suppressed
+                # Old messages are forgotten, so the dict doesn't grow forever
+                if (len(self.windows) > 1000):
+                    self.windows = {k: w for k, w in self.windows.items() if now - w[0] < self.interval}
+            window[1] += 1
+            if (window[1] <= self.burst): return True
+            window[2] += 1
+            return False
+
+# Formatter writing each record as a JSON line, with the extra fields
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if (getattr(record, 'correlation_id', None) is not None): entry['correlation_id'] = record.correlation_id
+        for name, value in vars(record).items():
+            if (name not in STANDARD_ATTRIBUTES): entry[name] = value
+        if (record.exc_info): entry['exception'] = self.formatException(record.exc_info)
+        elif (record.exc_text): entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+# Formatter writing each record as a text line, with the correlation ID and the extra fields
+class TextFormatter(logging.Formatter):
+    # Init func
+    def __init__(self):
+        super(TextFormatter, self).__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    def format(self, record):
+        line = super(TextFormatter, self).format(record)
+        fields = {name: value for name, value in vars(record).items() if name not in STANDARD_ATTRIBUTES}
+        if (getattr(record, 'correlation_id', None) is not None): fields['correlation_id'] = record.correlation_id
+        if (len(fields) > 0): line += ' ' + ' '.join(f"{name}={value}" for name, value in fields.items())
+        return line
+
+# Queue handler which only merges the message arguments on the calling thread
+# Formatting (and the exception traceback, if any) is left to the listener thread
+class QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        record.message = record.getMessage()
+        if (record.exc_info):
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.msg, record.args = record.message, None
+        return record
+
+# Function to set up the logging pipeline, returning the (started) queue listener
+# 'sampling' is given as {event: kept fraction}, e.g.: {'broadcast_sent': 0.01}
+def setup(level=logging.INFO, json_output=True, stream=None, sampling=None, error_burst=5, error_interval=60):
+    records = queue.SimpleQueue()
+    handler = QueueHandler(records)
+    handler.addFilter(CorrelationFilter())
+    if (sampling): handler.addFilter(SamplingFilter(sampling))
+    if (error_burst > 0): handler.addFilter(RateLimitFilter(error_burst, error_interval))
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if json_output else TextFormatter())
+    listener = logging.handlers.QueueListener(records, output)
+    root = logging.getLogger()
+    for current in list(root.handlers): root.removeHandler(current)
+    root.addHandler(handler)
+    root.setLevel(level)
+    listener.start()
+    # Pending records are written before exiting
+    atexit.register(stop, listener)
+    return listener
+
+# Function to stop a queue listener, writing its pending records (if it's still running)
+def stop(listener):
+    if (listener._thread is not None): listener.stop()
+
+# Function to parse the sampling rates, given as 'event=rate,event=rate'
+def parse_sampling(value):
+    rates = {}
+    for item in (value or '').split(','):
+        if ('=' not in item): continue
+        event, rate = item.split('=', 1)
+        rates[event.strip()] = float(rate)
+    return rates
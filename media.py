@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 09:00:00 2026
+
+@author: Renato Henz
+
+Local mirror of the S3 bucket images, with variants resized and compressed for
+Telegram photos, which are uploaded instead of having Telegram fetch the originals
+
+"""
+
+# Main dependencies
+import json, logging, os, threading
+from urllib.parse import urlparse
+
+# Images processing
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Telegram shows photos with up to 1280 pixels on the longest side, and uploads are limited to 10 MB
+MAX_SIDE = 1280
+MAX_PHOTO_BYTES = 10 * 1024 ** 2
+# JPEG quality of the variants (lowered in steps, down to the minimum, while they're too large)
+QUALITY = 85
+MIN_QUALITY = 45
+
+# Image files extensions
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.gif')
+
+# Manifest with the mirrored images, as {URL: entry}
+MANIFEST_FILE = 'index.json'
+
+# Function to create the Telegram variant of an image, returning its size (bytes)
+def make_variant(source, target, max_side=MAX_SIDE, quality=QUALITY, max_bytes=MAX_PHOTO_BYTES):
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        # Transparent images are flattened on white, since JPEG has no alpha channel
+        if (image.mode in ('RGBA', 'LA', 'P')):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif (image.mode != 'RGB'): image = image.convert('RGB')
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        while True:
+            image.save(target, 'JPEG', quality=quality, optimize=True, progressive=True)
+            if (os.path.getsize(target) <= max_bytes or quality <= MIN_QUALITY): break
+            quality -= 10
+    return os.path.getsize(target)
+
+# Local mirror of the images, as 'originals' and 'variants' directories and a manifest
+# 'fetch(url, path)' must download an image to a file
+class Mirror():
+    # Init func
+    def __init__(self, directory, fetch, max_side=MAX_SIDE, quality=QUALITY):
+        self.directory = directory
+        self.fetch = fetch
+        self.max_side = max_side
+        self.quality = quality
+        # Mirrored images, as {URL: {'original', 'variant', 'original_bytes', 'variant_bytes'}}
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.syncing = threading.Lock()
+        self.load()
+
+    # Loading the manifest (entries whose files are missing are mirrored again)
+    def load(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST_FILE), encoding='utf-8') as file: entries = json.load(file)
+        except (OSError, ValueError): entries = {}
+        self.entries = {url: entry for url, entry in entries.items() if os.path.exists(os.path.join(self.directory, entry['variant']))}
+
+    # Saving the manifest
+    def save(self):
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        with self.lock: entries = dict(self.entries)
+        try:
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as file: json.dump(entries, file, indent=1)
+            os.replace(f"{path}.tmp", path)
+        except OSError as error: logger.warning('Não foi possível salvar o índice de imagens: %s', error)
+
+    # Local path of the variant of an image (None if it isn't mirrored)
+    def get(self, url):
+        entry = self.entries.get(url)
+        return None if entry is None else os.path.join(self.directory, entry['variant'])
+
+    # Mirroring the images not mirrored yet (and removing the ones no longer listed), returning the new ones
+    # Only one sync runs at a time; a sync requested meanwhile is skipped
+    def sync(self, urls):
+        if (not self.syncing.acquire(blocking=False)): return 0
+        try:
+            urls = [url for url in urls if os.path.splitext(urlparse(url).path)[1].lower() in IMAGE_EXTENSIONS]
+            mirrored = 0
+            for url in urls:
+                if (url in self.entries): continue
+                try:
+                    entry = self.mirror(url)
+                    with self.lock: self.entries[url] = entry
+                    mirrored += 1
+                except Exception as error: logger.warning('Não foi possível espelhar a imagem "%s": %s', url, error)
+            listed = set(urls)
+            with self.lock: removed = [self.entries.pop(url) for url in list(self.entries) if url not in listed]
+            for entry in removed:
+                for key in ('original', 'variant'):
+                    try: os.remove(os.path.join(self.directory, entry[key]))
+                    except OSError: pass
+            if (mirrored > 0 or len(removed) > 0): self.save()
+            return mirrored
+        finally: self.syncing.release()
+
+    # Mirroring an image: downloading the original and creating its variant
+    def mirror(self, url):
+        key = urlparse(url).path.lstrip('/')
+        original = os.path.join('originals', key)
+        variant = os.path.join('variants', os.path.splitext(key)[0] + '.jpg')
+        for path in (original, variant): os.makedirs(os.path.dirname(os.path.join(self.directory, path)), exist_ok=True)
+        self.fetch(url, os.path.join(self.directory, original))
+        original_bytes = os.path.getsize(os.path.join(self.directory, original))
+        variant_bytes = make_variant(
+            os.path.join(self.directory, original), os.path.join(self.directory, variant),
+            max_side=self.max_side, quality=self.quality,
+        )
+        # Small originals may already be better than the variant, so they're used directly
+        if (variant_bytes >= original_bytes and original_bytes <= MAX_PHOTO_BYTES):
+            os.remove(os.path.join(self.directory, variant))
+            variant, variant_bytes = original, original_bytes
+        return {'original': original, 'variant': variant, 'original_bytes': original_bytes, 'variant_bytes': variant_bytes}
+
+    # Totals of the mirrored images
+    def summary(self):
+        with self.lock: entries = list(self.entries.values())
+        original = sum(entry['original_bytes'] for entry in entries)
+        variant = sum(entry['variant_bytes'] for entry in entries)
+        return {
+            'images': len(entries),
+            'original_bytes': original,
+            'variant_bytes': variant,
+            'saved_bytes': original - variant,
+            'saved_ratio': round(1 - variant / original, 3) if original > 0 else 0,
+        }
+
+# Function to format the mirror report, with the bytes saved and the photos sending latency
+# 'latencies' are the sendPhoto latency percentiles for each kind of source (URL, upload or file ID)
+def report(summary, latencies=None):
+    lines = [
+        'Espelho de imagens:',
+        f"  {summary['images']} imagens, {summary['original_bytes'] / 1024 ** 2:.1f} MB originais → "
+        f"{summary['variant_bytes'] / 1024 ** 2:.1f} MB otimizadas ({summary['saved_ratio']:.0%} a menos)",
+    ]
+    for source, values in (latencies or {}).items():
+        lines.append(f"  Envio de fotos ({source}): {values['count']} envios, p50 {values['p50']:.2f} s, p95 {values['p95']:.2f} s")
+    return '\n'.join(lines)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 13:00:00 2026
+
+@author: Renato Henz
+
+Memory footprint: process RSS, approximate sizes of the main structures and the
+top allocations traced by tracemalloc (only while tracing, since it has an overhead)
+
+"""
+
+# Main dependencies
+import gc, os, sys, tracemalloc
+from array import array
+
+# Function to get the process resident set size (bytes)
+def get_rss():
+    try:
+        with open('/proc/self/statm') as file: return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    # Not on Linux: the peak RSS is used instead (kilobytes on Linux, bytes on macOS)
+    except OSError:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == 'darwin' else rss * 1024
+
+# Function to get the approximate size (bytes) of an object and everything it references
+# Shared objects (e.g.: interned strings) are counted only once
+def deep_size(obj, seen=None):
+    seen = set() if seen is None else seen
+    size, pending = 0, [obj]
+    while pending:
+        current = pending.pop()
+        if (id(current) in seen): continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+        if (isinstance(current, (str, bytes, int, float, bool, array)) or current is None): continue
+        if (isinstance(current, dict)): pending.extend(current.keys()); pending.extend(current.values())
+        elif (isinstance(current, (list, tuple, set, frozenset))): pending.extend(current)
+        else:
+            if (hasattr(current, '__dict__')): pending.append(vars(current))
+            for name in getattr(type(current), '__slots__', ()):
+                if (hasattr(current, name)): pending.append(getattr(current, name))
+    return size
+
+# Function to start tracing the allocations (returns False if it was already tracing)
+def start_tracing(frames=1):
+    if (tracemalloc.is_tracing()): return False
+    tracemalloc.start(frames)
+    return True
+
+# Function to stop tracing the allocations (returns False if it wasn't tracing)
+def stop_tracing():
+    if (not tracemalloc.is_tracing()): return False
+    tracemalloc.stop()
+    return True
+
+# Function to get the top traced allocations, as (file:line, bytes, count)
+def top_allocations(limit=10):
+    if (not tracemalloc.is_tracing()): return []
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+    return [
+        (f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}", stat.size, stat.count)
+        for stat in snapshot.statistics('lineno')[:limit]
+    ]
+
+# Function to format a size (bytes)
+def format_size(value):
+    for unit in ('B', 'KB', 'MB'):
+        if (abs(value) < 1024): return f"{value:.0f} {unit}" if unit == 'B' else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+# Function to format the memory report, with the sizes of the given structures ({name: object})
+def report(structures, limit=10):
+    lines = [f"<b>Memória do processo</b>: {format_size(get_rss())} (RSS)", '', '<b>Estruturas</b> (aproximado):']
+    seen = set()
+    for name, obj in structures.items():
+        lines.append(f"{name}: {format_size(deep_size(obj, seen))}")
+    if (tracemalloc.is_tracing()):
+        current, peak = tracemalloc.get_traced_memory()
+        lines += ['', f"<b>tracemalloc</b>: {format_size(current)} (pico {format_size(peak)})"]
+        for location, size, count in top_allocations(limit):
+            lines.append(f"{location}: {format_size(size)} ({count} blocos)")
+    else: lines += ['', 'Para ver as maiores alocações: /memoria iniciar (e /memoria parar ao final)']
+    return '\n'.join(lines)
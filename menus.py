@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 14:00:00 2026
+
+@author: Renato Henz
+
+Menus registry: the services which can be registered, the prayers and the Rosary mysteries
+are declared as data, from which the callbacks routes and the inline keyboards are created
+once (for every services state), so showing a menu doesn't build any buttons
+
+"""
+
+# Main dependencies
+import functools, itertools
+
+# Emoji
+from emoji import emojize
+
+# Telegram bot
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+# Services which can be registered on '/registrar_servicos', by type: button label and the messages
+# shown when the service is registered and stopped (new services need a sender on 'run.py' as well)
+SERVICES = {
+    'jaculatoria': {
+        'label': 'Jaculatórias',
+        'registered': ':white_check_mark: Serviço de envio de jaculatórias registrado, serão enviadas automaticamente 3 vezes ao dia.',
+        'stopped': ':x: Serviço de envio de jaculatórias interrompido.',
+    },
+    'santo': {
+        'label': 'Santo do Dia',
+        'registered': ':white_check_mark: Serviço de envio de Santo do Dia registrado, será enviado automaticamente 1 vez ao dia.',
+        'stopped': ':x: Serviço de envio do Santo do Dia interrompido.',
+    },
+    'meditacao': {
+        'label': 'Meditação Diária',
+        'registered': ':white_check_mark: Serviço de envio de Meditação Diária registrado, será enviada automaticamente 1 vez ao dia.',
+        'stopped': ':x: Serviço de envio de Meditação Diária interrompido.',
+    },
+    'angelus_regina_caeli': {
+        'label': 'Angelus/Regina Caeli',
+        'registered': ':white_check_mark: Serviço de envio de Angelus/Regina Caeli registrado, será enviado automaticamente todo dia às 12h.',
+        'stopped': ':x: Serviço de envio do Angelus/Regina Caeli interrompido.',
+    },
+}
+
+# Services buttons rows (services missing here get a row of their own)
+SERVICES_LAYOUT = (
+    ('jaculatoria', 'santo'),
+    ('meditacao',),
+    ('angelus_regina_caeli',),
+)
+
+# Prayers buttons rows, as (label, prayer field)
+PRAYERS_LAYOUT = (
+    (("Cântico dos Três Jovens", 'cantico_tres_jovens'),),
+    (("Lembrai-vos", 'lembrai-vos'),),
+    (("Ato de Contrição", 'ato_contricao'), ("Alternativo", 'ato_contricao_alt')),
+    (("Oferecimento do Dia", 'oferecimento_dia'), ("Alternativo", 'oferecimento_dia_alt')),
+    (("Ação de Graças Noite", 'acao_gracas'),),
+    (("Intenção para ganhar indulgências", 'intencao_indulgencias'),),
+    (("Salmo 2", 'salmo_2'), ("Adoro-te Devote", 'adoro-te_devote')),
+)
+
+# Prayers rows only shown to the admin
+ADMIN_PRAYERS_LAYOUT = (
+    (("Preces", 'preces'),),
+)
+
+# Rosary mysteries buttons rows, as (label, mysteries type)
+MYSTERIES_LAYOUT = (
+    (("Mistérios Gozosos", 'gozosos'),),
+    (("Mistérios Dolorosos", 'dolorosos'),),
+    (("Mistérios Gloriosos", 'gloriosos'),),
+    (("Mistérios Luminosos", 'luminosos'),),
+)
+
+# Actions on the services buttons callbacks (e.g.: 'registrar_santo')
+REGISTER, STOP = 'registrar', 'parar'
+
+# Function to create an inline keyboard from rows of (label, callback data)
+def create_keyboard(rows):
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(label, callback_data=data) for label, data in row]
+        for row in rows
+    ])
+
+# Function to get the services buttons rows, with the service types
+def get_services_rows():
+    rows = [list(row) for row in SERVICES_LAYOUT]
+    listed = set(itertools.chain.from_iterable(rows))
+    rows.extend([service_type] for service_type in SERVICES if service_type not in listed)
+    return rows
+
+# Function to get a service button, as (label, callback data), for the service state
+def get_service_button(service_type, registered):
+    label = SERVICES[service_type]['label']
+    if (registered): return emojize(f':x: Parar {label}', language='alias'), f"{STOP}_{service_type}"
+    return emojize(f':white_check_mark: Registrar {label}', language='alias'), f"{REGISTER}_{service_type}"
+
+# Function to create the services keyboards for every state, by the tuple of registered flags (in 'SERVICES' order)
+def create_services_keyboards():
+    order = {service_type: position for position, service_type in enumerate(SERVICES)}
+    rows = get_services_rows()
+    keyboards = {}
+    for state in itertools.product((False, True), repeat=len(SERVICES)):
+        keyboards[state] = create_keyboard(
+            [get_service_button(service_type, state[order[service_type]]) for service_type in row]
+            for row in rows
+        )
+    return keyboards
+
+# Callbacks routes of the services buttons, as {callback data: (action, service type)}
+SERVICES_ROUTES = {
+    f"{action}_{service_type}": (action, service_type)
+    for service_type in SERVICES for action in (REGISTER, STOP)
+}
+
+# Services messages, already emojized, by type
+SERVICES_MESSAGES = {
+    service_type: {
+        REGISTER: emojize(service['registered'], language='alias'),
+        STOP: emojize(service['stopped'], language='alias'),
+    }
+    for service_type, service in SERVICES.items()
+}
+
+# Precomputed keyboards
+SERVICES_KEYBOARDS = create_services_keyboards()
+PRAYERS_KEYBOARD = create_keyboard(PRAYERS_LAYOUT)
+ADMIN_PRAYERS_KEYBOARD = create_keyboard(PRAYERS_LAYOUT + ADMIN_PRAYERS_LAYOUT)
+MYSTERIES_KEYBOARD = create_keyboard(MYSTERIES_LAYOUT)
+
+# Function to get the services keyboard, given a function which checks if a service is registered
+def get_services_keyboard(is_registered):
+    return SERVICES_KEYBOARDS[tuple(bool(is_registered(service_type)) for service_type in SERVICES)]
+
+# Function to get the prayers keyboard (the admin also gets the admin prayers)
+def get_prayers_keyboard(admin=False):
+    return ADMIN_PRAYERS_KEYBOARD if admin else PRAYERS_KEYBOARD
+
+# Label of the button to listen to a content item
+AUDIO_LABEL = emojize(':speaker: Ouvir', language='alias')
+
+# Function to get the button to listen to a content item (the content items are a bounded set, so they're all cached)
+@functools.lru_cache(maxsize=None)
+def get_audio_keyboard(item_id):
+    return create_keyboard([[(AUDIO_LABEL, f"audio:{item_id}")]])
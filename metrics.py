@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:00:00 2026
+
+@author: Renato Henz
+
+Lightweight metrics, exported in the Prometheus text format
+
+"""
+
+# Main dependencies
+import threading, time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Registered metrics, in the order they were created
+registry = []
+
+# Default histogram buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LATENESS_BUCKETS = (0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+# Function to escape a label value
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# Function to format the labels of a sample
+def format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra is not None: pairs.append(extra)
+    if len(pairs) == 0: return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+# Base metric, with one value for each combination of labels
+class Metric():
+    type = 'untyped'
+
+    # Init func
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    # Samples as (suffix, label values, extra label, value)
+    def samples(self):
+        with self.lock:
+            return [('', labels, None, value) for labels, value in self.values.items()]
+
+    # Rendering the metric in the Prometheus text format
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{format_labels(self.labels, labels, extra)} {value}")
+        return '\n'.join(lines)
+
+# Counter, which can only be increased
+class Counter(Metric):
+    type = 'counter'
+
+    # Increasing the counter for the provided label values
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+# Gauge, set directly or computed by a function when exported
+# The function must return a number or, for labeled gauges, a dict of {label values: number}
+class Gauge(Metric):
+    type = 'gauge'
+
+    # Init func
+    def __init__(self, name, description, labels=(), function=None):
+        super(Gauge, self).__init__(name, description, labels)
+        self.function = function
+
+    # Setting the gauge value for the provided label values
+    def set(self, value, *labels):
+        with self.lock:
+            self.values[labels] = value
+
+    # Samples, computing the value when a function was provided
+    def samples(self):
+        if self.function is None: return super(Gauge, self).samples()
+        try: value = self.function()
+        # A failing function must not break the whole export
+        except Exception: return []
+        if isinstance(value, dict): return [('', labels, None, item) for labels, item in value.items()]
+        return [('', (), None, value)]
+
+# Histogram with fixed buckets
+class Histogram(Metric):
+    type = 'histogram'
+
+    # Init func
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        super(Histogram, self).__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    # Recording an observation for the provided label values
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.values.get(labels)
+            # Counts for each bucket, plus the '+Inf' one, the sum and the count
+            if counts is None: counts = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            counts[index] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    # Timer context to observe the elapsed time of a block
+    def time(self, *labels):
+        return Timer(self, labels)
+
+    # Samples with the cumulative buckets, the sum and the count
+    def samples(self):
+        with self.lock: values = {labels: list(counts) for labels, counts in self.values.items()}
+        samples = []
+        for labels, counts in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                samples.append(('_bucket', labels, ('le', bound), cumulative))
+            samples.append(('_sum', labels, None, counts[-2]))
+            samples.append(('_count', labels, None, counts[-1]))
+        return samples
+
+# Context to observe the elapsed time of a block on a histogram
+class Timer():
+    # Init func
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+# Function to render all registered metrics
+def render():
+    return '\n'.join(metric.render() for metric in registry) + '\n'
+
+# Routes served by the HTTP server, as {path: function returning (status, content type, body)}
+routes = {
+    '/metrics': lambda: (200, 'text/plain; version=0.0.4; charset=utf-8', render()),
+}
+
+# HTTP requests handler
+class RequestHandler(BaseHTTPRequestHandler):
+    # Answering GET requests
+    def do_GET(self):
+        route = routes.get(self.path.split('?')[0])
+        if route is None: status, content_type, body = 404, 'text/plain', 'Not found\n'
+        else: status, content_type, body = route()
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Requests are not logged, scrapes would flood the logs
+    def log_message(self, format, *args):
+        pass
+
+# Function to start the HTTP server on a background thread
+def start_server(port, host='127.0.0.1'):
+    server = ThreadingHTTPServer((host, port), RequestHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
+
+# Bot metrics
+HANDLER_LATENCY = Histogram('opus_handler_latency_seconds', 'Time spent on each update handler', ['handler'])
+HANDLER_ERRORS = Counter('opus_handler_errors_total', 'Errors raised while handling updates', ['error'])
+QUEUE_DEPTH = Gauge('opus_message_queue_depth', 'Messages waiting on the outbound message queue')
+QUEUE_WAIT = Histogram('opus_message_queue_wait_seconds', 'Time messages waited on the outbound message queue')
+SENDS = Counter('opus_bot_api_requests_total', 'Bot API requests by method and outcome (ok or the error class)', ['method', 'outcome'])
+SEND_LATENCY = Histogram('opus_bot_api_request_seconds', 'Bot API request latency', ['method'])
+SCHEDULER_LATENESS = Histogram('opus_scheduler_lateness_seconds', 'Delay between the scheduled and the actual job submission', ['job'], buckets=LATENESS_BUCKETS)
+SCHEDULER_MISSED = Counter('opus_scheduler_missed_total', 'Scheduled job runs missed', ['job'])
+DELIVERY_LATENESS = Histogram('opus_delivery_lateness_seconds', 'Delay between the due time and the actual send of scheduled services', ['service'], buckets=LATENESS_BUCKETS)
+DB_POOL_IN_USE = Gauge('opus_db_pool_connections_in_use', 'MySQL pool connections currently in use')
+DB_POOL_WAIT = Histogram('opus_db_pool_acquire_seconds', 'Time to get a MySQL connection')
+DB_POOL_EXHAUSTED = Counter('opus_db_pool_exhausted_total', 'Connections opened outside the pool because it was exhausted')
+CONTENT_AGE = Gauge('opus_content_age_seconds', 'Age of the cached content, by source', ['source'])
+DELIVERY_ACK_LATENESS = Histogram('opus_delivery_ack_lateness_seconds', 'Delay between the intended fire time and the Bot API acknowledgement of scheduled services', ['service'], buckets=LATENESS_BUCKETS)
+SUPPRESSED = Counter('opus_suppressed_requests_total', 'Repeated heavy commands not sent again, by command and reason (in_flight or cooldown)', ['command', 'reason'])
+CATCH_UP = Counter('opus_catch_up_deliveries_total', 'Deliveries missed while the bot was down, by service and outcome (replayed or skipped, if already delivered)', ['service', 'outcome'])
@@ -9,8 +9,8 @@ Functions to get Opus data amongst others
 """
 
 # Main dependencies
-import mysql.connector, json, requests
-import os
+import mysql.connector, mysql.connector.pooling, json, requests
+import os, sys, threading, time, logging
 from datetime import datetime
 from random import randint
 
@@ -20,15 +20,22 @@ from bs4 import BeautifulSoup
 # Package to work with emojis
 from emoji import emojize
 
-# AWS S3 communication
-import boto3
+# Content backends (AWS/MySQL or local files)
+import backends
+
+# Bot metrics
+import metrics
 
 # Setting up the '.env' file with environment variables
 from dotenv import load_dotenv
 load_dotenv('.env')
 
-# Aspirations class
+logger = logging.getLogger(__name__)
+
+# Aspirations class (no '__dict__', since the whole list is kept in memory)
 class Aspiration():
+    __slots__ = ('id', 'text', 'tags')
+
     # Init func
     def __init__(self, id, text, tags=None):
         self.id = id
@@ -36,32 +43,22 @@ class Aspiration():
         # Tags list
         self.tags = tags
 
-# Function to get list of objects from the S3 bucket
+# Function to get list of objects from the images catalog (the S3 bucket, by default)
 def get_s3_bucket_keys():
-    # Initializing S3 instance and getting bucket object
-    s3 = session.resource('s3')
-    bucket = s3.Bucket(os.getenv('AWS_BUCKET'))
-    # Getting the files URLs from specified bucket
-    bucket_objects = []
-    for bucket_object in bucket.objects.all():
-        bucket_objects.append(img_path_base + bucket_object.key)
-    
-    # Returning resulting list
-    return bucket_objects
+    return catalog_backend.keys()
+
+# Function to get the compact form of the images list: the (interned) bucket keys instead of the full URLs
+# Full URLs (e.g.: from an older snapshot) are converted as well
+def compact_images(images):
+    return [sys.intern(item[len(img_path_base):] if item.startswith(img_path_base) else item) for item in images]
+
+# Function to get the URL (or the local path) of an image from its bucket key
+def image_url(key):
+    return img_path_base + key
 
-# Function to get prayers and data from DynamoDN table
+# Function to get prayers and data from the prayers backend (the DynamoDB table, by default)
 def get_dynamodb_table_prayers():
-    # Initializing DynamoDB instance and getting table
-    dynamodb = session.resource('dynamodb', region_name=os.getenv('AWS_REGION'))
-    table = dynamodb.Table('opus-bot')
-    scan = table.scan()
-    # Getting prayers formatted as dict
-    prayers = {
-        item['field']: item['value'] for item in scan['Items']
-    }
-    
-    # Returning resulting dict
-    return prayers
+    return prayers_backend.load()
 
 # Function to format a complete date (pt-br)
 def format_date(date):
@@ -104,32 +101,76 @@ def get_mysql_connection_config_dict():
         }
     return connection_config_dict
 
-# Function to query aspirations from the database
-def query_aspirations():
-    # Trying to connect to MySQL server
-    try:
-        # Opening the connection
+# Function to get a connection from the MySQL pool
+# Closing the connection returns it to the pool; if the pool is exhausted, a new connection is opened
+def get_mysql_connection():
+    global connection_pool
+    start = time.perf_counter()
+    # The pool is only created when first used
+    with connection_pool_lock:
+        if connection_pool is None:
+            connection_pool = mysql.connector.pooling.MySQLConnectionPool(
+                pool_name='opus',
+                pool_size=int(os.getenv('SQL_POOL_SIZE', '10')),
+                **connection_config_dict,
+            )
+    try: connection = connection_pool.get_connection()
+    except mysql.connector.errors.PoolError:
+        metrics.DB_POOL_EXHAUSTED.inc()
         connection = mysql.connector.connect(**connection_config_dict)
-        # Creating query string
-        mysql_query = "SELECT * FROM aspirations;"
-        
-        # Getting cursor and executing query
-        cursor = connection.cursor()
-        cursor.execute(mysql_query)
-        # Reading the returned data and populating aspirations list
-        for row in cursor.fetchall():
-            aspirations.append(Aspiration(row[0], row[1], row[2]))
-    
+    metrics.DB_POOL_WAIT.observe(time.perf_counter() - start)
+    return connection
+
+# Function to get the number of pool connections in use
+def get_mysql_pool_in_use():
+    if connection_pool is None: return 0
+    return connection_pool.pool_size - connection_pool._cnx_queue.qsize()
+
+# Function to query aspirations from the aspirations backend (the MySQL database, by default)
+# The list is only replaced when the query succeeds, so the last loaded one keeps being used
+# Errors are raised after being logged, so the caller doesn't take the aspirations as loaded
+def query_aspirations():
+    global aspirations
+    # Reading the returned data and populating aspirations list
+    try: aspirations = [Aspiration(row[0], row[1], row[2]) for row in aspirations_backend.load()]
     # If an error occurs, we inform the user
-    except mysql.connector.Error as error:
-        print(f"Error while querying MySQL server: {error}")
-    
-    # Finally, we close the connection
-    finally:
-        if (connection.is_connected()):
-            cursor.close()
-            connection.close()
-            print("Connection to MySQL server has been closed")
+    except aspirations_backend.errors as error:
+        logger.error('Erro ao consultar as jaculatórias: %s', error, extra={'event': 'aspirations_error'})
+        raise
+
+# Function to load the images list from the S3 bucket
+def load_images():
+    global img_list
+    # Removing folders (keys which end with '/')
+    img_list = compact_images(item for item in get_s3_bucket_keys() if item[-1] != '/')
+
+# Function to load the prayers (and the Rosary mysteries) from the DynamoDB table
+def load_prayers():
+    global prayers, rosary
+    loaded = get_dynamodb_table_prayers()
+    # Reference: https://opusdei.org/pt-pt/article/audios-terco-em-portugues/
+    prayers, rosary = loaded, loaded['rosario']
+
+# Function to get the content used by the search, as {document ID: (title, text)}
+# Prayers are indexed with their titles, along with the Rosary mysteries and prayers and the aspirations
+def get_search_documents():
+    documents = {}
+    for key, text in prayers.items():
+        if key not in PRAYER_TITLES or not isinstance(text, str): continue
+        documents[f"oracao:{key}"] = (PRAYER_TITLES[key], text)
+    if (len(rosary) > 0):
+        for mysteries_type in ('gozosos', 'dolorosos', 'gloriosos', 'luminosos'):
+            for index, mystery in rosary[mysteries_type]['misterios'].items():
+                documents[f"misterio:{mysteries_type}:{index}"] = (
+                    f"{index}º Mistério {mysteries_type.capitalize()[:-1]}: {mystery['nome']}",
+                    mystery['descricao'],
+                )
+        documents['terco:ladainha'] = ('Ladainha de Nossa Senhora', rosary['ladainha']['oracao'])
+        documents['terco:oracao_final'] = ('Oração final do terço', rosary['oracao_final'])
+        documents['terco:salve'] = ('Salve Rainha', rosary['salve'])
+    for aspiration in aspirations:
+        documents[f"jaculatoria:{aspiration.id}"] = ('Jaculatória', aspiration.text)
+    return documents
 
 # Function to start the chat
 def start():
@@ -149,7 +190,11 @@ def show_help():
         '/meditacao_diaria': 'Obtém informações sobre a Meditação Diária do site "Hablar con Dios"',
         '/angelus_regina_caeli': 'Fornece a oração do Angelus ou Regina Caeli (de acordo com o tempo litúrgico) junto a uma imagem de Nossa Senhora',
         '/oracoes': 'Apresenta uma lista de orações que podem ser enviadas pelo bot',
+        '/buscar': 'Busca um termo nas orações, mistérios do terço e jaculatórias (ex.: /buscar coração)',
         '/registrar_servicos': 'Registre ou interrompa serviços como o envio de jaculatórias, Meditação Diária, Santo do Dia e Angelus/Regina Caeli',
+        '/fuso_horario': 'Define o fuso horário usado para enviar os serviços registrados',
+        '/horario': 'Define os horários de envio de um serviço registrado',
+        '/resumo': 'Ativa ou desativa o modo resumo, que envia os serviços registrados juntos em poucas mensagens',
         '/help ou /ajuda': 'Mostra a lista de comandos disponíveis',
         '/contato': 'Fornece o contato do desenvolvedor para dúvidas ou sugestões',
     }
@@ -228,10 +273,19 @@ def get_saint_of_the_day():
     # Returning subtitle and image URL
     return subtitle, img_url
 
+# Function to get the message sent when the Saint of the Day couldn't be retrieved
+def get_saint_unavailable_message():
+    return format_date(datetime.today()) + "\n\nAcesse e saiba mais em: https://santo.cancaonova.com/"
+
+# Function to get the message sent when the daily meditation couldn't be retrieved
+def get_meditation_unavailable_message():
+    return f"Não foi possível requisitar os dados via HTTP-GET devido a uma configuração de segurança do site. Favor acessar diretamente a página: {MEDITATION_PAGE_URL}"
+
 # Function to get data about daily meditation from the "Hablar con Dios" website
-def get_daily_meditation():
+# If 'fallback' is False, an error is raised instead of returning the unavailable message
+def get_daily_meditation(fallback=True):
     # URL for the webpage
-    PAGE_URL = 'https://www.hablarcondios.org/pt/meditacaodiaria.aspx'
+    PAGE_URL = MEDITATION_PAGE_URL
     
     # Requesting the page and formatting with Beautiful Soup
     r = requests.get(PAGE_URL)
@@ -242,8 +296,9 @@ def get_daily_meditation():
     try: liturgical_day = soup.select('p[class="DiaLiturgico"]')[0].text
     # If it's not possible, we inform and return the link for the page
     except:
-        print("Daily meditation: there was a problem while loading the page")
-        return f"Não foi possível requisitar os dados via HTTP-GET devido a uma configuração de segurança do site. Favor acessar diretamente a página: {PAGE_URL}"
+        logger.warning('Meditação diária: não foi possível carregar a página', extra={'event': 'meditation_unavailable'})
+        if (not fallback): raise ValueError('Daily meditation page could not be loaded')
+        return get_meditation_unavailable_message()
     
     # Initializing data to be returned
     meditation_data = f"<i>{liturgical_day}</i>"
@@ -320,19 +375,26 @@ def get_rosary(mysteries_type=None):
     # For each mystery, we'll get a random image
     for index in range(1, 6):
         # Defining the base path for the mysteries images
-        rosary_img_path = rosary_img_path_base.\
+        rosary_img_key = rosary_img_key_base.\
             replace("[name]", mysteries_path_str).\
             replace("[number]", str(index))
         # Filtering the list of S3 bucket images
-        filtered_img_list = [il for il in img_list if rosary_img_path in il]
+        filtered_img_list = [il for il in img_list if il.startswith(rosary_img_key)]
         # Getting a random number to get the image
         value = randint(0, len(filtered_img_list)-1)
         # Getting the image URL for the mystery
-        mysteries['misterios'][str(index)]['img_path'] = filtered_img_list[value]
+        mysteries['misterios'][str(index)]['img_path'] = image_url(filtered_img_list[value])
     
     # Returning defined mysteries
     return mysteries
 
+# Function to get the images available for a Rosary mystery
+def get_mystery_images(mysteries_type, index):
+    rosary_img_key = rosary_img_key_base.\
+        replace("[name]", MYSTERIES_PATHS[mysteries_type]).\
+        replace("[number]", str(index))
+    return [image_url(il) for il in img_list if il.startswith(rosary_img_key)]
+
 # Function to get an image from a category (directory) of available images
 def get_image_path(image_type=None):
     # If an image type was provided, we'll include it on the file path
@@ -344,13 +406,13 @@ def get_image_path(image_type=None):
         # Getting a random number to get the image
         value = randint(0, len(filtered_img_list)-1)
         # Returning the random image URL
-        return filtered_img_list[value]
+        return image_url(filtered_img_list[value])
     # If no image type was provided
     else:
         # Getting a random number to get the image
         value = randint(0, len(img_list)-1)
         # Returning the random image URL
-        return img_list[value]
+        return image_url(img_list[value])
 
 # Function to get liturgical season
 # The request is taking a long time, so we better do it once by day
@@ -371,49 +433,59 @@ def get_liturgical_season(date=None):
     # 'ordinary', 'lent', 'easter', 'advent' or 'christmas'
     return liturgical_calendar['season']
 
-# MySQL connection config dict
+# Rosary mysteries images directories
+MYSTERIES_PATHS = {'gozosos': 'joyful', 'dolorosos': 'sorrowful', 'gloriosos': 'glorious', 'luminosos': 'luminous'}
+
+# Titles of the prayers available to the users
+PRAYER_TITLES = {
+    'angelus': 'Angelus',
+    'regina_caeli': 'Regina Caeli',
+    'cantico_tres_jovens': 'Cântico dos Três Jovens',
+    'lembrai-vos': 'Lembrai-vos',
+    'ato_contricao': 'Ato de Contrição',
+    'ato_contricao_alt': 'Ato de Contrição (alternativo)',
+    'oferecimento_dia': 'Oferecimento do Dia',
+    'oferecimento_dia_alt': 'Oferecimento do Dia (alternativo)',
+    'acao_gracas': 'Ação de Graças Noite',
+    'intencao_indulgencias': 'Intenção para ganhar indulgências',
+    'salmo_2': 'Salmo 2',
+    'adoro-te_devote': 'Adoro-te Devote',
+}
+
+# Daily meditation webpage
+MEDITATION_PAGE_URL = 'https://www.hablarcondios.org/pt/meditacaodiaria.aspx'
+
+# MySQL connection config dict and pool
 connection_config_dict = get_mysql_connection_config_dict()
+connection_pool = None
+connection_pool_lock = threading.Lock()
+metrics.DB_POOL_IN_USE.function = get_mysql_pool_in_use
 
 # Aspirations list
 aspirations = []
 
-# Initializing the boto3 (AWS) session
-session = boto3.Session(
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-)
-
-# S3 bucket root paths
-img_path_base = "https://{0}.s3.{1}.amazonaws.com/".\
-    format(
-        os.getenv('AWS_BUCKET'),
-        os.getenv('AWS_REGION'),
-    )
-rosary_img_path_base = "https://{0}.s3.{1}.amazonaws.com/rosary/[name]-mysteries/[number]/".\
-    format(
-        os.getenv('AWS_BUCKET'), 
-        os.getenv('AWS_REGION'),
-    )
-
-# Getting S3 bucket files
-img_list = get_s3_bucket_keys()
-# Removing folders (keys which end with '/')
-img_list = [item for item in img_list if item[-1] != '/']
-
-# Getting prayers from DynamoDB table
-prayers = get_dynamodb_table_prayers()
-
-# Defining rosary mysteries
-# Reference: https://opusdei.org/pt-pt/article/audios-terco-em-portugues/
-rosary = prayers['rosario']
+# Content backends, chosen on the '.env' file (S3, DynamoDB and MySQL by default)
+catalog_backend, prayers_backend, aspirations_backend = backends.from_env(get_mysql_connection)
+
+# Images root path (the S3 bucket URL or the local directory) and Rosary mysteries images keys prefix
+img_path_base = catalog_backend.base
+rosary_img_key_base = "rosary/[name]-mysteries/[number]/"
+
+# S3 bucket files (as keys, see 'image_url'), prayers and Rosary mysteries
+# They are loaded by the bot's startup warm-up (see 'load_images' and 'load_prayers'), not on import
+img_list = []
+prayers = {}
+rosary = {}
 
 # Main script executing
 if __name__ == '__main__':
     # Getting formatted current date
     print(format_date(datetime.today()))
     
-    # Filling aspirations list
+    # Filling aspirations list, images and prayers
     query_aspirations()
+    load_images()
+    load_prayers()
     
     # Testing functions to get data
     aspiration = get_aspiration(id=None, tag=None)
@@ -422,8 +494,3 @@ if __name__ == '__main__':
     angules_text, angeuls_image = angelus_regina_caeli()
     liturgical_season = get_liturgical_season(datetime(2020, 5, 31))
     daily_rosary = get_rosary()
-
-# If it's not the main file
-else:
-    # Filling aspirations list
-    query_aspirations()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:00:00 2026
+
+@author: Renato Henz
+
+On-demand profiling (sampling or cProfile) and slow handlers log
+
+"""
+
+# Main dependencies
+import cProfile, io, logging, os, pstats, sys, threading, time
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+
+# Handlers or jobs running longer than this (seconds) are logged
+slow_threshold = 1.0
+# Most recent slow runs, as (timestamp, kind, name, elapsed)
+slow_log = deque(maxlen=100)
+
+# Current profiling session (only one can run at a time)
+session = None
+session_lock = threading.Lock()
+
+# Function to record a handler or job run, logging it if it was slow
+def check_slow(kind, name, elapsed):
+    if elapsed < slow_threshold: return
+    slow_log.append((time.time(), kind, name, elapsed))
+    logger.warning('Execução lenta (%s) "%s": %.3f s', kind, name, elapsed)
+
+# Base profiling session, finished after a number of seconds
+class Session():
+    kind = ''
+
+    # Init func
+    # 'on_finish' receives the report file name, its content (bytes) and a short summary
+    def __init__(self, seconds, on_finish):
+        self.seconds = seconds
+        self.on_finish = on_finish
+        self.started_at = time.time()
+        self.finished = False
+        self.lock = threading.Lock()
+
+    # Finishing the session (only once) and delivering the report
+    def finish(self):
+        global session
+        with self.lock:
+            if self.finished: return
+            self.finished = True
+        with session_lock:
+            if session is self: session = None
+        filename, content, summary = self.report()
+        try: self.on_finish(filename, content, summary)
+        except Exception as error: logger.warning('Falha ao enviar o relatório de perfil: %s', error)
+
+# Sampling profiler: a background thread collects the stacks of every other thread
+# The report uses the collapsed stacks format ('frame;frame;frame count'), used by flame graph tools
+class SamplingSession(Session):
+    kind = 'amostragem'
+
+    # Init func
+    def __init__(self, seconds, on_finish, interval=0.005):
+        super(SamplingSession, self).__init__(seconds, on_finish)
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+
+    # Starting the sampling thread
+    def start(self):
+        threading.Thread(target=self.run, name='sampling-profiler', daemon=True).start()
+
+    # Sampling the threads stacks until the session ends
+    def run(self):
+        own_id = threading.get_ident()
+        end = time.monotonic() + self.seconds
+        while time.monotonic() < end and not self.finished:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id: continue
+                stack = []
+                while frame is not None:
+                    stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+        self.finish()
+
+    # Collapsed stacks report
+    def report(self):
+        content = '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+        summary = f"{self.samples} amostras em {time.time() - self.started_at:.1f} s, {len(self.stacks)} pilhas distintas"
+        return 'perfil_amostragem.txt', content.encode('utf-8'), summary
+
+# cProfile session, profiling the update handlers for a number of seconds or updates
+class CProfileSession(Session):
+    kind = 'cprofile'
+
+    # Init func
+    def __init__(self, seconds, on_finish, updates=None):
+        super(CProfileSession, self).__init__(seconds, on_finish)
+        self.updates = updates
+        self.handled = 0
+        self.profile = cProfile.Profile()
+        # Handlers are serialized while profiling, since cProfile only follows one thread
+        self.run_lock = threading.Lock()
+
+    # Starting the timer that ends the session
+    def start(self):
+        timer = threading.Timer(self.seconds, self.finish)
+        timer.daemon = True
+        timer.start()
+
+    # Running an update handler under the profiler
+    def run(self, callback, *args, **kwargs):
+        with self.run_lock:
+            if self.finished: return callback(*args, **kwargs)
+            self.profile.enable()
+            try: return callback(*args, **kwargs)
+            finally:
+                self.profile.disable()
+                self.handled += 1
+                # Sessions limited by the number of updates
+                if self.updates is not None and self.handled >= self.updates:
+                    threading.Thread(target=self.finish, daemon=True).start()
+
+    # pstats report, sorted by cumulative time
+    def report(self):
+        stream = io.StringIO()
+        with self.run_lock:
+            if self.handled > 0:
+                pstats.Stats(self.profile, stream=stream).sort_stats('cumulative').print_stats()
+            else: stream.write('Nenhuma atualização processada durante o perfil.\n')
+        summary = f"{self.handled} atualizações em {time.time() - self.started_at:.1f} s"
+        return 'perfil_cprofile.txt', stream.getvalue().encode('utf-8'), summary
+
+# Function to start a profiling session, returning False if another one is running
+def start(new_session):
+    global session
+    with session_lock:
+        if session is not None: return False
+        session = new_session
+    new_session.start()
+    return True
+
+# Function to run an update handler, profiling it if a cProfile session is running
+def run(callback, *args, **kwargs):
+    current = session
+    if isinstance(current, CProfileSession): return current.run(callback, *args, **kwargs)
+    return callback(*args, **kwargs)
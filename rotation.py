@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 09:00:00 2026
+
+@author: Renato Henz
+
+Non-repeating content rotation for each user: every user walks a pseudorandom
+permutation of the items IDs, keeping only a seed and a position
+
+"""
+
+# Main dependencies
+import random, threading
+
+# Feistel rounds used on the permutation
+ROUNDS = 4
+
+# Function to mix a 32 bits integer (used as the Feistel round function)
+def mix(value):
+    value &= 0xFFFFFFFF
+    value = ((value >> 16) ^ value) * 0x45D9F3B & 0xFFFFFFFF
+    value = ((value >> 16) ^ value) * 0x45D9F3B & 0xFFFFFFFF
+    return (value >> 16) ^ value
+
+# Function to get the position of a value on the permutation of [0, 2 ** bits) defined by a seed
+# A Feistel network is a bijection for any round function, so each cycle visits every value once
+def permute(value, seed, bits):
+    half = bits // 2
+    mask = (1 << half) - 1
+    left, right = value >> half, value & mask
+    for round in range(ROUNDS):
+        left, right = right, left ^ (mix(right ^ (seed + round * 0x9E3779B9)) & mask)
+    return (left << half) | right
+
+# Items rotation for each user
+# The permutation is over the IDs space (not over the list), so adding or removing items keeps
+# every user's position valid: missing IDs are just skipped, new ones show up on the next cycle
+# (or on the current one, if their positions weren't reached yet)
+# Each user keeps the IDs space size of its cycle, so when the IDs grow past a power of two the
+# cycles in progress go on with the same permutation, and the new size is only used on the next ones
+class Rotation():
+    # Init func
+    def __init__(self):
+        # Items as {ID: item} and the (even) number of bits of the IDs space
+        self.items = {}
+        self.bits = 2
+        # State of each user, packed as 'bits << 64 | seed << 32 | position' (a single integer)
+        # The bits are 0 for states saved without them, which then use the current IDs space
+        self.states = {}
+        # Users whose state changed since the last save
+        self.dirty = set()
+        self.lock = threading.Lock()
+
+    # Setting the items, as {ID: item} (IDs must be non-negative integers)
+    def set_items(self, items):
+        bits = max(2, max(items, default=0).bit_length())
+        with self.lock:
+            self.items = dict(items)
+            self.bits = bits + bits % 2
+
+    # Getting the next item for a user (None if there are no items)
+    # Each call is O(1) on average: the walk skips at most 'IDs space / items' positions
+    def next(self, chat_id):
+        chat_id = int(chat_id)
+        with self.lock:
+            if (len(self.items) == 0): return None
+            state = self.states.get(chat_id)
+            if (state is None): bits, seed, position = self.bits, random.getrandbits(32), 0
+            else: bits, seed, position = state >> 64 or self.bits, state >> 32 & 0xFFFFFFFF, state & 0xFFFFFFFF
+            while True:
+                # Starting a new cycle, with a new permutation (over the current IDs space)
+                if (position >= 1 << bits): bits, seed, position = self.bits, mix(seed + 1), 0
+                item_id = permute(position, seed, bits)
+                position += 1
+                if (item_id in self.items): break
+            self.states[chat_id] = bits << 64 | seed << 32 | position
+            self.dirty.add(chat_id)
+            return self.items[item_id]
+
+    # Loading saved states, as (chat_id, seed, position, bits) rows
+    def load(self, rows):
+        with self.lock:
+            for chat_id, seed, position, bits in rows:
+                self.states[int(chat_id)] = int(bits or 0) << 64 | int(seed) << 32 | int(position)
+
+    # Getting (and clearing) the changed states, as (chat_id, seed, position, bits) rows
+    def pop_dirty(self):
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+            return [
+                (chat_id, self.states[chat_id] >> 32 & 0xFFFFFFFF, self.states[chat_id] & 0xFFFFFFFF, self.states[chat_id] >> 64)
+                for chat_id in dirty
+            ]
+
+    # Marking states as changed again (e.g.: when saving them failed)
+    def mark_dirty(self, chat_ids):
+        with self.lock: self.dirty.update(chat_ids)
@@ -9,23 +9,79 @@ Telegram Chatbot server
 """
 
 # Main dependencies
-import mysql.connector, logging, os
-from datetime import datetime
+import mysql.connector, logging, os, html, time, functools, io, threading, requests, shutil, signal
+from datetime import datetime, timedelta, timezone
+
+# Startup warm-up and timeline (imported first, so the timeline covers the other imports)
+import warmup
+
+# Structured logging
+import logs
 
 # Opus package
 import opus
 
+# Services delivery timing wheel
+import delivery
+
+# Daily content store
+from content_store import ContentStore, Source
+
+# Bot metrics
+import metrics
+
+# On-demand profiling and slow handlers log
+import profiling
+
+# Full-text search and inline queries index
+import search, inline
+
+# Aspirations rotation for each user
+import rotation
+
+# Coalescing and cooldown of the heavy commands
+import cooldown
+
+# Received media ingestion
+import ingestion
+
+# Local images mirror, with variants optimized for Telegram
+import media
+
+# Audio renditions of the content
+import audio
+
+# Scheduled deliveries lateness and service level objectives
+import slo
+
+# Memory footprint report
+import memory
+
+# Delivered slots ledger, to replay the deliveries missed while the bot was down
+import ledger
+
+# Liveness and readiness checks, and the systemd watchdog
+import health
+
+# Bulk sender for the fan-out traffic
+import bulk
+
+# Services, prayers and mysteries menus (precomputed keyboards and callbacks routes)
+import menus
+
 # Package to work with emojis
 from emoji import emojize
 
 # Tasks scheduler
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_MISSED
 
 # Telegram chatbot modules
 from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup, \
-    ReplyKeyboardRemove
+    ReplyKeyboardRemove, InputMediaPhoto, InlineQueryResultArticle, \
+    InlineQueryResultPhoto, InlineQueryResultCachedPhoto, InputTextMessageContent, Update
 from telegram.ext import Updater, CommandHandler, MessageHandler, \
-    Filters, ConversationHandler, CallbackQueryHandler, messagequeue
+    Filters, ConversationHandler, CallbackQueryHandler, InlineQueryHandler, messagequeue
 from telegram.utils.request import Request
 
 # Setting up the '.env' file with environment variables
@@ -36,18 +92,98 @@ load_dotenv('.env')
 scheduler = BackgroundScheduler()
 
 # General data
-saint_of_the_day = {
-    'subtitle': '',
-    'img_url': None,
-}
-daily_meditation = ''
 admin_chat_id = int(os.getenv('ADMIN_CHAT_ID'))
-current_liturgical_season = ''
+# When each content source was last updated (timestamp)
+content_updated_at = {}
+# Search index over the prayers, Rosary mysteries and aspirations, and the inline queries one
+search_index = search.SearchIndex()
+inline_index = inline.InlineIndex()
+# Last-known content, served right after a restart while the sources are loaded again
+content_snapshot_path = os.getenv('CONTENT_SNAPSHOT', 'content_snapshot.json')
+content_snapshot_lock = threading.Lock()
+# Time limit (seconds) to wait for each source on startup, before serving the last-known content
+warmup_timeout = float(os.getenv('WARMUP_TIMEOUT', '20'))
+# Days of liturgical calendar fetched ahead
+content_prefetch_days = int(os.getenv('CONTENT_PREFETCH_DAYS', '7'))
+# Aspirations sequence of each user, so they only repeat after all of them were sent
+aspirations_rotation = rotation.Rotation()
+# Repeated '/terco' and '/rosario' requests of a chat (which send several messages) within these windows (seconds)
+# are answered with a short message, and duplicated ones still running are merged
+coalescer = cooldown.Coalescer({
+    'terco': float(os.getenv('TERCO_COOLDOWN', '300')),
+    'rosario': float(os.getenv('ROSARIO_COOLDOWN', '300')),
+})
+# Received files saved on the uploads directories (created on startup, if enabled)
+uploads = None
+# Local mirror of the bucket images (created on startup, if a directory was set)
+media_mirror = None
+# Photos sending latency, by source ('url', 'upload' or 'file_id')
+photo_send_stats = delivery.LatenessStats()
+# Audios of the content (created on startup, if a synthesizer was set), synthesized off-peak at this time
+audio_cache = None
+audio_precompute_time = os.getenv('AUDIO_PRECOMPUTE_TIME', '03:00')
+
+# Registered services, delivered by a single scheduler job at each user's local time
+wheel = delivery.TimingWheel()
+default_time_zone = os.getenv('DEFAULT_TIME_ZONE', 'America/Sao_Paulo')
+# Scheduled deliveries rate (messages/second), leaving room for the interactive commands
+delivery_rate_limit = float(os.getenv('DELIVERY_RATE_LIMIT', '25'))
+# Global sending rate (messages/second, the Bot API limit), shared by the bot and the bulk sender
+send_limiter = bulk.TokenBucket(float(os.getenv('GLOBAL_RATE_LIMIT', '30')))
+# Bot API methods which count towards the global limit
+limited_endpoints = ('send', 'copyMessage', 'forwardMessage')
+# Connections for the interactive requests (the bot's) and for the fan-out ones (the bulk sender's, 0 disables it)
+bot_pool_size = int(os.getenv('BOT_POOL_SIZE', '8'))
+bulk_pool_size = int(os.getenv('BULK_POOL_SIZE', '16'))
+# Bulk sender (created on startup), used for the broadcasts and the services which are the same for every user
+bulk_sender = None
+bulk_services = ('santo', 'meditacao', 'angelus_regina_caeli')
+# Lateness of the scheduled deliveries for each delivery window
+lateness_stats = delivery.LatenessStats()
+# Due deliveries, sent by their own thread so the wheel tick never waits for them
+delivery_queue = delivery.DeliveryQueue(delivery_rate_limit, lateness_stats)
+# Lateness targets (seconds, from the intended fire time to the Bot API acknowledgement) of the scheduled
+# deliveries, as 'service:seconds,service:seconds', and the fraction of deliveries which must meet them
+delivery_slo = slo.DeliverySLO(
+    targets={
+        service_type: float(seconds) for service_type, seconds in
+        (item.split(':') for item in os.getenv('DELIVERY_SLO_TARGETS', 'meditacao:300,jaculatoria:300').split(',') if ':' in item)
+    },
+    default_target=float(os.getenv('DELIVERY_SLO_SECONDS', '60')),
+    objective=float(os.getenv('DELIVERY_SLO_OBJECTIVE', '0.99')),
+)
+# Time of the daily SLO report sent to the admin
+slo_report_time = os.getenv('SLO_REPORT_TIME', '23:55')
+# Last delivered slot of each chat and service; after a restart, the deliveries missed within the grace window
+# are replayed at the catch-up rate (messages/second), which is kept below the regular one
+delivery_ledger = ledger.DeliveryLedger(os.getenv('DELIVERY_LEDGER', 'delivery_ledger.log'))
+catch_up_grace = timedelta(minutes=float(os.getenv('CATCH_UP_GRACE_MINUTES', '60')))
+catch_up_rate_limit = float(os.getenv('CATCH_UP_RATE_LIMIT', '5'))
+# Pending items for the users in digest mode (kept on the ledger as well)
+digests = delivery.Digests(delivery_ledger)
+# Health checks: the bot isn't ready when the daily content is older than its maximum age (seconds, as
+# 'source:seconds,source:seconds'), the outbound queue is backed up or the deliveries job is late (seconds);
+# under systemd, the watchdog stops being fed (restarting the bot) when it's not ready for longer than the grace
+health_checks = health.HealthChecks()
+health_max_content_ages = {
+    source: float(seconds) for source, seconds in
+    (item.split(':') for item in os.getenv('HEALTH_MAX_CONTENT_AGE', 'saint:129600,meditation:129600').split(',') if ':' in item)
+}
+health_max_queue_depth = int(os.getenv('HEALTH_MAX_QUEUE_DEPTH', '5000'))
+health_max_scheduler_lag = float(os.getenv('HEALTH_MAX_SCHEDULER_LAG', '300'))
+health_unready_grace = float(os.getenv('HEALTH_UNREADY_GRACE', '600'))
+
+# Handlers and jobs running longer than this are logged as slow
+profiling.slow_threshold = float(os.getenv('SLOW_HANDLER_MS', '1000')) / 1000
 
-# Enabling logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
+# Enabling logging: records are written by a background thread (as JSON lines or text), high-volume
+# events are sampled and repeated warnings and errors are rate limited
+logs.setup(
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+    json_output=os.getenv('LOG_FORMAT', 'json').lower() == 'json',
+    sampling=logs.parse_sampling(os.getenv('LOG_SAMPLING', 'broadcast_sent=0.01,mysql_connection_closed=0.01')),
+    error_burst=int(os.getenv('LOG_ERROR_BURST', '5')),
+    error_interval=float(os.getenv('LOG_ERROR_INTERVAL', '60')),
 )
 logger = logging.getLogger(__name__)
 
@@ -64,6 +200,8 @@ class MessageQueueBot(Bot):
         # Two attributes must be provided for decorator
         self._is_messages_queued_default = is_queued_def
         self._msg_queue = mqueue or messagequeue.MessageQueue()
+        # File IDs of the photos already sent by URL, as {URL: file ID}
+        self.photo_file_ids = {}
 
     # Finish method
     def __del__(self):
@@ -71,11 +209,124 @@ class MessageQueueBot(Bot):
         try: self._msg_queue.stop()
         except: pass
 
+    # Messages sending method, recording when the message was queued
+    # The scheduled delivery being sent (if any) goes along, since the queue sends from another thread
+    def send_message(self, *args, **kwargs):
+        return self._send_queued_message(*args, queued_at=time.monotonic(), scheduled=slo.current.get(), **kwargs)
+
     # Queued messages sending decorator
     @messagequeue.queuedmessage
-    def send_message(self, *args, **kwargs):
+    def _send_queued_message(self, *args, queued_at=None, scheduled=None, **kwargs):
+        metrics.QUEUE_WAIT.observe(time.monotonic() - queued_at)
+        token = slo.current.set(scheduled)
         # 'Encapsulated' method would accept new optional arguments 'queued' and 'isgroup'
-        return super(MessageQueueBot, self).send_message(*args, **kwargs)
+        try: return super(MessageQueueBot, self).send_message(*args, **kwargs)
+        finally: slo.current.reset(token)
+
+    # Photos sending method
+    # Photos sent before are sent again by their file IDs, and the mirrored ones are uploaded from their
+    # optimized variants, instead of having Telegram fetch the original images by URL
+    # Images from a local catalog (see 'backends') are uploaded as well
+    def send_photo(self, chat_id, photo, *args, **kwargs):
+        url, source = photo, 'url'
+        if (isinstance(url, str) and url in self.photo_file_ids): photo, source = self.photo_file_ids[url], 'file_id'
+        elif (isinstance(url, str) and media_mirror is not None and media_mirror.get(url) is not None):
+            photo, source = media_mirror.get(url), 'upload'
+        elif (isinstance(url, str) and os.path.isfile(url)): source = 'upload'
+        start = time.perf_counter()
+        if (source == 'upload'):
+            with open(photo, 'rb') as file: message = super(MessageQueueBot, self).send_photo(chat_id, file, *args, **kwargs)
+            # The uploaded photo is then reused by its URL
+            if (message is not None and message.photo): self.photo_file_ids[url] = message.photo[-1].file_id
+        else: message = super(MessageQueueBot, self).send_photo(chat_id, photo, *args, **kwargs)
+        photo_send_stats.record(source, time.perf_counter() - start)
+        return message
+
+    # Every Bot API request goes through this method, so latency and outcomes are measured here
+    # Messages wait for the global token bucket, shared with the bulk sender (the queue only orders them)
+    def _post(self, endpoint, *args, **kwargs):
+        if (endpoint.startswith(limited_endpoints)): send_limiter.acquire()
+        start = time.perf_counter()
+        try: result = super(MessageQueueBot, self)._post(endpoint, *args, **kwargs)
+        except Exception as error:
+            metrics.SENDS.inc(endpoint, type(error).__name__)
+            raise
+        finally: metrics.SEND_LATENCY.observe(time.perf_counter() - start, endpoint)
+        metrics.SENDS.inc(endpoint, 'ok')
+        # The first acknowledgement of a scheduled delivery sets its lateness
+        scheduled = slo.current.get()
+        if (scheduled is not None): acknowledge_delivery(scheduled)
+        # Remembering the file IDs of the photos sent by URL, so they can be reused (e.g.: on inline answers)
+        if (endpoint == 'sendPhoto' and isinstance(result, dict) and len(result.get('photo') or []) > 0):
+            data = args[0] if len(args) > 0 else kwargs.get('data') or {}
+            if (isinstance(data.get('photo'), str)): self.photo_file_ids[data['photo']] = result['photo'][-1]['file_id']
+        return result
+
+    # Messages waiting on the queue (both the global and the group delay queues)
+    def get_queue_depth(self):
+        return self._msg_queue._all_delayq._queue.qsize() + self._msg_queue._group_delayq._queue.qsize()
+
+# Function to record the Bot API acknowledgement of a scheduled delivery (only the first one sets its lateness)
+def acknowledge_delivery(scheduled):
+    lateness = delivery_slo.acknowledged(scheduled)
+    if (lateness is not None):
+        metrics.DELIVERY_ACK_LATENESS.observe(lateness, scheduled.service_type)
+        # Only acknowledged deliveries are on the ledger, so the ones lost on a crash are replayed
+        delivery_ledger.record(scheduled.chat_id, scheduled.service_type, scheduled.due_at)
+
+# Function to wrap an update handler (or a scheduled job), measuring its latency
+# Handlers are also profiled when a cProfile session is running
+def instrument(name, callback, kind='handler'):
+    @functools.wraps(callback)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        # Records logged while handling an update (or running a job) share a correlation ID
+        update = args[0] if (kind == 'handler' and len(args) > 0) else None
+        if (update is not None): token = logs.correlation_id.set(f"update:{update.update_id}")
+        else: token = logs.correlation_id.set(f"{kind}:{name}:{datetime.now(timezone.utc):%Y%m%dT%H%M%S}")
+        try:
+            if (kind == 'handler'): return profiling.run(callback, *args, **kwargs)
+            return callback(*args, **kwargs)
+        finally:
+            logs.correlation_id.reset(token)
+            elapsed = time.perf_counter() - start
+            if (kind == 'handler'): metrics.HANDLER_LATENCY.observe(elapsed, name)
+            profiling.check_slow(kind, name, elapsed)
+    return wrapper
+
+# Function to wrap a heavy command, so each chat only runs it once within its cooldown
+# 'variant' gets the content requested from the update, when the command has several ones
+def coalesced(command, callback, variant=None):
+    @functools.wraps(callback)
+    def wrapper(update, context):
+        chat_id = update.effective_chat.id
+        key = variant(update) if variant is not None else None
+        outcome = coalescer.begin(chat_id, command, key)
+        if (outcome != cooldown.RUN):
+            metrics.SUPPRESSED.inc(command, outcome)
+            return reply_suppressed(update, coalescer.remaining(chat_id, command, key), outcome)
+        succeeded = False
+        try:
+            result = callback(update, context)
+            succeeded = True
+            return result
+        finally:
+            coalescer.finish(chat_id, command, key, succeeded)
+    return wrapper
+
+# Function to answer a suppressed request
+# Merged requests only get the buttons answered, since the content is already being sent
+def reply_suppressed(update, remaining, outcome):
+    message = emojize(
+        f':hourglass: Esse conteúdo acabou de ser enviado, confira as mensagens acima. '
+        f'Ele poderá ser enviado novamente em {max(1, round(remaining / 60))} minuto(s).',
+        language='alias',
+    )
+    if (update.callback_query is not None):
+        if (outcome == cooldown.COOLDOWN): update.callback_query.edit_message_text(message)
+        else: update.callback_query.answer()
+        return ConversationHandler.END
+    if (outcome == cooldown.COOLDOWN): update.message.reply_text(message)
 
 # Start message with bot
 def start(update, context):
@@ -120,9 +371,14 @@ def contact(update, context):
 def broadcast(update, context):
     # Checking if message was sent by the admin
     if (update.message.chat_id == admin_chat_id):
+        # Without the user name, the message is the same for everyone, so it's prepared once for the bulk sender
+        broadcast_message = update.message.text.replace("#BROADCAST: ", "")
+        if (bulk_sender is not None and "[USER]" not in broadcast_message):
+            prepared = bulk_sender.prepare('sendMessage', text=broadcast_message, parse_mode='html')
+            for user in get_users(): bulk_sender.submit(prepared, user['chat_id'], broadcast_sent)
+            return
         # Getting list of users to receive the message
         for user in get_users():
-            print ("Chat ID: {}, Nome: {}".format(user['chat_id'], user['name']))
             # Formatting message to include user name (if required) and remove "#BROADCAST: " prefix
             broadcast_message = update.message.text.replace("#BROADCAST: ", "")
             broadcast_message = broadcast_message.replace("[USER]", user['name'])
@@ -132,7 +388,7 @@ def broadcast(update, context):
                 text=broadcast_message,
                 parse_mode='html',
             )
-            print (f"Mensagem enviada para o usuário {user['name']} ({user['chat_id']})")
+            logger.info('Mensagem de broadcast enviada', extra={'event': 'broadcast_sent', 'chat_id': user['chat_id']})
     # Otherwise, we inform about the error
     else:
         update.message.reply_text(
@@ -140,6 +396,11 @@ def broadcast(update, context):
             parse_mode='html',
         )
 
+# Function to log a broadcast message sent by the bulk sender
+def broadcast_sent(chat_id, result, error):
+    if (error is not None): logger.warning('Falha ao enviar broadcast para %s: %s', chat_id, error, extra={'event': 'broadcast_error'})
+    else: logger.info('Mensagem de broadcast enviada', extra={'event': 'broadcast_sent', 'chat_id': chat_id})
+
 # Function to list users (admin only)
 def list_users(update, context):
     # Checking if it was requested by the admin
@@ -168,6 +429,9 @@ def list_services(update, context):
             count_message += f"<b>{counts[count]} - {count}</b>\n"
         # Finally, we add the total count and send the message
         count_message += f'\nTotal de Serviços em Uso: <b>{str(sum(counts.values()))}</b>'
+        # Digest mode savings
+        count_message += f'\n\nModo resumo: <b>{digests.items}</b> itens entregues em <b>{digests.calls}</b> envios '
+        count_message += f'(<b>{digests.saved}</b> envios economizados)'
         update.message.reply_text(count_message, parse_mode='html')
     # Otherwise
     else:
@@ -176,19 +440,178 @@ def list_services(update, context):
             parse_mode='html',
         )
 
-# Function to send a random aspiration
+# Function to show the scheduled deliveries SLO report over the last hours (admin only)
+# Usage: /slo [hours], up to the last 24 hours
+def show_slo(update, context):
+    # Checking if it was requested by the admin
+    if (update.message.chat_id == admin_chat_id):
+        hours = int(context.args[0]) if (len(context.args) > 0 and context.args[0].isdigit()) else 24
+        hours = min(max(hours, 1), 24)
+        update.message.reply_text(slo.report(delivery_slo.summary(hours), delivery_slo.objective, hours), parse_mode='html')
+    # Otherwise
+    else:
+        update.message.reply_text(
+            'Erro: Somente o administrador tem acesso a essa função.', 
+            parse_mode='html',
+        )
+
+# Function to show the memory footprint report (admin only)
+# Usage: /memoria [iniciar|parar], to start or stop tracing the allocations (it slows the bot down a bit)
+def show_memory(update, context):
+    # Checking if it was requested by the admin
+    if (update.message.chat_id == admin_chat_id):
+        command = context.args[0].lower() if len(context.args) > 0 else None
+        if (command == 'iniciar' and not memory.start_tracing()):
+            update.message.reply_text('O rastreamento de memória já está ativo.')
+        elif (command == 'parar'):
+            if (memory.stop_tracing()): update.message.reply_text('Rastreamento de memória encerrado.')
+            else: update.message.reply_text('O rastreamento de memória não está ativo.')
+            return
+        update.message.reply_text(memory.report({
+            'Imagens': opus.img_list,
+            'Jaculatórias': opus.aspirations,
+            'Orações': opus.prayers,
+            'Inscrições (roda)': [wheel.subscriptions, wheel.slots],
+            'Índice de busca': search_index,
+        }), parse_mode='html')
+    # Otherwise
+    else:
+        update.message.reply_text(
+            'Erro: Somente o administrador tem acesso a essa função.', 
+            parse_mode='html',
+        )
+
+# Function to reload the registered services from the database, e.g.: after an import (admin only)
+def reload_services_command(update, context):
+    # Checking if it was requested by the admin
+    if (update.message.chat_id == admin_chat_id):
+        reloaded = reload_services()
+        if (reloaded is None): update.message.reply_text('Erro ao carregar os serviços, os atuais foram mantidos.')
+        else: update.message.reply_text(
+            f"Serviços recarregados: <b>{reloaded[0]}</b> adicionados ou alterados, <b>{reloaded[1]}</b> removidos "
+            f"({len(wheel)} no total).", parse_mode='html',
+        )
+    # Otherwise
+    else:
+        update.message.reply_text(
+            'Erro: Somente o administrador tem acesso a essa função.', 
+            parse_mode='html',
+        )
+
+# Function to send the daily SLO report to the admin
+def send_slo_report():
+    bot.send_message(
+        chat_id=admin_chat_id,
+        text=slo.report(delivery_slo.summary(24), delivery_slo.objective),
+        parse_mode='html',
+    )
+
+# Function to show the scheduled deliveries lateness for each delivery window (admin only)
+def list_lateness(update, context):
+    # Checking if it was requested by the admin
+    if (update.message.chat_id == admin_chat_id):
+        lateness_message = 'Atraso dos envios por janela de entrega (segundos):\n\n<b>Janela</b>: envios, média, p50, p95, máx.\n'
+        summary = lateness_stats.summary()
+        for window, stats in summary.items():
+            lateness_message += f"<b>{window}</b>: {stats['count']}, {stats['mean']:.1f}, {stats['p50']:.1f}, {stats['p95']:.1f}, {stats['max']:.1f}\n"
+        # If nothing was sent yet
+        if (len(summary) == 0): lateness_message += '\nNenhum envio agendado realizado até o momento.'
+        update.message.reply_text(lateness_message, parse_mode='html')
+    # Otherwise
+    else:
+        update.message.reply_text(
+            'Erro: Somente o administrador tem acesso a essa função.', 
+            parse_mode='html',
+        )
+
+# Function to show the images mirror report (bytes saved and photos sending latency)
+def show_media_report(update, context):
+    # Checking if it was requested by the admin
+    if (update.message.chat_id == admin_chat_id):
+        if (media_mirror is None): update.message.reply_text('O espelho de imagens não está habilitado (MEDIA_MIRROR_DIR).')
+        else: update.message.reply_text(media.report(media_mirror.summary(), photo_send_stats.summary()))
+    # Otherwise
+    else:
+        update.message.reply_text(
+            'Erro: Somente o administrador tem acesso a essa função.', 
+            parse_mode='html',
+        )
+
+# Function to send a profiling report to the admin
+def send_profiling_report(filename, content, summary):
+    bot.send_document(
+        chat_id=admin_chat_id,
+        document=io.BytesIO(content),
+        filename=filename,
+        caption=f'Perfil concluído: {summary}',
+    )
+
+# Function to start a profiling session (admin only)
+# Usage: /perfil <amostragem|cprofile> <N>[s|u], where 's' means seconds and 'u' updates (cProfile only)
+def start_profiling(update, context):
+    # Checking if it was requested by the admin
+    if (update.message.chat_id == admin_chat_id):
+        usage = 'Uso: /perfil &lt;amostragem|cprofile&gt; &lt;N&gt;[s|u]\nEx.: /perfil amostragem 30s, /perfil cprofile 100u'
+        # Parsing the arguments
+        try:
+            kind, limit = context.args[0], context.args[1].lower()
+            unit = limit[-1] if limit[-1] in 'su' else 's'
+            amount = int(limit.rstrip('su'))
+            if (kind not in ('amostragem', 'cprofile') or amount <= 0 or (unit == 'u' and kind != 'cprofile')):
+                raise ValueError(limit)
+        except (IndexError, ValueError):
+            update.message.reply_text(usage, parse_mode='html')
+            return
+        # Sessions are limited to 10 minutes
+        if (kind == 'amostragem'): session = profiling.SamplingSession(min(amount, 600), send_profiling_report)
+        elif (unit == 's'): session = profiling.CProfileSession(min(amount, 600), send_profiling_report)
+        else: session = profiling.CProfileSession(600, send_profiling_report, updates=amount)
+        # Only one session can run at a time
+        if (profiling.start(session)):
+            update.message.reply_text(f'Perfil ({kind}) iniciado: {amount}{unit}. O relatório será enviado ao final.')
+        else: update.message.reply_text('Erro: já existe um perfil em andamento.')
+    # Otherwise
+    else:
+        update.message.reply_text(
+            'Erro: Somente o administrador tem acesso a essa função.', 
+            parse_mode='html',
+        )
+
+# Function to list the most recent slow handlers and jobs (admin only)
+def list_slow_runs(update, context):
+    # Checking if it was requested by the admin
+    if (update.message.chat_id == admin_chat_id):
+        slow_message = f'Execuções acima de {profiling.slow_threshold * 1000:.0f} ms:\n\n'
+        for timestamp, kind, name, elapsed in list(profiling.slow_log)[-20:]:
+            slow_message += f"{datetime.fromtimestamp(timestamp).strftime('%d/%m %H:%M:%S')} - <b>{name}</b> ({kind}): {elapsed:.3f} s\n"
+        # If nothing was recorded
+        if (len(profiling.slow_log) == 0): slow_message += 'Nenhuma execução lenta registrada.'
+        update.message.reply_text(slow_message, parse_mode='html')
+    # Otherwise
+    else:
+        update.message.reply_text(
+            'Erro: Somente o administrador tem acesso a essa função.', 
+            parse_mode='html',
+        )
+
+# Function to get the next aspiration of an user (a random one, while they're not loaded yet)
+def get_aspiration(chat_id):
+    aspiration = aspirations_rotation.next(chat_id)
+    return opus.get_aspiration(id=None, tag=None) if aspiration is None else aspiration.text
+
+# Function to send the next aspiration of the user
 def send_aspiration(update=None, context=None, chat_id=None):
     # Responding to messages
     if (update is not None):
         update.message.reply_text(
-            f'"<i>{opus.get_aspiration(id=None, tag=None)}</i>"', 
+            f'"<i>{get_aspiration(update.message.chat_id)}</i>"', 
             parse_mode='html',
         )
     # Scheduled services
     elif (chat_id is not None):
         bot.send_message(
             chat_id=chat_id, 
-            text=f'"<i>{opus.get_aspiration(id=None, tag=None)}</i>"', 
+            text=f'"<i>{get_aspiration(chat_id)}</i>"', 
             parse_mode='html',
         )
 
@@ -222,6 +645,7 @@ def send_rosary(update=None, context=None, chat_id=None):
             photo=rosary['misterios'][str(i)]['img_path'], 
             caption=message, 
             parse_mode='html',
+            reply_markup=get_audio_markup(f"misterio:{rosary['name'].lower()}:{i}"),
         )
     
     # Sending the final prayer
@@ -248,40 +672,15 @@ def send_rosary(update=None, context=None, chat_id=None):
         parse_mode='html',
     )
 
-# Function to start aspirations
-def register_aspiration(update, context):
-    if (scheduler.get_job('registra_jaculatoria_' + str(update.callback_query.message.chat_id)) is None):
-        scheduler.add_job(
-            send_aspiration, 'cron', hour="10,16,20", minute="30", 
-            id='registra_jaculatoria_' + str(update.callback_query.message.chat_id), 
-            kwargs={'chat_id': update.callback_query.message.chat_id},
-        )
-        update.callback_query.edit_message_text(emojize(':white_check_mark: Serviço de envio de jaculatórias registrado, serão enviadas automaticamente 3 vezes ao dia.', language='alias'))
-        # Saving on the database
-        register_service(
-            'jaculatoria', 
-            update.callback_query.message.chat_id, 
-        )
-    # If it's already registered
-    else: update.callback_query.edit_message_text('Serviço já registrado.')
-
-# Function to stop aspirations
-def stop_aspiration(update, context):
-    if (scheduler.get_job('registra_jaculatoria_' + str(update.callback_query.message.chat_id))):
-        scheduler.remove_job('registra_jaculatoria_' + str(update.callback_query.message.chat_id))
-        update.callback_query.edit_message_text(emojize(':x: Serviço de envio de jaculatórias interrompido.', language='alias'))
-        # Removing from database
-        remove_service(
-            'jaculatoria', 
-            update.callback_query.message.chat_id,
-        )
-
 # Function to send the Saint of the Day
 def send_saint(update=None, context=None, chat_id=None):
-    caption = saint_of_the_day['subtitle']
-    photo = saint_of_the_day['img_url']
+    caption, photo = get_saint()
+    # Without an image (e.g.: the page couldn't be read), a text message is sent
+    if (photo is None):
+        if (update is not None): update.message.reply_text(caption, parse_mode='html')
+        elif (chat_id is not None): bot.send_message(chat_id=chat_id, text=caption, parse_mode='html')
     # Responding to messages
-    if (update is not None):
+    elif (update is not None):
         update.message.reply_photo(
             photo=photo, 
             caption=caption, 
@@ -296,36 +695,9 @@ def send_saint(update=None, context=None, chat_id=None):
             parse_mode='html',
         )
 
-# Function to start Saint of the Day
-def register_saint(update, context):
-    if (scheduler.get_job('registra_santo_' + str(update.callback_query.message.chat_id)) is None):
-        scheduler.add_job(
-            send_saint, 'cron', hour="8", 
-            id='registra_santo_' + str(update.callback_query.message.chat_id), 
-            kwargs={'chat_id': update.callback_query.message.chat_id},
-        )
-        update.callback_query.edit_message_text(emojize(':white_check_mark: Serviço de envio de Santo do Dia registrado, será enviado automaticamente 1 vez ao dia.', language='alias'))
-        # Saving on the database
-        register_service(
-            'santo', 
-            update.callback_query.message.chat_id, 
-        )
-    # If it's already registered
-    else: update.callback_query.edit_message_text('Serviço já registrado.')
-
-# Function to stop Saint of the Day
-def stop_saint(update, context):
-    if (scheduler.get_job('registra_santo_' + str(update.callback_query.message.chat_id))):
-        scheduler.remove_job('registra_santo_' + str(update.callback_query.message.chat_id))
-        update.callback_query.edit_message_text(emojize(':x: Serviço de envio do Santo do Dia interrompido.', language='alias'))
-        # Removing from database
-        remove_service(
-            'santo', 
-            update.callback_query.message.chat_id,
-        )
-
 # Function to send the daily meditation
 def send_meditation(update=None, context=None, chat_id=None):
+    daily_meditation = get_meditation()
     # Responding to messages
     if (update is not None):
         # We disable the web page preview, to use less space
@@ -344,40 +716,9 @@ def send_meditation(update=None, context=None, chat_id=None):
             disable_web_page_preview=True
         )
     
-# Function to start daily meditation
-def register_meditation(update, context):
-    if (scheduler.get_job('registra_meditacao_' + str(update.callback_query.message.chat_id)) is None):
-        scheduler.add_job(
-            send_meditation, 'cron', hour="5", minute="5", 
-            id='registra_meditacao_' + str(update.callback_query.message.chat_id), 
-            kwargs={'chat_id': update.callback_query.message.chat_id},
-        )
-        update.callback_query.edit_message_text(emojize(
-            ':white_check_mark: Serviço de envio de Meditação Diária registrado, será enviada automaticamente 1 vez ao dia.',
-            language='alias',
-        ))
-        # Saving on the database
-        register_service(
-            'meditacao', 
-            update.callback_query.message.chat_id, 
-        )
-    # If it's already registered
-    else: update.callback_query.edit_message_text('Serviço já registrado.')
-
-# Function to stop daily meditation
-def stop_meditation(update, context):
-    if (scheduler.get_job('registra_meditacao_' + str(update.callback_query.message.chat_id))):
-        scheduler.remove_job('registra_meditacao_' + str(update.callback_query.message.chat_id))
-        update.callback_query.edit_message_text(emojize(':x: Serviço de envio de Meditação Diária interrompido.', language='alias'))
-        # Removing from database
-        remove_service(
-            'meditacao', 
-            update.callback_query.message.chat_id,
-        )
-    
 # Function to send Angelus/Regina Caeli
 def send_angelus_regina_caeli(update=None, context=None, chat_id=None):
-    caption, photo = opus.angelus_regina_caeli(liturgical_season=current_liturgical_season)
+    caption, photo = opus.angelus_regina_caeli(liturgical_season=get_liturgical_season())
     # Responding to messages
     if (update is not None):
         update.message.reply_photo(
@@ -392,140 +733,206 @@ def send_angelus_regina_caeli(update=None, context=None, chat_id=None):
             caption=caption,
         )
 
-# Function to start Angelus/Regina Caeli
-def register_angelus_regina_caeli(update, context):
-    if (scheduler.get_job('registra_angelus_regina_caeli_' + str(update.callback_query.message.chat_id)) is None):
-        scheduler.add_job(
-            send_angelus_regina_caeli, 'cron', hour="12", 
-            id='registra_angelus_regina_caeli_' + str(update.callback_query.message.chat_id), 
-            kwargs={'chat_id': update.callback_query.message.chat_id}
-        )
-        update.callback_query.edit_message_text(emojize(
-            ':white_check_mark: Serviço de envio de Angelus/Regina Caeli registrado, será enviado automaticamente todo dia às 12h.',
+# Functions to render the services content for the digests, as (text, photo)
+def render_aspiration(chat_id):
+    return f'"<i>{get_aspiration(chat_id)}</i>"', None
+
+def render_saint(chat_id):
+    return get_saint()
+
+def render_meditation(chat_id):
+    return get_meditation(), None
+
+def render_angelus_regina_caeli(chat_id):
+    caption, photo = opus.angelus_regina_caeli(liturgical_season=get_liturgical_season())
+    # The prayer is plain text, so it's escaped to be joined with the HTML items
+    return html.escape(caption), photo
+
+# Function to send the pending services of an user in digest mode
+def send_digest(update=None, context=None, chat_id=None):
+    # Rendering the services which are still registered
+    items = [
+        service_renderers[service_type](chat_id)
+        for service_type in digests.pop(chat_id)
+        if wheel.has(chat_id, service_type)
+    ]
+    if (len(items) == 0): return
+    # Sending the items with as few API calls as possible
+    operations = delivery.compose_digest(items)
+    for operation, content in operations:
+        if (operation == 'message'):
+            bot.send_message(
+                chat_id=chat_id, 
+                text=content, 
+                parse_mode='html', 
+                disable_web_page_preview=True,
+            )
+        elif (operation == 'photo'):
+            bot.send_photo(
+                chat_id=chat_id, 
+                photo=content[0], 
+                caption=content[1], 
+                parse_mode='html',
+            )
+        else:
+            bot.send_media_group(
+                chat_id=chat_id,
+                media=[InputMediaPhoto(photo, caption=caption, parse_mode='html') for photo, caption in content],
+            )
+    digests.record(len(items), len(operations))
+
+# Function to turn the digest mode on or off
+def toggle_digest(update, context):
+    chat_id = update.message.chat_id
+    # If it's enabled, we turn it off
+    if (wheel.remove(chat_id, 'resumo')):
+        # Pending items are discarded, the services will be sent separately again
+        digests.pop(chat_id)
+        remove_service('resumo', chat_id)
+        update.message.reply_text(emojize(
+            ':x: Modo resumo desativado, os serviços registrados voltarão a ser enviados separadamente.',
             language='alias',
         ))
+    # Otherwise, we turn it on
+    else:
+        subscription = new_subscription(chat_id, 'resumo')
+        wheel.add(subscription)
+        register_service('resumo', chat_id, subscription.time_zone)
+        update.message.reply_text(emojize(
+            f':white_check_mark: Modo resumo ativado, os serviços registrados serão enviados juntos às {delivery.DEFAULT_TIMES["resumo"]}.\n'
+            'Para alterar os horários: /horario resumo HH:MM,HH:MM',
+            language='alias',
+        ))
+
+# Functions used to render the services included in the digests
+service_renderers = {
+    'jaculatoria': render_aspiration,
+    'santo': render_saint,
+    'meditacao': render_meditation,
+    'angelus_regina_caeli': render_angelus_regina_caeli,
+}
+
+# Functions used to deliver each one of the services
+service_senders = {
+    'jaculatoria': send_aspiration,
+    'santo': send_saint,
+    'meditacao': send_meditation,
+    'angelus_regina_caeli': send_angelus_regina_caeli,
+    'resumo': send_digest,
+}
+
+# Function to register a service selected on the services keyboard
+def register_selected_service(update, context, service_type):
+    chat_id = update.callback_query.message.chat_id
+    if (not wheel.has(chat_id, service_type)):
+        subscription = new_subscription(chat_id, service_type)
+        wheel.add(subscription)
+        update.callback_query.edit_message_text(menus.SERVICES_MESSAGES[service_type][menus.REGISTER])
         # Saving on the database
-        register_service(
-            'angelus_regina_caeli', 
-            update.callback_query.message.chat_id,
-        )
+        register_service(service_type, chat_id, subscription.time_zone)
     # If it's already registered
     else: update.callback_query.edit_message_text('Serviço já registrado.')
 
-# Function to stop Angelus/Regina Caeli
-def stop_angelus_regina_caeli(update, context):
-    if (scheduler.get_job('registra_angelus_regina_caeli_' + str(update.callback_query.message.chat_id))):
-        scheduler.remove_job('registra_angelus_regina_caeli_' + str(update.callback_query.message.chat_id))
-        update.callback_query.edit_message_text(emojize(':x: Serviço de envio do Angelus/Regina Caeli interrompido.', language='alias'))
+# Function to stop a service selected on the services keyboard
+def stop_selected_service(update, context, service_type):
+    chat_id = update.callback_query.message.chat_id
+    if (wheel.remove(chat_id, service_type)):
+        update.callback_query.edit_message_text(menus.SERVICES_MESSAGES[service_type][menus.STOP])
         # Removing from database
-        remove_service(
-            'angelus_regina_caeli', 
-            update.callback_query.message.chat_id,
-        )
-    
+        remove_service(service_type, chat_id)
+
+# Functions called for each action on the services keyboard
+service_actions = {
+    menus.REGISTER: register_selected_service,
+    menus.STOP: stop_selected_service,
+}
+
 # Function to show available services
 def show_services(update, context):
-    # Checking user enabled services
-    # For aspirations
-    if (scheduler.get_job('registra_jaculatoria_' + str(update.message.chat_id)) is None):
-        button1 = emojize(':white_check_mark: Registrar Jaculatórias', language='alias')
-        callback1 = 'registrar_jaculatoria'
-    else:
-        button1 = emojize(':x: Parar Jaculatórias', language='alias')
-        callback1 = 'parar_jaculatoria'
-    # For the Saint of the Day
-    if (scheduler.get_job('registra_santo_' + str(update.message.chat_id)) is None):
-        button2 = emojize(':white_check_mark: Registrar Santo do Dia', language='alias')
-        callback2 = 'registrar_santo'
-    else:
-        button2 = emojize(':x: Parar Santo do Dia', language='alias')
-        callback2 = 'parar_santo'
-    # For daily meditation
-    if (scheduler.get_job('registra_meditacao_' + str(update.message.chat_id)) is None):
-        button3 = emojize(':white_check_mark: Registrar Meditação Diária', language='alias')
-        callback3 = 'registrar_meditacao'
-    else:
-        button3 = emojize(':x: Parar Meditação Diária', language='alias')
-        callback3 = 'parar_meditacao'
-    # For Angelus/Regina Caeli
-    if (scheduler.get_job('registra_angelus_regina_caeli_' + str(update.message.chat_id)) is None):
-        button4 = emojize(':white_check_mark: Registrar Angelus/Regina Caeli', language='alias')
-        callback4 = 'registrar_angelus_regina_caeli'
-    else:
-        button4 = emojize(':x: Parar Angelus/Regina Caeli', language='alias')
-        callback4 = 'parar_angelus_regina_caeli'
-
-    # Defining buttons to be shown
-    keyboard = [
-        [
-            InlineKeyboardButton(button1, callback_data=callback1),
-            InlineKeyboardButton(button2, callback_data=callback2)
-        ],
-        [InlineKeyboardButton(button3, callback_data=callback3)],
-        [InlineKeyboardButton(button4, callback_data=callback4)]
-    ]
-    # Formatting buttons
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    chat_id = update.message.chat_id
+    # The keyboard for the user enabled services was already created
+    reply_markup = menus.get_services_keyboard(lambda service_type: wheel.has(chat_id, service_type))
     # Replying to message with created buttons
     update.message.reply_text('Serviços disponíveis:', reply_markup=reply_markup)
     return SERVICES
 
 # Function to select a service
 def select_service(update, context):
-    # Getting clicked button data
-    query = update.callback_query
-    # For each command, we'll call the appropriate function
-    # Registering services
-    if (query.data == "registrar_jaculatoria"):
-        register_aspiration(update, context)
-    elif (query.data == "registrar_santo"):
-        register_saint(update, context)
-    elif (query.data == "registrar_meditacao"):
-        register_meditation(update, context)
-    elif (query.data == "registrar_angelus_regina_caeli"):
-        register_angelus_regina_caeli(update, context)
-    # Registrando servicos
-    elif (query.data == "parar_jaculatoria"):
-        stop_aspiration(update, context)
-    elif (query.data == "parar_santo"):
-        stop_saint(update, context)
-    elif (query.data == "parar_meditacao"):
-        stop_meditation(update, context)
-    elif (query.data == "parar_angelus_regina_caeli"):
-        stop_angelus_regina_caeli(update, context)
-    # We could update the message button here
-    #query.edit_message_text(text="Serviço selecionado")
+    # Getting clicked button data, and the action to be done (old or unknown buttons are ignored)
+    route = menus.SERVICES_ROUTES.get(update.callback_query.data)
+    if (route is not None):
+        action, service_type = route
+        service_actions[action](update, context, service_type)
     # Ending the conversation
     return ConversationHandler.END
 
+# Function to set the time zone used to deliver the user's services
+def set_time_zone(update, context):
+    chat_id = update.message.chat_id
+    subscriptions = wheel.for_chat(chat_id)
+    # If no time zone was provided, we show the current one
+    if (len(context.args) == 0):
+        time_zone = subscriptions[0].time_zone if len(subscriptions) > 0 else default_time_zone
+        update.message.reply_text(
+            f'Fuso horário atual: <b>{time_zone}</b>\n\nPara alterar, informe o nome do fuso horário. Ex.: /fuso_horario America/Manaus',
+            parse_mode='html',
+        )
+        return
+    # Checking the provided time zone
+    time_zone = context.args[0]
+    try: delivery.get_time_zone(time_zone)
+    except ValueError:
+        update.message.reply_text(f'Erro: fuso horário "{time_zone}" não encontrado. Ex.: America/Sao_Paulo, Europe/Lisbon')
+        return
+    # The time zone is stored with the services, so at least one must be registered
+    if (len(subscriptions) == 0):
+        update.message.reply_text('Nenhum serviço registrado. Registre os serviços com /registrar_servicos e depois defina o fuso horário.')
+        return
+    # Updating the subscriptions on the timing wheel and on the database
+    for subscription in subscriptions:
+        wheel.add(delivery.Subscription(chat_id, subscription.service_type, time_zone, subscription.delivery_times))
+    update_services_delivery(chat_id, time_zone)
+    update.message.reply_text(emojize(
+        f':white_check_mark: Fuso horário alterado para <b>{time_zone}</b>.',
+        language='alias',
+    ), parse_mode='html')
+
+# Function to set the preferred delivery times for a service
+def set_delivery_times(update, context):
+    chat_id = update.message.chat_id
+    # If no valid service was provided, we show the available ones and their default times
+    if (len(context.args) == 0 or context.args[0] not in delivery.DEFAULT_TIMES):
+        message = 'Informe o serviço e os horários desejados (HH:MM, separados por vírgula). Ex.: /horario santo 07:30\n'
+        message += 'Para voltar ao horário padrão, informe apenas o serviço. Ex.: /horario santo\n\n<b>Serviço</b> (horário padrão)\n'
+        for service_type, default_times in delivery.DEFAULT_TIMES.items():
+            message += f"<b>{service_type}</b> ({default_times})\n"
+        update.message.reply_text(message, parse_mode='html')
+        return
+    # Checking if the service is registered
+    service_type = context.args[0]
+    subscription = wheel.get(chat_id, service_type)
+    if (subscription is None):
+        update.message.reply_text('Serviço não registrado. Registre os serviços com /registrar_servicos.')
+        return
+    # Parsing the provided times (none means the service default)
+    if (len(context.args) == 1): delivery_times = None
+    else:
+        try: delivery_times = delivery.format_times(delivery.parse_times(','.join(context.args[1:])))
+        except ValueError:
+            update.message.reply_text('Erro: horários inválidos. Utilize o formato HH:MM, separados por vírgula. Ex.: 10:30,16:30')
+            return
+    # Updating the subscription on the timing wheel and on the database
+    wheel.add(delivery.Subscription(chat_id, service_type, subscription.time_zone, delivery_times))
+    update_services_delivery(chat_id, subscription.time_zone, service_type, delivery_times)
+    update.message.reply_text(emojize(
+        f':white_check_mark: Horários de <b>{service_type}</b>: {delivery_times or delivery.DEFAULT_TIMES[service_type]} ({subscription.time_zone}).',
+        language='alias',
+    ), parse_mode='html')
+
 # Function to show available prayers
 def show_prayers(update, context):
-    # Defining buttons to be shown
-    keyboard = [
-        [InlineKeyboardButton("Cântico dos Três Jovens", callback_data='cantico_tres_jovens')],
-        [InlineKeyboardButton("Lembrai-vos", callback_data='lembrai-vos')],
-        [
-            InlineKeyboardButton("Ato de Contrição", callback_data='ato_contricao'),
-            InlineKeyboardButton("Alternativo", callback_data='ato_contricao_alt')
-        ],
-        [
-            InlineKeyboardButton("Oferecimento do Dia", callback_data='oferecimento_dia'),
-            InlineKeyboardButton("Alternativo", callback_data='oferecimento_dia_alt')
-        ],
-        [InlineKeyboardButton("Ação de Graças Noite", callback_data='acao_gracas')],
-        [InlineKeyboardButton("Intenção para ganhar indulgências", callback_data='intencao_indulgencias')],
-        [
-            InlineKeyboardButton("Salmo 2", callback_data='salmo_2'),
-            InlineKeyboardButton("Adoro-te Devote", callback_data='adoro-te_devote')
-        ],
-    ]
     # Admin will also have access to other options
-    if update.message.chat_id == admin_chat_id:
-        keyboard.append(
-            [InlineKeyboardButton("Preces", callback_data='preces')]
-        )
-    # Formatting buttons
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = menus.get_prayers_keyboard(admin=update.message.chat_id == admin_chat_id)
     # Replying to message with created buttons
     update.message.reply_text('Orações Disponíveis:', reply_markup=reply_markup)
     return PRAYERS
@@ -538,22 +945,126 @@ def send_prayer(update, context):
     query.edit_message_text(
         text=opus.prayers[query.data],
         parse_mode='html',
+        reply_markup=get_audio_markup(f"oracao:{query.data}"),
     )
     return ConversationHandler.END
 
+# Function to search the prayers, Rosary mysteries and aspirations
+def search_content(update, context):
+    query = ' '.join(context.args)
+    # If no term was provided, we show how to use the command
+    if (query.strip() == ''):
+        update.message.reply_text('Informe o termo a ser buscado. Exemplo: /buscar coração')
+        return
+    results = search_index.search(query)
+    if (len(results) == 0):
+        update.message.reply_text(f'Nenhum resultado encontrado para "{query}".')
+        return
+    # Listing the results with an excerpt, and a button to get each one
+    message = f'Resultados para "<b>{html.escape(query)}</b>":\n'
+    keyboard = []
+    for position, (score, doc_id) in enumerate(results, start=1):
+        title, text = search_index.get(doc_id)
+        message += f"\n{position}. <b>{html.escape(title)}</b>\n<i>{html.escape(search_index.snippet(doc_id, query))}</i>\n"
+        keyboard.append([InlineKeyboardButton(f"{position}. {title[:40]}", callback_data=f"buscar:{doc_id}")])
+    update.message.reply_text(message, parse_mode='html', reply_markup=InlineKeyboardMarkup(keyboard))
+
+# Function to send a search result selected by the user
+def send_search_result(update, context):
+    query = update.callback_query
+    query.answer()
+    document = search_index.get(query.data[len('buscar:'):])
+    # The content may have changed since the search
+    if (document is None):
+        bot.send_message(chat_id=query.message.chat_id, text='Esse conteúdo não está mais disponível, faça uma nova busca.')
+        return
+    title, text = document
+    bot.send_message(
+        chat_id=query.message.chat_id,
+        text=f"<b>{html.escape(title)}</b>\n\n{text}",
+        parse_mode='html',
+        reply_markup=get_audio_markup(query.data[len('buscar:'):]),
+    )
+
+# Function to get the text read on the audio of a content item (None if it doesn't exist)
+def get_audio_text(item_id):
+    document = search_index.get(item_id)
+    if (document is None): return None
+    title, text = document
+    return f"{title}.\n\n{search.strip_html(text)}"
+
+# Function to get the button to listen to a content item, if its audio was already synthesized
+def get_audio_markup(item_id):
+    if (audio_cache is None): return None
+    text = get_audio_text(item_id)
+    if (text is None or audio_cache.get(text) is None): return None
+    return menus.get_audio_keyboard(item_id)
+
+# Function to send the audio of a content item as a voice message
+# Audios are only read from the cache (by their Telegram file ID, once sent), never synthesized here
+def send_audio(update, context):
+    query = update.callback_query
+    text = get_audio_text(query.data[len('audio:'):]) if audio_cache is not None else None
+    path = audio_cache.get(text) if text is not None else None
+    if (path is None):
+        query.answer('Áudio indisponível no momento.')
+        return
+    query.answer()
+    file_id = audio_cache.get_file_id(text)
+    if (file_id is not None):
+        bot.send_voice(chat_id=query.message.chat_id, voice=file_id)
+        return
+    with open(path, 'rb') as file: message = bot.send_voice(chat_id=query.message.chat_id, voice=file)
+    if (message is not None and message.voice is not None): audio_cache.set_file_id(text, message.voice.file_id)
+
+# Function to synthesize the missing audios of the prayers, Rosary mysteries and aspirations
+def precompute_audio():
+    if (audio_cache is None): return
+    texts = [get_audio_text(item_id) for item_id in opus.get_search_documents()]
+    synthesized = audio_cache.precompute(text for text in texts if text is not None)
+    logger.info('Áudios sintetizados: %d novos, %d conteúdos', synthesized, len(texts))
+
+# Function to create the inline query result for a content item (None if it's no longer on the index)
+def create_inline_result(item_id):
+    document = search_index.get(item_id)
+    # The content may have been reloaded since the inline index was built
+    if (document is None): return None
+    title, text = document
+    # Mysteries are answered with their image (already uploaded to Telegram, when possible)
+    # Telegram can only fetch images by http(s) URLs, so local ones (e.g.: from a directory catalog)
+    # which weren't uploaded yet are answered as text
+    if (item_id.startswith('misterio:')):
+        mysteries_type, index = item_id.split(':')[1:]
+        images = opus.get_mystery_images(mysteries_type, index)
+        if (len(images) > 0):
+            caption = f"<b><i>{html.escape(title)}</i></b>\n\n<i>{text[:delivery.CAPTION_LIMIT - len(title) - 40]}</i>"
+            file_id = bot.photo_file_ids.get(images[0])
+            if (file_id is not None):
+                return InlineQueryResultCachedPhoto(id=item_id, photo_file_id=file_id, title=title, caption=caption, parse_mode='html')
+            if (images[0].startswith(('http://', 'https://'))):
+                return InlineQueryResultPhoto(id=item_id, photo_url=images[0], thumb_url=images[0], title=title, caption=caption, parse_mode='html')
+    message = f"<b>{html.escape(title)}</b>\n\n{text}"
+    # Long texts would make Telegram reject the whole answer, so they're cut as plain text
+    if (len(message) > delivery.MESSAGE_LIMIT):
+        content = InputTextMessageContent(f"{title}\n\n{search.strip_html(text)}"[:delivery.MESSAGE_LIMIT - 1] + '…')
+    else: content = InputTextMessageContent(message, parse_mode='html')
+    return InlineQueryResultArticle(
+        id=item_id, title=title,
+        description=' '.join(search.strip_html(text).split())[:100],
+        input_message_content=content,
+    )
+
+# Function to answer inline queries (e.g.: '@bot lembrai'), which must be answered quickly
+def answer_inline_query(update, context):
+    query = update.inline_query
+    results = [result for result in map(create_inline_result, inline_index.search(query.query)) if result is not None]
+    # Telegram may also cache the answer for a while
+    query.answer(results, cache_time=300)
+
 # Function to show available mysteries
 def show_rosary_mysteries(update, context):
-    # Defining buttons to be shown
-    keyboard = [
-        [InlineKeyboardButton("Mistérios Gozosos", callback_data='gozosos')],
-        [InlineKeyboardButton("Mistérios Dolorosos", callback_data='dolorosos')],
-        [InlineKeyboardButton("Mistérios Gloriosos", callback_data='gloriosos')],
-        [InlineKeyboardButton("Mistérios Luminosos", callback_data='luminosos')],
-    ]
-    # Formatting buttons
-    reply_markup = InlineKeyboardMarkup(keyboard)
     # Replying to message with created buttons
-    update.message.reply_text('Escolha os mistérios:', reply_markup=reply_markup)
+    update.message.reply_text('Escolha os mistérios:', reply_markup=menus.MYSTERIES_KEYBOARD)
     return MYSTERIES
 
 # Function to send the selected Rosary mysteries
@@ -577,13 +1088,27 @@ def send_rosary_mysteries(update, context):
             chat_id=query['message']['chat']['id'],
             photo=mysteries['misterios'][str(i)]['img_path'],
             caption=message,
-            parse_mode='html'
+            parse_mode='html',
+            reply_markup=get_audio_markup(f"misterio:{query['data']}:{i}"),
         )
     # Ending current conversation
     return ConversationHandler.END
 
+# Function to stream a file from the Bot API, as (file path, bytes chunks)
+def fetch_telegram_file(file_id, chunk_size=64 * 1024):
+    telegram_file = bot.get_file(file_id)
+    response = requests.get(telegram_file.file_path, stream=True, timeout=30)
+    response.raise_for_status()
+    # The connection is released once the chunks are consumed (or the download is aborted)
+    def chunks():
+        with response: yield from response.iter_content(chunk_size=chunk_size)
+    return telegram_file.file_path, chunks()
+
 # Function to handle received files
 def file_handler(update, context):
+    # Saving the file on the uploads directories (downloaded by the ingestion threads)
+    attachment = ingestion.get_attachment(update.message)
+    if (uploads is not None and attachment is not None): uploads.submit(*attachment)
     update.message.reply_text(emojize(
         'Nenhuma mensagem de texto recebida. :white_check_mark:',
         language='alias',
@@ -618,64 +1143,340 @@ def cancel(update, context):
     # Ending corrent conversation
     return ConversationHandler.END
 
-# Aux function to get Saint of the day
-def request_saint_of_the_day():
-    global saint_of_the_day
-    saint_of_the_day['subtitle'], saint_of_the_day['img_url'] = opus.get_saint_of_the_day()
+# Function to get the Saint of the Day from the content store, as (caption, image URL)
+def get_saint():
+    saint = content_store.get('saint')
+    if (saint is None): return opus.get_saint_unavailable_message(), None
+    return saint[0], saint[1]
+
+# Function to get the daily meditation from the content store
+def get_meditation():
+    return content_store.get('meditation') or opus.get_meditation_unavailable_message()
+
+# Function to get the current liturgical season from the content store
+# An empty season (nothing fetched yet) is treated as ordinary, and never triggers a request
+def get_liturgical_season():
+    return content_store.get('liturgical_season', default='', day=datetime.today().date())
+
+# Function to get the current content, as saved on the snapshot
+def get_content_snapshot():
+    return {
+        'images': opus.img_list,
+        'prayers': opus.prayers,
+        'aspirations': [[a.id, a.text, a.tags] for a in opus.aspirations],
+        'store': content_store.to_dict(),
+        'updated_at': content_updated_at,
+    }
+
+# Function to restore the last-known content from the snapshot
+def restore_content_snapshot():
+    snapshot = warmup.load_snapshot(content_snapshot_path)
+    if ('images' in snapshot): opus.img_list = opus.compact_images(snapshot['images'])
+    if ('prayers' in snapshot and 'rosario' in snapshot['prayers']):
+        opus.prayers, opus.rosary = snapshot['prayers'], snapshot['prayers']['rosario']
+    if ('aspirations' in snapshot): opus.aspirations = [opus.Aspiration(*item) for item in snapshot['aspirations']]
+    content_store.load(snapshot.get('store', {}))
+    update_search_index()
+    update_aspirations_rotation()
+    # Keeping the original ages, so stale content shows up on the metrics
+    content_updated_at.update(snapshot.get('updated_at', {}))
+    return len(snapshot) > 0
+
+# Function to save the content snapshot
+def save_content_snapshot():
+    with content_snapshot_lock:
+        warmup.save_snapshot(content_snapshot_path, get_content_snapshot())
+
+# Function to update the search indexes with the current prayers, mysteries and aspirations
+# Only the changed documents are reindexed; the inline index matches the titles (and the aspirations texts)
+def update_search_index():
+    documents = opus.get_search_documents()
+    changed = search_index.update(documents)
+    if (changed > 0):
+        logger.info('Índice de busca atualizado: %d documentos reindexados, %d no total', changed, len(search_index))
+        inline_index.build({
+            doc_id: (title, text if doc_id.startswith('jaculatoria:') else title)
+            for doc_id, (title, text) in documents.items()
+        })
+
+# Function to update the aspirations on the users rotation (their positions are kept)
+def update_aspirations_rotation():
+    aspirations_rotation.set_items({aspiration.id: aspiration for aspiration in opus.aspirations})
+
+# Function to download a file (e.g.: a bucket image)
+# Images from a local catalog are just copied
+def download_file(url, path, chunk_size=64 * 1024):
+    if (os.path.isfile(url)): return shutil.copyfile(url, path)
+    with requests.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(path, 'wb') as file:
+            for chunk in response.iter_content(chunk_size=chunk_size): file.write(chunk)
 
-# Aux function to get daily meditation
-def request_daily_meditation():
-    global daily_meditation
-    daily_meditation = opus.get_daily_meditation()
+# Function to mirror the new bucket images (running on its own thread, since it may take a while)
+def sync_media_mirror():
+    if (media_mirror is None): return
+    mirrored = media_mirror.sync([opus.image_url(key) for key in opus.img_list])
+    if (mirrored > 0): logger.info(media.report(media_mirror.summary()))
 
-# Aux function to get litrugical season from current date
-def request_liturgical_season():
-    global current_liturgical_season
-    current_liturgical_season = opus.get_liturgical_season()
+# Function to mark a content source as loaded, saving the snapshot
+def content_loaded(source):
+    content_updated_at[source] = time.time()
+    if (source in ('prayers', 'aspirations')): update_search_index()
+    if (source == 'aspirations'): update_aspirations_rotation()
+    if (source == 'images'): threading.Thread(target=sync_media_mirror, name='media-mirror', daemon=True).start()
+    save_content_snapshot()
+
+# Daily content, kept for each date: the saint and the meditation pages only show the current day
+# (published around 07:50 and 04:45), so they're only fetched for it, while the liturgical calendar can be fetched ahead
+content_store = ContentStore(on_update=content_loaded)
+content_store.register(Source(
+    'saint', lambda day: opus.get_saint_of_the_day(),
+    available_at='07:50', validate=lambda saint: saint[0] != '', today_only=True,
+))
+content_store.register(Source(
+    'meditation', lambda day: opus.get_daily_meditation(fallback=False),
+    available_at='04:45', today_only=True,
+))
+content_store.register(Source(
+    'liturgical_season', lambda day: opus.get_liturgical_season(day),
+    days_ahead=content_prefetch_days,
+    validate=lambda season: season in ('ordinary', 'lent', 'easter', 'advent', 'christmas'),
+))
+
+# Function to fetch the missing dates of a content store source, raising an error if any failed (used on startup)
+def warm_up_store_source(source):
+    failed = content_store.refresh(sources=(source,))
+    if (len(failed) > 0): raise RuntimeError(f"Conteúdo indisponível: {', '.join(str(day) for name, day in failed)}")
+
+# Function to create a content source which fails while its content is empty (given by a function), so it's retried
+def require_content(load, get_content):
+    def run():
+        load()
+        if (len(get_content()) == 0): raise ValueError('conteúdo vazio')
+    return run
+
+# Content sources, loaded concurrently on startup
+content_sources = {
+    'images': require_content(opus.load_images, lambda: opus.img_list),
+    'prayers': require_content(opus.load_prayers, lambda: opus.prayers),
+    'aspirations': require_content(opus.query_aspirations, lambda: opus.aspirations),
+    'saint': functools.partial(warm_up_store_source, 'saint'),
+    'meditation': functools.partial(warm_up_store_source, 'meditation'),
+    'liturgical_season': functools.partial(warm_up_store_source, 'liturgical_season'),
+}
+
+# Sources which are loaded again (with backoff) when they fail, until they load
+# The daily content ones are retried by the content store job instead
+content_retries = warmup.Retries(('images', 'prayers', 'aspirations'))
+
+# Function to load every content source concurrently, returning the ones still loading
+def warm_up_content(timeline=warmup.timeline):
+    pending = warmup.warm_up(content_sources, content_loaded, {}, warmup_timeout, timeline, content_retries)
+    logger.info(timeline.report())
+    return pending
+
+# Function to load again the content sources which failed, once their retry time has come
+def retry_content_sources():
+    return warmup.retry(content_sources, content_loaded, content_retries)
 
 # Function to log errors
 def error(update, context):
     # Updates errors log
-    logger.warning('Atualização "%s" causou o erro "%s"', update, context.error)
+    with logs.correlated(f"update:{update.update_id}" if isinstance(update, Update) else None):
+        logger.warning('Atualização "%s" causou o erro "%s"', update, context.error, extra={'event': 'update_error'})
+    metrics.HANDLER_ERRORS.inc(type(context.error).__name__)
+
+# Function to get the age (seconds) of each cached content source
+def get_content_ages():
+    now = time.time()
+    return {(source,): now - updated_at for source, updated_at in content_updated_at.items()}
+
+# Function to check the MySQL database (a pool connection must answer a ping)
+def check_database():
+    details = {'pool_in_use': opus.get_mysql_pool_in_use()}
+    try:
+        connection = opus.get_mysql_connection()
+        try: connection.ping()
+        finally: connection.close()
+    except mysql.connector.Error as error: return False, dict(details, error=str(error))
+    return True, details
+
+# Function to register the health checks: the bot is alive while its threads run, and ready when it can deliver
+def register_health_checks(updater):
+    health_checks.add(health.LIVE, 'scheduler', lambda: (scheduler.running, {}))
+    health_checks.add(health.LIVE, 'updater', lambda: (updater.running, {}))
+    health_checks.add(health.LIVE, 'deliveries', lambda: (delivery_queue.thread.is_alive(), {'queued': len(delivery_queue)}))
+    health_checks.add(health.LIVE, 'message_queue', lambda: (
+        bot._msg_queue._all_delayq.is_alive() and bot._msg_queue._group_delayq.is_alive(), {},
+    ))
+    health_checks.add(health.READY, 'content', health.check_not_empty({
+        'images': lambda: opus.img_list,
+        'prayers': lambda: opus.prayers,
+        'aspirations': lambda: opus.aspirations,
+    }))
+    health_checks.add(health.READY, 'content_ages', health.check_ages(
+        lambda: {source: age for (source,), age in get_content_ages().items()}, health_max_content_ages,
+    ))
+    health_checks.add(health.READY, 'message_queue', health.check_limit('depth', bot.get_queue_depth, health_max_queue_depth))
+    health_checks.add(health.READY, 'scheduler', health.check_heartbeat(health_checks, 'dispatch_deliveries', health_max_scheduler_lag))
+    health_checks.add(health.READY, 'deliveries', health.check_limit(
+        'seconds_behind', lambda: round(delivery_queue.backlog_seconds(), 1), health_max_scheduler_lag,
+    ))
+    health_checks.add(health.READY, 'database', check_database)
+
+# Function to record the scheduler lateness and missed runs
+# The deliveries use a single job, so the job labels don't grow with the users
+def scheduler_listener(event):
+    if (event.code == EVENT_JOB_MISSED): metrics.SCHEDULER_MISSED.inc(event.job_id)
+    else:
+        for run_time in event.scheduled_run_times:
+            lateness = (datetime.now(timezone.utc) - run_time).total_seconds()
+            metrics.SCHEDULER_LATENESS.observe(max(0.0, lateness), event.job_id)
+
+# Function to create a subscription for a chat, keeping the time zone of its other services
+def new_subscription(chat_id, service_type):
+    subscriptions = wheel.for_chat(chat_id)
+    time_zone = subscriptions[0].time_zone if len(subscriptions) > 0 else default_time_zone
+    return delivery.Subscription(chat_id, service_type, time_zone)
+
+# Function to prepare the bulk requests of the services which are the same for every user, as
+# {service type: (prepared request, photo URL sent by URL)}; rendered once for the deliveries of a dispatch
+# Photos which must be uploaded (local or mirrored images) are sent by the bot until Telegram knows their file IDs
+def prepare_bulk_requests(service_types):
+    if (bulk_sender is None): return {}
+    prepared = {}
+    for service_type in set(service_types).intersection(bulk_services):
+        text, photo = service_renderers[service_type](None)
+        if (photo is None):
+            prepared[service_type] = bulk_sender.prepare('sendMessage', text=text, parse_mode='html', disable_web_page_preview=True), None
+        elif (photo in bot.photo_file_ids):
+            prepared[service_type] = bulk_sender.prepare('sendPhoto', photo=bot.photo_file_ids[photo], caption=text, parse_mode='html'), None
+        elif (not os.path.isfile(photo) and (media_mirror is None or media_mirror.get(photo) is None)):
+            prepared[service_type] = bulk_sender.prepare('sendPhoto', photo=photo, caption=text, parse_mode='html'), photo
+    return prepared
+
+# Function to record a scheduled delivery sent by the bulk sender
+def bulk_delivered(scheduled, photo_url, chat_id, result, error):
+    if (error is not None):
+        logger.warning('Falha ao enviar "%s" para %s: %s', scheduled.service_type, chat_id, error)
+        return
+    acknowledge_delivery(scheduled)
+    # Photos sent by URL are then reused by their file IDs
+    if (photo_url is not None and isinstance(result, dict) and len(result.get('photo') or []) > 0):
+        bot.photo_file_ids[photo_url] = result['photo'][-1]['file_id']
+
+# Function to deliver a service to a chat (on the deliveries queue thread)
+# Each delivery is checked against the slow log, since the queue thread isn't an instrumented job
+# Services with a prepared request (see 'prepare_bulk_requests') are handed to the bulk sender
+def deliver_service(chat_id, service_type, due_at=None, prepared=None):
+    start = time.perf_counter()
+    # The delivery is tagged with its intended fire time, checked against the Bot API acknowledgement
+    scheduled = slo.Delivery(service_type, chat_id, (due_at or datetime.now(timezone.utc)).timestamp())
+    delivery_slo.scheduled(scheduled)
+    if (prepared is not None and service_type in prepared):
+        request, photo_url = prepared[service_type]
+        bulk_sender.submit(request, chat_id, functools.partial(bulk_delivered, scheduled, photo_url))
+        return
+    token = slo.current.set(scheduled)
+    # Records logged while sending a service share a correlation ID (the same for the whole minute)
+    try:
+        with logs.correlated(f"delivery:{service_type}:{chat_id}:{datetime.now(timezone.utc):%Y%m%dT%H%M}"):
+            service_senders[service_type](chat_id=chat_id)
+    finally:
+        slo.current.reset(token)
+        profiling.check_slow('delivery', service_type, time.perf_counter() - start)
+
+# Function to send the services due on the current minute (runs every minute)
+def dispatch_deliveries():
+    health_checks.beat('dispatch_deliveries')
+    now = datetime.now(timezone.utc)
+    # The processed minutes are on the ledger, so a restart knows where to resume from
+    delivery_ledger.tick(now.timestamp())
+    deliveries = []
+    for due_at, chat_id, service_type, window in wheel.due(now):
+        # Services from users in digest mode wait for their next digest
+        if (service_type != 'resumo' and wheel.has(chat_id, 'resumo')):
+            digests.add(chat_id, service_type)
+        else: deliveries.append((due_at, chat_id, service_type, window))
+    # The services which are the same for every user are rendered once, for the bulk sender
+    prepared = prepare_bulk_requests(service_type for due_at, chat_id, service_type, window in deliveries)
+    delivery_queue.push(deliveries, functools.partial(deliver_service, prepared=prepared))
+
+# Function to get the deliveries missed while the bot was down, from the last processed minute (within the
+# grace window) up to the current one; the next wheel ticks continue from there
+# Slots already delivered (e.g.: before a crash in the middle of a minute) are skipped, so nothing is sent twice
+def get_missed_deliveries():
+    if (delivery_ledger.last_tick is None): return []
+    now = datetime.now(timezone.utc)
+    start = max(datetime.fromtimestamp(delivery_ledger.last_tick, timezone.utc), now - catch_up_grace)
+    deliveries = []
+    for due_at, chat_id, service_type, window in wheel.replay(start, now):
+        if (delivery_ledger.delivered(chat_id, service_type, due_at.timestamp())):
+            metrics.CATCH_UP.inc(service_type, 'skipped')
+            continue
+        metrics.CATCH_UP.inc(service_type, 'replayed')
+        # Services from users in digest mode wait for their next digest
+        if (service_type != 'resumo' and wheel.has(chat_id, 'resumo')): digests.add(chat_id, service_type)
+        else: deliveries.append((due_at, chat_id, service_type, window))
+    delivery_ledger.tick(now.timestamp())
+    if (len(deliveries) > 0):
+        logger.info('%d entregas perdidas desde %s serão reenviadas', len(deliveries), f"{start:%Y-%m-%d %H:%M} UTC",
+                    extra={'event': 'catch_up'})
+    return deliveries
+
+# Function to replay the missed deliveries at the catch-up rate (running on its own thread)
+def catch_up_deliveries(deliveries):
+    # The services which are the same for every user are rendered once, for the bulk sender
+    prepared = prepare_bulk_requests(service_type for due_at, chat_id, service_type, window in deliveries)
+    send = functools.partial(deliver_service, prepared=prepared)
+    sent = delivery.drain(deliveries, send, catch_up_rate_limit, lateness_stats)
+    logger.info('Entregas perdidas reenviadas: %d de %d', sent, len(deliveries), extra={'event': 'catch_up'})
+
+# Function to get the subscriptions from the saved services (unknown services are ignored)
+# Rows with an unknown time zone or invalid times (e.g.: edited by hand or imported) are skipped and logged
+def get_subscriptions(services_list):
+    for service in services_list:
+        if (service['service_type'] not in service_senders): continue
+        try:
+            yield delivery.Subscription(
+                service['chat_id'],
+                service['service_type'],
+                service['time_zone'] or default_time_zone,
+                service['delivery_times'],
+            )
+        except ValueError as error:
+            logger.warning('Serviço "%s" de %s ignorado: %s', service['service_type'], service['chat_id'], error,
+                           extra={'event': 'invalid_subscription'})
 
 # Function to schedule registered services when bot is started
 def schedule_services():
     # Loading saved services
     services_list = load_services()
     
-    # For each service, we'll schedule it
-    for service in services_list:
-        # Schedulling corresponding task
-        if service['service_type'] == 'santo':
-            scheduler.add_job(
-                send_saint, 'cron', hour="8", 
-                id=f"registra_santo_{service['chat_id']}",
-                kwargs={'chat_id': service['chat_id']},
-            )
-        elif service['service_type'] == 'jaculatoria':
-            scheduler.add_job(
-                send_aspiration, 'cron', hour="10,16,20", minute="30", 
-                id=f"registra_jaculatoria_{service['chat_id']}",
-                kwargs={'chat_id': service['chat_id']},
-            )
-        elif service['service_type'] == 'meditacao':
-            scheduler.add_job(
-                send_meditation, 'cron', hour="5", minute="5", 
-                id=f"registra_meditacao_{service['chat_id']}",
-                kwargs={'chat_id': service['chat_id']},
-            )
-        elif service['service_type'] == 'angelus_regina_caeli':
-            scheduler.add_job(
-                send_angelus_regina_caeli, 'cron', hour="12", 
-                id=f"registra_angelus_regina_caeli_{service['chat_id']}",
-                kwargs={'chat_id': service['chat_id']},
-            )
+    # Adding them to the timing wheel at once (no scheduler job is created)
+    wheel.add_many(get_subscriptions(services_list))
+
+# Function to reload the registered services from the database (e.g.: after an import), without restarting
+# Only the changed subscriptions are updated on the timing wheel; returns (added, removed), or None on errors
+def reload_services():
+    # If the database can't be read, the current subscriptions are kept
+    try: services_list = load_services(raise_errors=True)
+    except mysql.connector.Error: return None
+    added, removed = wheel.sync(get_subscriptions(services_list))
+    logger.info('Serviços recarregados: %d adicionados ou alterados, %d removidos, %d no total', added, removed, len(wheel),
+                extra={'event': 'services_reloaded'})
+    return added, removed
+
+# Function to reload the registered services on a SIGHUP (e.g.: sent by 'transfer.py import --reload-pid')
+# The signal handler runs on the main thread, so the reload runs on its own
+def reload_services_signal(signum, frame):
+    threading.Thread(target=instrument('reload_services', reload_services, kind='job'), name='reload-services', daemon=True).start()
 
 # Function to register a new user
 def register_user(chat_id, first_name, is_bot, last_name, language_code):
     # Inserting data
     try:
-        connection = mysql.connector.connect(**opus.get_mysql_connection_config_dict())
+        connection = opus.get_mysql_connection()
         # If no last name waas provided, we'll set as an empty string
         if (last_name is None): last_name = ''
         query = f"""
@@ -697,7 +1498,7 @@ def register_user(chat_id, first_name, is_bot, last_name, language_code):
     
     # If any error occurs
     except mysql.connector.Error as error:
-        print(f"There was an error while querying the MySQL server: {error}")
+        logger.error('Erro ao consultar o servidor MySQL: %s', error, extra={'event': 'mysql_error'})
     
     # In the end
     finally:
@@ -705,19 +1506,20 @@ def register_user(chat_id, first_name, is_bot, last_name, language_code):
         if (connection.is_connected()):
             cursor.close()
             connection.close()
-            print("Connection to MySQL server has been closed")
+            logger.debug('Conexão com o servidor MySQL encerrada', extra={'event': 'mysql_connection_closed'})
 
 # Function to register a service to an user
-def register_service(service_type, chat_id):
+def register_service(service_type, chat_id, time_zone):
     # Inserting data
     try:
-        connection = mysql.connector.connect(**opus.get_mysql_connection_config_dict())
+        connection = opus.get_mysql_connection()
         query = f"""
-        INSERT INTO user_services (chat_id, service_type)
-        VALUES ('{chat_id}', '{service_type}')
+        INSERT INTO user_services (chat_id, service_type, time_zone)
+        VALUES ('{chat_id}', '{service_type}', '{time_zone}')
         ON DUPLICATE KEY UPDATE
             `chat_id` = '{chat_id}',
-            `service_type` = '{service_type}';
+            `service_type` = '{service_type}',
+            `time_zone` = '{time_zone}';
         """
         
         # Executing query
@@ -728,7 +1530,7 @@ def register_service(service_type, chat_id):
     
     # If any error occurs
     except mysql.connector.Error as error:
-        print(f"There was an error while querying the MySQL server: {error}")
+        logger.error('Erro ao consultar o servidor MySQL: %s', error, extra={'event': 'mysql_error'})
     
     # In the end
     finally:
@@ -736,13 +1538,13 @@ def register_service(service_type, chat_id):
         if (connection.is_connected()):
             cursor.close()
             connection.close()
-            print("Connection to MySQL server has been closed")
+            logger.debug('Conexão com o servidor MySQL encerrada', extra={'event': 'mysql_connection_closed'})
 
 # Function to remove a service from an user
 def remove_service(service_type, chat_id):
     # Removing data
     try:
-        connection = mysql.connector.connect(**opus.get_mysql_connection_config_dict())
+        connection = opus.get_mysql_connection()
         query = f"""
         DELETE FROM user_services
     	WHERE chat_id = '{chat_id}' AND service_type = '{service_type}';
@@ -756,7 +1558,41 @@ def remove_service(service_type, chat_id):
     
     # If any error occurs
     except mysql.connector.Error as error:
-        print(f"There was an error while querying the MySQL server: {error}")
+        logger.error('Erro ao consultar o servidor MySQL: %s', error, extra={'event': 'mysql_error'})
+    
+    # In the end
+    finally:
+        # Close connection
+        if (connection.is_connected()):
+            cursor.close()
+            connection.close()
+            logger.debug('Conexão com o servidor MySQL encerrada', extra={'event': 'mysql_connection_closed'})
+
+# Function to update the delivery preferences of an user's services
+# If no service type is provided, the time zone is updated for all of them
+def update_services_delivery(chat_id, time_zone, service_type=None, delivery_times=None):
+    # Updating data
+    try:
+        connection = opus.get_mysql_connection()
+        if (service_type is None):
+            query = "UPDATE user_services SET time_zone = %s WHERE chat_id = %s;"
+            params = (time_zone, str(chat_id))
+        else:
+            query = """
+            UPDATE user_services SET time_zone = %s, delivery_times = %s
+            WHERE chat_id = %s AND service_type = %s;
+            """
+            params = (time_zone, delivery_times, str(chat_id), service_type)
+        
+        # Executing query
+        cursor = connection.cursor()
+        cursor.execute(query, params)
+        # Comitting query
+        connection.commit()
+    
+    # If any error occurs
+    except mysql.connector.Error as error:
+        logger.error('Erro ao consultar o servidor MySQL: %s', error, extra={'event': 'mysql_error'})
     
     # In the end
     finally:
@@ -764,17 +1600,18 @@ def remove_service(service_type, chat_id):
         if (connection.is_connected()):
             cursor.close()
             connection.close()
-            print("Connection to MySQL server has been closed")
+            logger.debug('Conexão com o servidor MySQL encerrada', extra={'event': 'mysql_connection_closed'})
 
 # Function to load registered services
-def load_services():
+# If 'raise_errors' is set, database errors are raised instead of returning the services read so far
+def load_services(raise_errors=False):
     # Creating services list
     services_list = []
 
     # Quering data
     try:
-        connection = mysql.connector.connect(**opus.get_mysql_connection_config_dict())
-        query = "SELECT * FROM user_services;"
+        connection = opus.get_mysql_connection()
+        query = "SELECT chat_id, service_type, time_zone, delivery_times FROM user_services;"
         
         # Executing query
         cursor = connection.cursor()
@@ -784,11 +1621,16 @@ def load_services():
             services_list.append({
                 "chat_id": row[0], 
                 "service_type": row[1], 
+                "time_zone": row[2],
+                "delivery_times": row[3],
             })
     
     # If any error occurs
     except mysql.connector.Error as error:
-        print(f"There was an error while querying the MySQL server: {error}")
+        logger.error('Erro ao consultar o servidor MySQL: %s', error, extra={'event': 'mysql_error'})
+        # Unknown column: the database was created before the time zones and must be upgraded
+        if (error.errno == 1054): logger.error('Atualize a tabela user_services com sql/upgrade_user_services.sql', extra={'event': 'mysql_error'})
+        if (raise_errors): raise
     
     # In the end
     finally:
@@ -796,11 +1638,76 @@ def load_services():
         if (connection.is_connected()):
             cursor.close()
             connection.close()
-            print("Connection to MySQL server has been closed")
+            logger.debug('Conexão com o servidor MySQL encerrada', extra={'event': 'mysql_connection_closed'})
     
     # Returning data
     return services_list
 
+# Function to load the users aspirations rotation state
+def load_rotations():
+    # Creating rows list
+    rows = []
+
+    # Quering data
+    try:
+        connection = opus.get_mysql_connection()
+        query = "SELECT chat_id, seed, position, bits FROM user_aspirations;"
+        
+        # Executing query
+        cursor = connection.cursor()
+        cursor.execute(query)
+        rows = cursor.fetchall()
+    
+    # If any error occurs
+    except mysql.connector.Error as error:
+        logger.error('Erro ao consultar o servidor MySQL: %s', error, extra={'event': 'mysql_error'})
+        # Unknown column: the table was created before the rotation bits and must be upgraded
+        if (error.errno == 1054): logger.error('Atualize a tabela user_aspirations com sql/upgrade_user_aspirations.sql', extra={'event': 'mysql_error'})
+    
+    # In the end
+    finally:
+        # Close connection
+        if (connection.is_connected()):
+            cursor.close()
+            connection.close()
+            logger.debug('Conexão com o servidor MySQL encerrada', extra={'event': 'mysql_connection_closed'})
+    
+    # Loading data
+    aspirations_rotation.load(rows)
+
+# Function to save the changed aspirations rotation states, with a single bulk query
+def save_rotations():
+    rows = aspirations_rotation.pop_dirty()
+    if (len(rows) == 0): return
+
+    # Saving data
+    try:
+        connection = opus.get_mysql_connection()
+        query = """
+        INSERT INTO user_aspirations (chat_id, seed, position, bits) VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE seed = VALUES(seed), position = VALUES(position), bits = VALUES(bits);
+        """
+        
+        # Executing query
+        cursor = connection.cursor()
+        cursor.executemany(query, [(str(chat_id), seed, position, bits) for chat_id, seed, position, bits in rows])
+        connection.commit()
+    
+    # If any error occurs, states are saved on the next time
+    except mysql.connector.Error as error:
+        aspirations_rotation.mark_dirty(chat_id for chat_id, seed, position, bits in rows)
+        logger.error('Erro ao consultar o servidor MySQL: %s', error, extra={'event': 'mysql_error'})
+        # Unknown column: the table was created before the rotation bits and must be upgraded
+        if (error.errno == 1054): logger.error('Atualize a tabela user_aspirations com sql/upgrade_user_aspirations.sql', extra={'event': 'mysql_error'})
+    
+    # In the end
+    finally:
+        # Close connection
+        if (connection.is_connected()):
+            cursor.close()
+            connection.close()
+            logger.debug('Conexão com o servidor MySQL encerrada', extra={'event': 'mysql_connection_closed'})
+
 # Function to load registered users
 def get_users():
     # Creating users list
@@ -808,7 +1715,7 @@ def get_users():
 
     # Quering data
     try:
-        connection = mysql.connector.connect(**opus.get_mysql_connection_config_dict())
+        connection = opus.get_mysql_connection()
         query = """
             SELECT chat_id, IF(last_name != "", CONCAT(first_name, " ", last_name), first_name) AS "name"
             FROM users
@@ -827,7 +1734,7 @@ def get_users():
     
     # If any error occurs
     except mysql.connector.Error as error:
-        print(f"There was an error while querying the MySQL server: {error}")
+        logger.error('Erro ao consultar o servidor MySQL: %s', error, extra={'event': 'mysql_error'})
     
     # In the end
     finally:
@@ -835,7 +1742,7 @@ def get_users():
         if (connection.is_connected()):
             cursor.close()
             connection.close()
-            print("Connection to MySQL server has been closed")
+            logger.debug('Conexão com o servidor MySQL encerrada', extra={'event': 'mysql_connection_closed'})
     
     # Returning data
     return users_list
@@ -846,7 +1753,7 @@ def get_user_services_count():
     user_services_count = {}
     # Connecting to the database
     try:
-        connection = mysql.connector.connect(**opus.get_mysql_connection_config_dict())
+        connection = opus.get_mysql_connection()
         # Creating query to get data
         query = """
             SELECT service_type AS 'service_code', COUNT(*) AS 'users_count'
@@ -862,7 +1769,7 @@ def get_user_services_count():
     
     # If any error occurs
     except mysql.connector.Error as error:
-        print(f"There was an error while querying the MySQL server: {error}")
+        logger.error('Erro ao consultar o servidor MySQL: %s', error, extra={'event': 'mysql_error'})
     
     # In the end
     finally:
@@ -870,87 +1777,91 @@ def get_user_services_count():
         if (connection.is_connected()):
             cursor.close()
             connection.close()
-            print("Connection to MySQL server has been closed")
+            logger.debug('Conexão com o servidor MySQL encerrada', extra={'event': 'mysql_connection_closed'})
     
     # Returning data
     return user_services_count
 
-# Main script function
-def main():
-    # Starting scheduled tasks
-    scheduler.start()
-    
-    # Getting saint of the day, daily meditation and current liturgical season
-    request_saint_of_the_day()
-    request_daily_meditation()
-    request_liturgical_season()
-    
-    # Defining daily tasks to request the Saint of the day, the daily meditation and liturgical season
-    scheduler.add_job(
-        request_saint_of_the_day,
-        'cron', hour="7", minute="50",
-        id='request_saint_of_the_day',
-    )
-    scheduler.add_job(
-        request_daily_meditation,
-        'cron', hour="4", minute="45",
-        id='request_daily_meditation',
-    )
-    scheduler.add_job(
-        request_liturgical_season,
-        'cron', hour="9", minute="15",
-        id='request_liturgical_season',
-    )
-    
-    # Scheduling services saved on database
-    schedule_services()
-    
-    # Global output limits (messages/ms): min - 30 messages/1000 ms
+# Function to create the bot and its messages queue
+# Global output limits (messages/ms): min - 30 messages/1000 ms
+def create_bot(burst_limit=30, time_limit_ms=1000):
     # Creating messages queue
-    q = messagequeue.MessageQueue(all_burst_limit=30, all_time_limit_ms=1000)
+    q = messagequeue.MessageQueue(all_burst_limit=burst_limit, all_time_limit_ms=time_limit_ms)
     
     # Setting bot's pool connections size (https://github.com/python-telegram-bot/python-telegram-bot/issues/787)
-    request = Request(con_pool_size=8)
+    # The fan-out traffic has its own pool, see 'create_bulk_sender'
+    request = Request(con_pool_size=bot_pool_size)
     
-    # Creating bot and messages queue
-    global bot
-    bot = MessageQueueBot(
+    # Creating bot with the messages queue
+    # A custom Bot API server may be set (e.g.: a local one, for the benchmarks)
+    return MessageQueueBot(
         token=os.getenv('TOKEN'), 
+        base_url=os.getenv('TELEGRAM_BASE_URL') or None,
         request=request, 
         mqueue=q
     )
-    
+
+# Function to create the bulk sender, with its own connections pool (None if disabled)
+# It shares the global token bucket with the bot, so both together stay below the Bot API limit
+# (the scheduled deliveries are also paced at their own rate, leaving room for the interactive commands)
+def create_bulk_sender():
+    if (bulk_pool_size <= 0): return None
+    return bulk.BulkSender(
+        os.getenv('TOKEN'),
+        base_url=os.getenv('TELEGRAM_BASE_URL') or None,
+        pool_size=bulk_pool_size,
+        limiter=send_limiter,
+    )
+
+# Function to create the updater and register all handlers on its dispatcher
+# 'workers' is the number of threads for asynchronous handlers
+def create_updater(bot, workers=4):
     # Creating updater from bot token and dispatcher to register handlers
     # 'use_context=True' allows new context based callbacks
-    updater = Updater(bot=bot, use_context=True)
+    updater = Updater(bot=bot, use_context=True, workers=workers)
     dp = updater.dispatcher
 
     # Adding handlers to the bot
-    dp.add_handler(CommandHandler("start", start))
-    dp.add_handler(CommandHandler("help", help))
-    dp.add_handler(CommandHandler("ajuda", help))
-    dp.add_handler(CommandHandler("contato", contact))
-    dp.add_handler(CommandHandler("terco", send_rosary))
-    dp.add_handler(CommandHandler("jaculatoria", send_aspiration))
-    dp.add_handler(CommandHandler("santo", send_saint))
-    dp.add_handler(CommandHandler("meditacao_diaria", send_meditation))
-    dp.add_handler(CommandHandler("angelus_regina_caeli", send_angelus_regina_caeli))
+    dp.add_handler(CommandHandler("start", instrument("start", start)))
+    dp.add_handler(CommandHandler("help", instrument("help", help)))
+    dp.add_handler(CommandHandler("ajuda", instrument("ajuda", help)))
+    dp.add_handler(CommandHandler("contato", instrument("contato", contact)))
+    dp.add_handler(CommandHandler("terco", instrument("terco", coalesced('terco', send_rosary))))
+    dp.add_handler(CommandHandler("jaculatoria", instrument("jaculatoria", send_aspiration)))
+    dp.add_handler(CommandHandler("santo", instrument("santo", send_saint)))
+    dp.add_handler(CommandHandler("meditacao_diaria", instrument("meditacao_diaria", send_meditation)))
+    dp.add_handler(CommandHandler("angelus_regina_caeli", instrument("angelus_regina_caeli", send_angelus_regina_caeli)))
+    dp.add_handler(CommandHandler("fuso_horario", instrument("fuso_horario", set_time_zone)))
+    dp.add_handler(CommandHandler("horario", instrument("horario", set_delivery_times)))
+    dp.add_handler(CommandHandler("resumo", instrument("resumo", toggle_digest)))
+    dp.add_handler(CommandHandler("buscar", instrument("buscar", search_content)))
+    # Search results buttons (before the conversations, which would take any button)
+    dp.add_handler(CallbackQueryHandler(instrument('send_search_result', send_search_result), pattern='^buscar:'))
+    dp.add_handler(CallbackQueryHandler(instrument('audio', send_audio), pattern='^audio:'))
+    dp.add_handler(InlineQueryHandler(instrument('inline', answer_inline_query)))
     # Admin handlers
-    dp.add_handler(CommandHandler("lista_usuarios", list_users))
-    dp.add_handler(CommandHandler("lista_servicos", list_services))
+    dp.add_handler(CommandHandler("lista_usuarios", instrument("lista_usuarios", list_users)))
+    dp.add_handler(CommandHandler("lista_servicos", instrument("lista_servicos", list_services)))
+    dp.add_handler(CommandHandler("slo", instrument("slo", show_slo)))
+    dp.add_handler(CommandHandler("memoria", instrument("memoria", show_memory)))
+    dp.add_handler(CommandHandler("recarregar_servicos", instrument("recarregar_servicos", reload_services_command)))
+    dp.add_handler(CommandHandler("atrasos", instrument("atrasos", list_lateness)))
+    dp.add_handler(CommandHandler("perfil", instrument("perfil", start_profiling)))
+    dp.add_handler(CommandHandler("lentos", instrument("lentos", list_slow_runs)))
+    dp.add_handler(CommandHandler("imagens", instrument("imagens", show_media_report)))
     
     # Conversation handlers for different services
     conv_handler = ConversationHandler(
         # Defining handlers entry points
-        entry_points=[CommandHandler('oracoes', show_prayers),
-                      CommandHandler('registrar_servicos', show_services),
-                      CommandHandler('rosario', show_rosary_mysteries)],
+        entry_points=[CommandHandler('oracoes', instrument('oracoes', show_prayers)),
+                      CommandHandler('registrar_servicos', instrument('registrar_servicos', show_services)),
+                      CommandHandler('rosario', instrument('rosario', show_rosary_mysteries))],
         # Defining handlers states
-        states={SERVICES: [CallbackQueryHandler(select_service)],
-                PRAYERS: [CallbackQueryHandler(send_prayer)],
-                MYSTERIES: [CallbackQueryHandler(send_rosary_mysteries)]},
+        states={SERVICES: [CallbackQueryHandler(instrument('select_service', select_service))],
+                PRAYERS: [CallbackQueryHandler(instrument('send_prayer', send_prayer))],
+                MYSTERIES: [CallbackQueryHandler(instrument('send_rosary_mysteries', coalesced('rosario', send_rosary_mysteries, variant=lambda update: update.callback_query.data)))]},
         # If user wants to cancel the conversation
-        fallbacks=[CommandHandler('cancel', cancel)]
+        fallbacks=[CommandHandler('cancel', instrument('cancel', cancel))]
     )
     # Adding conversation handler to the dispatcher
     dp.add_handler(conv_handler)
@@ -962,24 +1873,165 @@ def main():
         Filters.document | 
         Filters.sticker | 
         Filters.voice | 
+        Filters.video_note | 
         Filters.audio, 
-        file_handler
+        instrument('file_handler', file_handler)
     ))
     # For default text messages (no commands provided), we parse and return
     dp.add_handler(MessageHandler(
         Filters.text, 
-        parse_message
+        instrument('parse_message', parse_message)
     ))
 
     # Logging all errors
     dp.add_error_handler(error)
 
-    # Starting the bot
-    updater.start_polling()
+    return updater
+
+# Main script function
+def main():
+    timeline = warmup.timeline
+    timeline.record('imports', timeline.start)
+    
+    # Restoring the last-known content, so the bot can answer right away
+    with timeline.phase('snapshot'):
+        if (not restore_content_snapshot()): logger.info('Nenhum snapshot de conteúdo encontrado, aguardando o carregamento')
+    
+    # Scheduling services saved on database
+    with timeline.phase('schedule_services'): schedule_services()
+    with timeline.phase('load_rotations'): load_rotations()
+    # Missed deliveries are found before the scheduler starts, so the first wheel tick doesn't send them again
+    with timeline.phase('catch_up'):
+        delivery_ledger.load()
+        digests.load()
+        missed_deliveries = get_missed_deliveries()
+    
+    # Mirroring the bucket images, if enabled
+    global uploads, media_mirror
+    if (os.getenv('MEDIA_MIRROR_DIR')):
+        with timeline.phase('media_mirror'): media_mirror = media.Mirror(os.getenv('MEDIA_MIRROR_DIR'), download_file)
+    
+    # Audios of the content, if a synthesizer was set
+    global audio_cache
+    if (os.getenv('AUDIO_SYNTHESIZER')):
+        audio_cache = audio.AudioCache(
+            os.getenv('AUDIO_DIR', 'audio'),
+            audio.create_synthesizer(os.getenv('AUDIO_SYNTHESIZER'), os.getenv('AUDIO_VOICE')),
+        )
+    
+    # Saving the received files, if enabled
+    if (os.getenv('INGEST_UPLOADS', 'false').lower() == 'true'):
+        with timeline.phase('uploads'):
+            uploads = ingestion.Ingestion(
+                os.getenv('UPLOADS_DIR', 'uploads'), fetch_telegram_file,
+                quota_bytes=int(float(os.getenv('UPLOADS_QUOTA_MB', '1024')) * 1024 ** 2),
+                max_file_bytes=int(float(os.getenv('UPLOADS_MAX_FILE_MB', '20')) * 1024 ** 2),
+                workers=int(os.getenv('UPLOADS_WORKERS', '2')),
+            )
+    
+    # Starting scheduled tasks, recording their lateness and missed runs
+    scheduler.add_listener(scheduler_listener, EVENT_JOB_SUBMITTED | EVENT_JOB_MISSED)
+    scheduler.start()
+    delivery_queue.start()
+    
+    # Fetching the missing saint, meditation and liturgical calendar dates (with retries) every minute
+    # Failed dates are only retried after their backoff, so this is cheap when everything is there
+    # Deliveries only read the content store, so they never wait on these requests
+    scheduler.add_job(
+        instrument('refresh_content_store', content_store.refresh, kind='job'),
+        'interval', minutes=1,
+        id='refresh_content_store',
+        coalesce=True,
+    )
+    
+    # Loading again the images, prayers and aspirations which failed on startup (cheap when all of them loaded)
+    scheduler.add_job(
+        instrument('retry_content_sources', retry_content_sources, kind='job'),
+        'interval', minutes=1,
+        id='retry_content_sources',
+        coalesce=True,
+    )
+    
+    # Saving the users aspirations rotation states in bulk (only the changed ones)
+    scheduler.add_job(
+        instrument('save_rotations', save_rotations, kind='job'),
+        'interval', minutes=5,
+        id='save_rotations',
+        coalesce=True,
+    )
+    
+    # Synthesizing the new content audios off-peak
+    if (audio_cache is not None):
+        hour, minute = audio_precompute_time.split(':')
+        scheduler.add_job(
+            instrument('precompute_audio', precompute_audio, kind='job'),
+            'cron', hour=int(hour), minute=int(minute),
+            id='precompute_audio',
+            coalesce=True,
+        )
+    
+    # Sending the daily scheduled deliveries SLO report to the admin
+    hour, minute = slo_report_time.split(':')
+    scheduler.add_job(
+        instrument('send_slo_report', send_slo_report, kind='job'),
+        'cron', hour=int(hour), minute=int(minute),
+        id='send_slo_report',
+        coalesce=True,
+    )
+    
+    # A single job checks the timing wheel every minute, whatever the number of users
+    scheduler.add_job(
+        dispatch_deliveries,
+        'cron', second="0",
+        id='dispatch_deliveries',
+        coalesce=True,
+    )
+    
+    # Creating bot and messages queue
+    global bot, bulk_sender
+    bot = create_bot()
+    bulk_sender = create_bulk_sender()
+    
+    # Exporting the metrics, if a port was defined
+    metrics.QUEUE_DEPTH.function = bot.get_queue_depth
+    metrics.CONTENT_AGE.function = get_content_ages
+    # Liveness and readiness are served along with the metrics
+    metrics.routes['/healthz'] = lambda: health_checks.route(health.LIVE)
+    metrics.routes['/readyz'] = lambda: health_checks.route(health.READY)
+    if (os.getenv('METRICS_PORT')):
+        metrics.start_server(int(os.getenv('METRICS_PORT')), os.getenv('METRICS_HOST', '127.0.0.1'))
+    
+    # Creating updater with all handlers and starting the bot
+    # 'start_polling()' is non-blocking, so the content is loaded while the bot already answers
+    with timeline.phase('start_polling'):
+        updater = create_updater(bot)
+        updater.start_polling()
+    timeline.mark('serving')
+    register_health_checks(updater)
+    # Under a 'Type=notify' systemd unit, the bot is started once it answers, and then watched
+    health.notify('READY=1')
+    health.start_watchdog(health_checks, health_unready_grace)
+    
+    # Getting images, prayers, aspirations, saint of the day, daily meditation and liturgical season
+    threading.Thread(target=warm_up_content, name='warm-up', daemon=True).start()
+    # Replaying the deliveries missed while the bot was down
+    if (len(missed_deliveries) > 0):
+        threading.Thread(target=catch_up_deliveries, args=(missed_deliveries,), name='catch-up', daemon=True).start()
+
+    # Reloading the registered services on a SIGHUP (not available on Windows)
+    if (hasattr(signal, 'SIGHUP')): signal.signal(signal.SIGHUP, reload_services_signal)
 
     # Running bot until it receives a 'Ctrl+C' command or a signal like 'SIGINT', 'SIGTERM' or 'SIGABRT'
-    # 'start_polling()' is non-blocking, so we use it
     updater.idle()
+    health.notify('STOPPING=1')
+    
+    # Saving the last aspirations rotation states
+    save_rotations()
+    delivery_queue.stop()
+    if (bulk_sender is not None): bulk_sender.shutdown()
+    delivery_ledger.close()
+    # Finishing the received files downloads
+    if (uploads is not None): uploads.shutdown()
 
 # Executing main script
 if __name__ == '__main__':
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 09:00:00 2026
+
+@author: Renato Henz
+
+Full-text search over the bot content: accent and case folding, light Portuguese
+stemming and BM25 ranking on an inverted index
+
+"""
+
+# Main dependencies
+import heapq, math, re, threading, unicodedata
+from html import unescape
+
+# Common Portuguese words, ignored on both documents and queries (already folded)
+STOPWORDS = frozenset('''
+a ao aos as com como da das de dela delas dele deles do dos e ela elas ele eles em entre era essa essas
+esse esses esta estas este estes eu foi ha isso isto ja lhe lhes mais mas me mesmo meu meus minha minhas
+na nao nas nem no nos num numa o os ou para pela pelas pelo pelos por qual quando que quem se sem seu
+seus so sua suas tambem te teu teus tu tua tuas um uma voce vos
+'''.split())
+
+# Plural endings and their replacements, checked in order
+PLURAL_RULES = (('oes', 'ao'), ('aes', 'ao'), ('ais', 'al'), ('eis', 'el'), ('ois', 'ol'), ('ns', 'm'),
+                ('res', 'r'), ('zes', 'z'), ('les', 'l'), ('s', ''))
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Title words count as many times as this on the index
+TITLE_WEIGHT = 2
+
+# Function to fold the accents and case of a text, keeping its length (so positions match the original)
+def fold(text):
+    return ''.join(unicodedata.normalize('NFKD', char)[0] for char in text).lower()
+
+# Function to remove the HTML tags from a text
+def strip_html(text):
+    return unescape(re.sub(r'<[^>]+>', '', text))
+
+# Function to reduce a folded word to its stem: plural, adverbs and the final vowel (gender) are removed
+# It's a light stemmer, only meant to match the common variations of a word
+def stem(word):
+    if (len(word) > 3):
+        for ending, replacement in PLURAL_RULES:
+            if word.endswith(ending) and len(word) - len(ending) >= 2:
+                word = word[:len(word) - len(ending)] + replacement
+                break
+    if (len(word) > 7 and word.endswith('mente')): word = word[:-5]
+    if (len(word) > 4 and word[-1] in 'aoe'): word = word[:-1]
+    return word
+
+# Function to get the index terms of a text
+def terms(text):
+    return [stem(word) for word in re.findall(r'\w+', fold(text)) if word not in STOPWORDS]
+
+# Inverted index with BM25 ranking
+# Documents are given as {document ID: (title, text)}, and 'update' only reindexes the changed ones
+class SearchIndex():
+    # Init func
+    def __init__(self):
+        # Postings as {term: {document ID: term frequency}}
+        self.postings = {}
+        # Documents as {document ID: (title, text, plain text)} and their terms frequencies
+        self.documents = {}
+        self.frequencies = {}
+        self.lengths = {}
+        self.total_length = 0
+        # BM25 weight of each term on each document, computed when the index changes,
+        # so queries only have to add them up
+        self.weights = {}
+        self.lock = threading.Lock()
+
+    # Number of documents
+    def __len__(self):
+        return len(self.documents)
+
+    # Updating the index with the current documents, returning the number of (re)indexed ones
+    def update(self, documents):
+        with self.lock:
+            removed = [doc_id for doc_id in self.documents if doc_id not in documents]
+            for doc_id in removed: self._remove(doc_id)
+            changed = 0
+            for doc_id, (title, text) in documents.items():
+                current = self.documents.get(doc_id)
+                if (current is not None and current[:2] == (title, text)): continue
+                if (current is not None): self._remove(doc_id)
+                self._add(doc_id, title, text)
+                changed += 1
+            if (changed > 0 or len(removed) > 0): self._compute_weights()
+            return changed
+
+    # Adding a document (the lock must be held by the caller)
+    def _add(self, doc_id, title, text):
+        plain = strip_html(text)
+        frequencies = {}
+        for term in terms(title) * TITLE_WEIGHT + terms(plain):
+            frequencies[term] = frequencies.get(term, 0) + 1
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+        self.documents[doc_id] = (title, text, plain)
+        self.frequencies[doc_id] = frequencies
+        self.lengths[doc_id] = sum(frequencies.values())
+        self.total_length += self.lengths[doc_id]
+
+    # Removing a document (the lock must be held by the caller)
+    def _remove(self, doc_id):
+        for term in self.frequencies.pop(doc_id):
+            postings = self.postings[term]
+            del postings[doc_id]
+            if (len(postings) == 0): del self.postings[term]
+        self.total_length -= self.lengths.pop(doc_id)
+        del self.documents[doc_id]
+
+    # Computing the BM25 weights (the lock must be held by the caller)
+    def _compute_weights(self):
+        total = len(self.documents)
+        average = self.total_length / total if total > 0 else 1
+        norms = {doc_id: K1 * (1 - B + B * length / average) for doc_id, length in self.lengths.items()}
+        weights = {}
+        for term, postings in self.postings.items():
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            weights[term] = {doc_id: idf * frequency * (K1 + 1) / (frequency + norms[doc_id])
+                             for doc_id, frequency in postings.items()}
+        # Replaced at once, since the queries don't take the lock
+        self.weights = weights
+
+    # Searching the index, returning the best documents as (score, document ID)
+    def search(self, query, limit=5):
+        weights = self.weights
+        matches = [weights[term] for term in set(terms(query)) if term in weights]
+        if (len(matches) == 0): return []
+        # A single term already has its scores
+        if (len(matches) == 1): scores = matches[0]
+        else:
+            scores = dict(matches[0])
+            for term_weights in matches[1:]:
+                for doc_id, weight in term_weights.items(): scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        return heapq.nlargest(limit, zip(scores.values(), scores.keys()))
+
+    # Getting a document title and text
+    def get(self, doc_id):
+        with self.lock:
+            document = self.documents.get(doc_id)
+        return None if document is None else document[:2]
+
+    # Getting a short excerpt of a document around the first word of the query found on it
+    def snippet(self, doc_id, query, size=120):
+        with self.lock: plain = self.documents[doc_id][2]
+        folded = fold(plain)
+        positions = [match.start() for word in re.findall(r'\w+', fold(query)) if word not in STOPWORDS
+                     for match in [re.search(r'\b' + re.escape(stem(word)), folded)] if match]
+        start = max(0, min(positions) - size // 3) if len(positions) > 0 else 0
+        excerpt = ' '.join(plain[start:start + size].split())
+        return ('…' if start > 0 else '') + excerpt + ('…' if start + size < len(plain) else '')
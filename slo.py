@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 09:00:00 2026
+
+@author: Renato Henz
+
+End-to-end lateness of the scheduled deliveries (from the intended fire time to the
+Bot API acknowledgement) and their service level objectives, kept in a compact ring
+of hourly histograms for each service
+
+"""
+
+# Main dependencies
+import contextvars, threading, time
+from array import array
+from bisect import bisect_left
+
+# Histogram buckets upper bounds (seconds): log-spaced from 50 ms to over a day, so percentiles are
+# known within the bucket ratio (50%) with only a few dozen counters for each hour
+BOUNDS = tuple(0.05 * 1.5 ** index for index in range(37))
+
+# Scheduled delivery being sent by the current thread, tagged with its intended fire time
+current = contextvars.ContextVar('delivery', default=None)
+
+# Tag of a scheduled delivery; the first Bot API acknowledgement sets its lateness
+class Delivery():
+    __slots__ = ('service_type', 'chat_id', 'due_at', 'acked_at')
+
+    # Init func
+    def __init__(self, service_type, chat_id, due_at):
+        self.service_type = service_type
+        self.chat_id = chat_id
+        # Intended fire time (timestamp)
+        self.due_at = due_at
+        self.acked_at = None
+
+# Lateness histograms of each service, as a ring of time slots (one hour each, by default)
+# Each slot keeps the scheduled, acknowledged and within target counts, and the buckets counts
+class LatenessRing():
+    # Init func
+    def __init__(self, slots=24, slot_seconds=3600, bounds=BOUNDS):
+        self.slots = slots
+        self.slot_seconds = slot_seconds
+        self.bounds = bounds
+        # For each service: slots starts, and counts as [scheduled, acknowledged, within target, buckets...]
+        self.services = {}
+        self.lock = threading.Lock()
+
+    # Counts of the current slot of a service (the lock must be held by the caller)
+    def _slot(self, service_type, now):
+        start = int(now // self.slot_seconds)
+        ring = self.services.get(service_type)
+        if (ring is None):
+            ring = self.services[service_type] = (array('q', [-1] * self.slots), [None] * self.slots)
+        starts, counts = ring
+        index = start % self.slots
+        # Slots from a previous lap of the ring are cleared
+        if (starts[index] != start):
+            starts[index] = start
+            counts[index] = array('I', [0] * (len(self.bounds) + 4))
+        return counts[index]
+
+    # Recording a scheduled delivery
+    def scheduled(self, service_type, now=None):
+        with self.lock: self._slot(service_type, time.time() if now is None else now)[0] += 1
+
+    # Recording an acknowledged delivery and its lateness (seconds)
+    def acknowledged(self, service_type, lateness, within, now=None):
+        with self.lock:
+            counts = self._slot(service_type, time.time() if now is None else now)
+            counts[1] += 1
+            if (within): counts[2] += 1
+            counts[3 + bisect_left(self.bounds, lateness)] += 1
+
+    # Merged counts of each service over the last hours
+    def merged(self, hours=24, now=None):
+        now = time.time() if now is None else now
+        oldest = int(now // self.slot_seconds) - int(hours * 3600 // self.slot_seconds) + 1
+        merged = {}
+        with self.lock:
+            for service_type, (starts, counts) in self.services.items():
+                total = array('I', [0] * (len(self.bounds) + 4))
+                for index, start in enumerate(starts):
+                    if (start < oldest): continue
+                    for position, count in enumerate(counts[index]): total[position] += count
+                merged[service_type] = total
+        return merged
+
+    # Lateness percentile from merged counts (the upper bound of its bucket, None if there are no counts)
+    def percentile(self, counts, fraction):
+        if (counts[1] == 0): return None
+        threshold, cumulative = fraction * counts[1], 0
+        for position, count in enumerate(counts[3:]):
+            cumulative += count
+            if (cumulative >= threshold): return self.bounds[position] if position < len(self.bounds) else float('inf')
+        return float('inf')
+
+# Service level objectives of the scheduled deliveries: each service must be acknowledged
+# within its target lateness (seconds)
+class DeliverySLO():
+    # Init func
+    def __init__(self, targets=None, default_target=60, objective=0.99, ring=None):
+        self.targets = dict(targets or {})
+        self.default_target = default_target
+        # Fraction of the deliveries which must be within the target
+        self.objective = objective
+        self.ring = ring or LatenessRing()
+
+    # Target lateness of a service
+    def target(self, service_type):
+        return self.targets.get(service_type, self.default_target)
+
+    # Recording a delivery about to be sent
+    def scheduled(self, delivery):
+        self.ring.scheduled(delivery.service_type)
+
+    # Recording a Bot API acknowledgement, returning the lateness if it was the delivery's first one
+    def acknowledged(self, delivery, acked_at=None):
+        if (delivery.acked_at is not None): return None
+        delivery.acked_at = time.time() if acked_at is None else acked_at
+        lateness = max(0.0, delivery.acked_at - delivery.due_at)
+        self.ring.acknowledged(delivery.service_type, lateness, lateness <= self.target(delivery.service_type))
+        return lateness
+
+    # Summary of each service over the last hours
+    def summary(self, hours=24, now=None):
+        summary = {}
+        for service_type, counts in sorted(self.ring.merged(hours, now).items()):
+            if (counts[0] == 0 and counts[1] == 0): continue
+            summary[service_type] = {
+                'scheduled': counts[0],
+                'acknowledged': counts[1],
+                'within_target': counts[2],
+                'target': self.target(service_type),
+                # Deliveries not acknowledged (failed) count as outside the target
+                'ratio': counts[2] / max(counts[0], counts[1]) if max(counts[0], counts[1]) > 0 else 1.0,
+                'p50': self.ring.percentile(counts, 0.50),
+                'p95': self.ring.percentile(counts, 0.95),
+                'p99': self.ring.percentile(counts, 0.99),
+            }
+        return summary
+
+# Function to format a lateness (seconds) for the report
+def format_seconds(value):
+    if (value is None): return '-'
+    if (value == float('inf')): return '> 1 dia'
+    if (value < 60): return f"{value:.1f} s"
+    if (value < 3600): return f"{value / 60:.1f} min"
+    return f"{value / 3600:.1f} h"
+
+# Function to format the SLO report (HTML)
+def report(summary, objective, hours=24):
+    lines = [f"<b>SLO das entregas agendadas (últimas {hours} h)</b>", '',
+             '<b>Serviço</b>: agendados, confirmados, p50/p95/p99, dentro da meta']
+    for service_type, stats in summary.items():
+        status = '✅' if stats['ratio'] >= objective else '❌'
+        lines.append(
+            f"<b>{service_type}</b>: {stats['scheduled']}, {stats['acknowledged']}, "
+            f"{format_seconds(stats['p50'])}/{format_seconds(stats['p95'])}/{format_seconds(stats['p99'])}, "
+            f"{stats['ratio']:.2%} em até {format_seconds(stats['target'])} {status}"
+        )
+    if (len(summary) == 0): lines.append('\nNenhuma entrega agendada no período.')
+    lines.append(f"\nObjetivo: {objective:.2%} das entregas dentro da meta de cada serviço.")
+    return '\n'.join(lines)
@@ -20,5 +20,15 @@ CREATE TABLE `users` (
 CREATE TABLE `user_services` (
 	chat_id varchar(45) NOT NULL,
 	service_type varchar(64) NOT NULL,
+	time_zone varchar(64) NOT NULL DEFAULT 'America/Sao_Paulo' COMMENT 'E.g.: ''America/Sao_Paulo'', ''Europe/Lisbon''',
+	delivery_times varchar(64) DEFAULT NULL COMMENT 'E.g.: ''08:00'', ''10:30,16:30,20:30''',
 	CONSTRAINT user_services_pk PRIMARY KEY (chat_id,service_type)
 ) ENGINE=InnoDB;
+
+CREATE TABLE `user_aspirations` (
+	chat_id varchar(45) NOT NULL,
+	seed int unsigned NOT NULL COMMENT 'Seed of the user aspirations permutation',
+	position int unsigned NOT NULL COMMENT 'Next position on the permutation',
+	bits tinyint unsigned NOT NULL DEFAULT 0 COMMENT 'Bits of the IDs space of the current cycle (0: the current one)',
+	CONSTRAINT user_aspirations_pk PRIMARY KEY (chat_id)
+) ENGINE=InnoDB;
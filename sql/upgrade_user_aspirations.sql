@@ -0,0 +1,4 @@
+-- Upgrade of databases created before the aspirations rotation kept the IDs space of each user's cycle
+-- Without this column the bot can't load nor save the rotation states (run it once, before starting the new version)
+ALTER TABLE `user_aspirations`
+	ADD COLUMN bits tinyint unsigned NOT NULL DEFAULT 0 COMMENT 'Bits of the IDs space of the current cycle (0: the current one)';
@@ -0,0 +1,5 @@
+-- Upgrade of databases created before the services time zones and delivery times were introduced
+-- Without these columns the bot can't load the registered services (run it once, before starting the new version)
+ALTER TABLE `user_services`
+	ADD COLUMN time_zone varchar(64) NOT NULL DEFAULT 'America/Sao_Paulo' COMMENT 'E.g.: ''America/Sao_Paulo'', ''Europe/Lisbon''',
+	ADD COLUMN delivery_times varchar(64) DEFAULT NULL COMMENT 'E.g.: ''08:00'', ''10:30,16:30,20:30''';
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 09:00:00 2026
+
+@author: Renato Henz
+
+Users and subscriptions import/export: the 'users' and 'user_services' tables are streamed
+to (and from) JSONL or CSV files in constant memory. Imports are written with batched
+multi-row upserts and can be resumed from their last checkpoint
+
+    python transfer.py export user_services services.jsonl
+    python transfer.py import user_services services.jsonl --reload-pid 1234
+
+"""
+
+# Main dependencies
+import argparse, csv, json, logging, os, signal, time
+
+# Time zones and delivery times validation
+import delivery
+
+logger = logging.getLogger(__name__)
+
+# Function to validate a 'user_services' row, raising a ValueError for unknown time zones or invalid times
+# (the bot would skip them when loading the services)
+def validate_service(row):
+    chat_id, service_type, time_zone, delivery_times = row
+    delivery.get_time_zone(time_zone or '')
+    if (delivery_times): delivery.parse_times(delivery_times)
+
+# Exported tables: columns, primary (or unique) key, the columns which may be NULL and the rows validation (if any)
+TABLES = {
+    'users': {
+        'columns': ('chat_id', 'first_name', 'is_bot', 'last_name', 'language_code', 'phone_number'),
+        'key': ('chat_id',),
+        'nullable': ('last_name', 'language_code', 'phone_number'),
+    },
+    'user_services': {
+        'columns': ('chat_id', 'service_type', 'time_zone', 'delivery_times'),
+        'key': ('chat_id', 'service_type'),
+        'nullable': ('delivery_times',),
+        'validate': validate_service,
+    },
+}
+
+# File formats
+FORMATS = ('jsonl', 'csv')
+
+# Function to get a file format from its extension
+def get_format(path):
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    if (extension not in FORMATS): raise ValueError(f"Unknown file format: {path} (use {', '.join(FORMATS)})")
+    return extension
+
+# Function to get the table spec
+def get_table(table):
+    if (table not in TABLES): raise ValueError(f"Unknown table: {table} (use {', '.join(TABLES)})")
+    return TABLES[table]
+
+# Function to export a table to a JSONL or CSV file, fetching the rows in batches, returning the exported rows
+# 'connect' must return a MySQL connection (its default cursor is unbuffered, so the rows are streamed)
+def export_table(connect, table, path, batch_size=10000):
+    spec, file_format = get_table(table), get_format(path)
+    columns = spec['columns']
+    connection = connect()
+    tmp_path, count = path + '.tmp', 0
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT {', '.join(columns)} FROM {table};")
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file) if file_format == 'csv' else None
+            if (writer is not None): writer.writerow(columns)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if (len(rows) == 0): break
+                if (writer is not None): writer.writerows(rows)
+                else: file.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in rows)
+                count += len(rows)
+        cursor.close()
+        # Only complete exports replace the file
+        os.replace(tmp_path, path)
+    finally:
+        if (os.path.exists(tmp_path)): os.remove(tmp_path)
+        if (connection.is_connected()): connection.close()
+    return count
+
+# Function to read the records from a JSONL or CSV file, starting at a byte offset
+# Yields (values tuple, offset after the record), so the offset can be saved on the checkpoints
+def read_records(path, table, offset=0):
+    spec, file_format = get_table(table), get_format(path)
+    columns, nullable = spec['columns'], set(spec['nullable'])
+    with open(path, 'rb') as file:
+        lines = iter(file.readline, b'')
+        # CSV files: the header gives the columns order
+        if (file_format == 'csv'):
+            reader = csv.reader(line.decode('utf-8') for line in lines)
+            header = next(reader, None)
+            if (header is None): return
+            missing = set(columns) - set(header)
+            if (len(missing) > 0): raise ValueError(f"Missing columns on {path}: {', '.join(sorted(missing))}")
+            positions = [header.index(column) for column in columns]
+            if (offset > 0): file.seek(offset)
+            for fields in reader:
+                if (len(fields) == 0): continue
+                # Empty fields are NULL on the nullable columns
+                yield tuple(
+                    None if (fields[position] == '' and column in nullable) else fields[position]
+                    for column, position in zip(columns, positions)
+                ), file.tell()
+        else:
+            if (offset > 0): file.seek(offset)
+            for line in lines:
+                if (line.strip() == b''): continue
+                record = json.loads(line)
+                yield tuple(record.get(column) for column in columns), file.tell()
+
+# Function to get the multi-row upsert query for a batch of rows
+def get_upsert_query(table, rows):
+    spec = get_table(table)
+    columns = spec['columns']
+    placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    updates = ', '.join(f"{column} = VALUES({column})" for column in columns if column not in spec['key'])
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([placeholders] * rows)} "
+        f"ON DUPLICATE KEY UPDATE {updates};"
+    )
+
+# Function to load an import checkpoint (None if there is none, or if it's from another file)
+def load_checkpoint(path, table):
+    checkpoint_path = path + '.checkpoint'
+    if (not os.path.exists(checkpoint_path)): return None
+    with open(checkpoint_path, encoding='utf-8') as file: checkpoint = json.load(file)
+    # A changed file can't be resumed
+    if (checkpoint.get('table') != table or checkpoint.get('size') != os.path.getsize(path)):
+        logger.warning('Checkpoint de %s ignorado: o arquivo ou a tabela mudaram', path)
+        return None
+    return checkpoint
+
+# Function to save an import checkpoint (atomically, so a crash never leaves a broken one)
+def save_checkpoint(path, checkpoint):
+    tmp_path = path + '.checkpoint.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file: json.dump(checkpoint, file)
+    os.replace(tmp_path, path + '.checkpoint')
+
+# Function to import a JSONL or CSV file into a table, with multi-row upserts of 'batch_size' rows
+# Each committed batch is saved on a checkpoint ('<file>.checkpoint'), so a failed import resumes from there
+# (unless 'restart' is set); the checkpoint is removed when the import ends. Returns the imported rows
+# Invalid rows (see the table 'validate') are skipped and logged
+def import_table(connect, table, path, batch_size=1000, restart=False):
+    validate = get_table(table).get('validate')
+    checkpoint = None if restart else load_checkpoint(path, table)
+    offset, count = (checkpoint['offset'], checkpoint['rows']) if checkpoint else (0, 0)
+    if (checkpoint): logger.info('Retomando a importação de %s a partir da linha %d', path, count)
+    size = os.path.getsize(path)
+    connection = connect()
+    try:
+        cursor = connection.cursor()
+        batch = []
+        # Function to write a batch and save its checkpoint
+        def flush(end):
+            cursor.execute(get_upsert_query(table, len(batch)), [value for row in batch for value in row])
+            connection.commit()
+            save_checkpoint(path, {'table': table, 'size': size, 'offset': end, 'rows': count})
+            batch.clear()
+        end, skipped = offset, 0
+        for row, end in read_records(path, table, offset):
+            if (validate is not None):
+                try: validate(row)
+                except ValueError as error:
+                    skipped += 1
+                    logger.warning('Linha ignorada (%s): %s', error, row)
+                    continue
+            batch.append(row)
+            count += 1
+            if (len(batch) >= batch_size): flush(end)
+        if (len(batch) > 0): flush(end)
+        cursor.close()
+        if (skipped > 0): logger.warning('%d linhas inválidas ignoradas na importação de %s', skipped, path)
+    finally:
+        if (connection.is_connected()): connection.close()
+    if (os.path.exists(path + '.checkpoint')): os.remove(path + '.checkpoint')
+    return count
+
+# Function to parse the command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description='Users and subscriptions import/export (JSONL or CSV)')
+    parser.add_argument('command', choices=('export', 'import'))
+    parser.add_argument('table', choices=tuple(TABLES))
+    parser.add_argument('path', help='File (.jsonl or .csv)')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows on each upsert (import) or fetch (export)')
+    parser.add_argument('--restart', action='store_true', help='Ignore the last checkpoint and import the whole file')
+    parser.add_argument('--reload-pid', type=int, help="Bot process ID, which reloads the services after the import (SIGHUP)")
+    return parser.parse_args()
+
+# Main script function
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # Only imported here, so the library functions don't need the bot settings
+    import opus
+    start = time.perf_counter()
+    if (args.command == 'export'):
+        count = export_table(opus.get_mysql_connection, args.table, args.path, max(args.batch_size, 1000))
+    else:
+        count = import_table(opus.get_mysql_connection, args.table, args.path, args.batch_size, args.restart)
+        # The running bot rebuilds its timing wheel from the database
+        if (args.reload_pid and args.table == 'user_services'): os.kill(args.reload_pid, signal.SIGHUP)
+    logger.info('%d linhas (%s %s) em %.1f s', count, args.command, args.table, time.perf_counter() - start)
+
+# Executing main script
+if __name__ == '__main__':
+    main()
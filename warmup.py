@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 09:00:00 2026
+
+@author: Renato Henz
+
+Startup warm-up: concurrent content loads with timeouts, last-known content
+snapshot and startup timeline
+
+"""
+
+# Main dependencies
+import json, logging, os, random, threading, time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Reference for the startup timeline (this module is imported before the others)
+started_at = time.monotonic()
+
+# Startup timeline, with the phases (and warm-up sources) and how long they took
+class Timeline():
+    # Init func
+    def __init__(self, start=None):
+        self.start = started_at if start is None else start
+        # Phases as (name, start, end, status)
+        self.phases = []
+        self.lock = threading.Lock()
+
+    # Recording a phase
+    def record(self, name, start, end=None, status='ok'):
+        with self.lock:
+            self.phases.append((name, start, time.monotonic() if end is None else end, status))
+
+    # Recording a point in time (e.g.: when the bot started answering)
+    def mark(self, name):
+        now = time.monotonic()
+        self.record(name, now, now, 'marco')
+
+    # Context to record a block as a phase
+    @contextmanager
+    def phase(self, name):
+        start = time.monotonic()
+        try: yield
+        except Exception:
+            self.record(name, start, status='erro')
+            raise
+        self.record(name, start)
+
+    # Seconds elapsed from the startup until a phase ended (None if it wasn't recorded)
+    def elapsed(self, name):
+        with self.lock:
+            ends = [end for phase, start, end, status in self.phases if phase == name]
+        return ends[-1] - self.start if len(ends) > 0 else None
+
+    # Phases as a dict, for the benchmarks
+    def as_dict(self):
+        with self.lock:
+            return {name: {'start_s': round(start - self.start, 4), 'duration_s': round(end - start, 4), 'status': status}
+                    for name, start, end, status in self.phases}
+
+    # Text report, sorted by start time
+    def report(self):
+        with self.lock: phases = sorted(self.phases, key=lambda phase: phase[1])
+        lines = ['Linha do tempo da inicialização:']
+        for name, start, end, status in phases:
+            lines.append(f"  +{start - self.start:7.3f} s  {name:<22} {end - start:7.3f} s  ({status})")
+        return '\n'.join(lines)
+
+# Startup timeline for the running bot
+timeline = Timeline()
+
+# Sources to be loaded again after failing, with exponential backoff (with jitter, so failing backends aren't
+# hammered), until each one loads; as {name: (attempts, next attempt timestamp)}
+# Only the given sources are retried (e.g.: the content store ones are already retried by the store itself)
+class Retries():
+    # Init func
+    def __init__(self, names, retry_base=60, retry_max=3600):
+        self.names = set(names)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    # Scheduling the next attempt of a failed source, returning its delay (seconds, None if it isn't retried)
+    def failed(self, name):
+        if (name not in self.names): return None
+        with self.lock:
+            attempts = self.pending.get(name, (0, 0))[0] + 1
+            delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+            self.pending[name] = (attempts, time.time() + delay)
+        return delay
+
+    # Forgetting a source which loaded
+    def succeeded(self, name):
+        with self.lock: self.pending.pop(name, None)
+
+    # Sources whose next attempt has come
+    def due(self):
+        now = time.time()
+        with self.lock: return [name for name, (attempts, next_attempt) in self.pending.items() if next_attempt <= now]
+
+# Function to load a source, recording it on the timeline (if given)
+# Failed sources are scheduled on 'retries' (if given), see 'retry'
+def load_source(name, function, on_loaded, timeline, retries=None):
+    start = time.monotonic()
+    try: function()
+    except Exception as error:
+        if (timeline is not None): timeline.record(f"warm-up: {name}", start, status='erro')
+        delay = retries.failed(name) if retries is not None else None
+        if (delay is None): logger.warning('Falha ao carregar "%s": %s', name, error)
+        else: logger.warning('Falha ao carregar "%s" (nova tentativa em %.0f s): %s', name, delay, error)
+        return False
+    if (timeline is not None): timeline.record(f"warm-up: {name}", start)
+    if (retries is not None): retries.succeeded(name)
+    on_loaded(name)
+    return True
+
+# Function to load the content sources concurrently, waiting for each one up to its timeout
+# Sources that time out keep loading in the background (and call 'on_loaded' when they finish),
+# while the last-known content is served; returns the names of the sources still loading
+def warm_up(sources, on_loaded, timeouts, default_timeout, timeline=timeline, retries=None):
+    start = time.monotonic()
+    threads = {}
+    for name, function in sources.items():
+        threads[name] = threading.Thread(
+            target=load_source, args=(name, function, on_loaded, timeline, retries),
+            name=f"warm-up-{name}", daemon=True,
+        )
+        threads[name].start()
+    # Every source started at the same time, so each one is waited up to its own deadline
+    pending = []
+    for name, thread in threads.items():
+        thread.join(max(0.0, start + timeouts.get(name, default_timeout) - time.monotonic()))
+        if thread.is_alive():
+            pending.append(name)
+            logger.warning('"%s" ainda está carregando após o tempo limite, usando o último conteúdo conhecido', name)
+    timeline.record('warm-up', start, status='ok' if len(pending) == 0 else 'parcial')
+    return pending
+
+# Function to load again the failed sources whose retry time has come (e.g.: from a periodic job),
+# returning the ones which are still failing
+def retry(sources, on_loaded, retries):
+    return [name for name in retries.due() if not load_source(name, sources[name], on_loaded, None, retries)]
+
+# Function to load the last-known content snapshot (an empty dict if it doesn't exist)
+def load_snapshot(path):
+    try:
+        with open(path, encoding='utf-8') as file: return json.load(file)
+    except FileNotFoundError: return {}
+    except (OSError, ValueError) as error:
+        logger.warning('Não foi possível ler o snapshot de conteúdo "%s": %s', path, error)
+        return {}
+
+# Function to save the content snapshot (the file is replaced atomically)
+def save_snapshot(path, content):
+    temporary = f"{path}.tmp"
+    try:
+        # DynamoDB numbers (Decimal) are saved as strings
+        with open(temporary, 'w', encoding='utf-8') as file: json.dump(content, file, ensure_ascii=False, default=str)
+        os.replace(temporary, path)
+    except OSError as error: logger.warning('Não foi possível salvar o snapshot de conteúdo "%s": %s', path, error)